@@ -0,0 +1,37 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002_ingest_jobs'
+down_revision = '0001_init'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ingest_jobs',
+        sa.Column('id', sa.String(36), primary_key=True),
+        sa.Column('owner_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('kind', sa.String(20), nullable=False),
+        sa.Column('status', sa.Enum('pending', 'running', 'succeeded', 'failed', name='jobstatus'), nullable=False),
+        sa.Column('stage', sa.String(20)),
+        sa.Column('payload', sa.JSON()),
+        sa.Column('progress', sa.JSON()),
+        sa.Column('result', sa.JSON()),
+        sa.Column('item_id', sa.String(36)),
+        sa.Column('attempts', sa.Integer(), server_default=sa.text('0')),
+        sa.Column('max_attempts', sa.Integer(), server_default=sa.text('3')),
+        sa.Column('error', sa.Text()),
+        sa.Column('run_after', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('locked_by', sa.String(64)),
+        sa.Column('locked_at', sa.DateTime()),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), onupdate=sa.func.now()),
+        sa.Column('finished_at', sa.DateTime()),
+    )
+    op.create_index('idx_job_status_run_after', 'ingest_jobs', ['status', 'run_after'])
+    op.create_index('idx_job_owner', 'ingest_jobs', ['owner_id'])
+
+
+def downgrade():
+    op.drop_table('ingest_jobs')
@@ -0,0 +1,32 @@
+from alembic import op
+import sqlalchemy as sa
+import sqlalchemy.dialects.mysql as mysql
+
+revision = '0003_enrichment_cache'
+down_revision = '0002_ingest_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'enrichment_cache',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('content_hash', sa.String(64), nullable=False),
+        sa.Column('provider', sa.String(50), nullable=False),
+        sa.Column('model', sa.String(100), nullable=False),
+        sa.Column('summary', sa.Text()),
+        sa.Column('keywords', sa.JSON()),
+        sa.Column('tags', sa.JSON()),
+        sa.Column('embedding_model', sa.String(100)),
+        sa.Column('chunking', sa.String(64)),
+        sa.Column('embedding_dim', sa.Integer()),
+        sa.Column('embeddings', sa.LargeBinary().with_variant(mysql.LONGBLOB(), 'mysql')),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.func.now(), onupdate=sa.func.now()),
+        sa.UniqueConstraint('content_hash', 'provider', 'model', name='uq_enrichment_key'),
+    )
+
+
+def downgrade():
+    op.drop_table('enrichment_cache')
@@ -0,0 +1,15 @@
+from alembic import op
+
+revision = '0004_items_keyset_index'
+down_revision = '0003_enrichment_cache'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serves the listing filter, sort order and (created_at, id) cursor seek from one index.
+    op.create_index('idx_live_created_id', 'knowledge_items', ['is_deleted', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('idx_live_created_id', table_name='knowledge_items')
@@ -0,0 +1,27 @@
+from alembic import op
+
+revision = '0005_items_fulltext'
+down_revision = '0004_items_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        # ngram tokenizes Chinese without word boundaries; ngram_token_size defaults to 2.
+        op.execute('CREATE FULLTEXT INDEX ft_items_text ON knowledge_items (title, summary, content_text) WITH PARSER ngram')
+    elif dialect == 'sqlite':
+        # Rows are filled by the application (CJK text is pre-segmented), see app.db.fulltext.
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS knowledge_items_fts "
+            "USING fts5(item_id UNINDEXED, title, summary, content, tokenize='unicode61')"
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.drop_index('ft_items_text', table_name='knowledge_items')
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS knowledge_items_fts')
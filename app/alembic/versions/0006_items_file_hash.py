@@ -0,0 +1,17 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006_items_file_hash'
+down_revision = '0005_items_fulltext'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('knowledge_items', sa.Column('file_hash', sa.String(64), nullable=True))
+    op.create_index('ix_knowledge_items_file_hash', 'knowledge_items', ['file_hash'])
+
+
+def downgrade():
+    op.drop_index('ix_knowledge_items_file_hash', table_name='knowledge_items')
+    op.drop_column('knowledge_items', 'file_hash')
@@ -0,0 +1,22 @@
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007_items_near_duplicates'
+down_revision = '0006_items_file_hash'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Signatures of existing rows are backfilled when the near-duplicate index is first built.
+    op.add_column('knowledge_items', sa.Column('minhash', sa.LargeBinary(), nullable=True))
+    op.add_column('knowledge_items', sa.Column('duplicate_of', sa.String(36), nullable=True))
+    op.create_index('ix_knowledge_items_duplicate_of', 'knowledge_items', ['duplicate_of'])
+    op.create_index('ix_knowledge_items_updated_at', 'knowledge_items', ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_knowledge_items_updated_at', table_name='knowledge_items')
+    op.drop_index('ix_knowledge_items_duplicate_of', table_name='knowledge_items')
+    op.drop_column('knowledge_items', 'duplicate_of')
+    op.drop_column('knowledge_items', 'minhash')
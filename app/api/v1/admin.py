@@ -0,0 +1,76 @@
+import asyncio
+
+from fastapi import APIRouter, Depends, Form, HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import profiling
+from app.core.dependencies import get_admin_user, get_db
+from app.db.models import User
+from app.services.indexing.store import get_store
+from app.services.ingest.enrichment_cache import invalidate_enrichment_cache
+from app.services.jobs.queue import enqueue_exclusive_job
+
+router = APIRouter()
+
+
+@router.delete("/enrichment-cache")
+async def clear_enrichment_cache(provider: str | None = None, model: str | None = None, db: AsyncSession = Depends(get_db), admin: User = Depends(get_admin_user)):
+    """Drop cached summaries/keywords/tags/embeddings, e.g. after switching models."""
+    removed = await invalidate_enrichment_cache(db, provider=provider, model=model)
+    return {"success": True, "data": {"removed": removed}}
+
+
+@router.post("/reindex")
+async def start_reindex(keep_old: bool = Form(False), db: AsyncSession = Depends(get_db), admin: User = Depends(get_admin_user)):
+    """Re-embed the whole corpus into a new collection version, e.g. after changing the embedding model."""
+    job = await enqueue_exclusive_job(db, admin, "reindex", {"keep_old": keep_old})
+    if job is None:
+        raise HTTPException(status_code=409, detail="A reindex is already in progress")
+    return JSONResponse(status_code=202, content={"success": True, "data": {"job_id": job.id, "status": job.status.value}})
+
+
+@router.post("/payload-backfill")
+async def start_payload_backfill(db: AsyncSession = Depends(get_db), admin: User = Depends(get_admin_user)):
+    """Rewrite the filter payload of already-indexed points from the database, without re-embedding."""
+    job = await enqueue_exclusive_job(db, admin, "payload_backfill", {})
+    if job is None:
+        raise HTTPException(status_code=409, detail="A payload backfill is already in progress")
+    return JSONResponse(status_code=202, content={"success": True, "data": {"job_id": job.id, "status": job.status.value}})
+
+
+@router.get("/vector-collections")
+async def vector_collections(admin: User = Depends(get_admin_user)):
+    store = get_store()
+    collections, aliases = await store.list_collections()
+    return {"success": True, "data": {"alias": store.collection, "live": aliases.get(store.collection), "collections": sorted(collections)}}
+
+
+@router.post("/vector-config")
+async def apply_vector_config(admin: User = Depends(get_admin_user)):
+    """Apply the QDRANT_* quantization / on-disk / HNSW settings to the live collection in place."""
+    data = await get_store().apply_collection_config()
+    return {"success": True, "data": data}
+
+
+@router.get("/profiles")
+async def list_profiles(admin: User = Depends(get_admin_user)):
+    """Saved request profiles, newest first (see PROFILING_ENABLED)."""
+    return {"success": True, "data": await asyncio.to_thread(profiling.list_profiles)}
+
+
+@router.get("/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: str = Query("txt", pattern="^(txt|prof)$"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|calls|ncalls)$"),
+    limit: int = Query(50, ge=1, le=1000),
+    admin: User = Depends(get_admin_user),
+):
+    """`format=prof` downloads the raw cProfile dump (for snakeviz / pstats); `txt` is a pstats report."""
+    path = profiling.profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "prof":
+        return FileResponse(path, media_type="application/octet-stream", filename=path.name)
+    return PlainTextResponse(await asyncio.to_thread(profiling.render_stats, path, sort, limit))
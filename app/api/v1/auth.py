@@ -4,7 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.core.dependencies import get_db, get_current_user
-from app.core.security import create_access_token, get_password_hash, verify_password
+from app.core.security import aget_password_hash, averify_password, create_access_token
 from app.db.models import User
 
 router = APIRouter()
@@ -15,7 +15,7 @@ async def register(username: str, password: str, db: AsyncSession = Depends(get_
     result = await db.execute(select(User).where(User.username == username))
     if result.scalars().first():
         raise HTTPException(status_code=400, detail="Username already exists")
-    user = User(username=username, password_hash=get_password_hash(password))
+    user = User(username=username, password_hash=await aget_password_hash(password))
     db.add(user)
     await db.commit()
     await db.refresh(user)
@@ -26,9 +26,9 @@ async def register(username: str, password: str, db: AsyncSession = Depends(get_
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     result = await db.execute(select(User).where(User.username == form_data.username))
     user = result.scalars().first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await averify_password(form_data.password, user.password_hash):
         raise HTTPException(status_code=400, detail="Incorrect username or password")
-    token = create_access_token({"sub": user.id})
+    token = create_access_token({"sub": str(user.id)})
     return {"success": True, "data": {"access_token": token, "token_type": "bearer"}}
 
 
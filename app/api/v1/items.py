@@ -1,14 +1,22 @@
+import asyncio
 import hashlib
+import re
 from typing import List
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, Form
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, Form
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.core.config import settings
 from app.core.dependencies import get_current_user, get_db
 from app.db.models import KnowledgeItem, SourceType, User
-from app.services.ingest.pipeline import ingest_text, ingest_url, ingest_file
+from app.services.ingest.bulk import detect_format
+from app.services.ingest.pipeline import deindex_item, ensure_file_not_duplicate, ingest_text, ingest_url, ingest_saved_file
+from app.services.ingest.near_duplicates import compute_signature, find_near_duplicates, signature_from_bytes, signature_to_bytes
+from app.services.items.listing import hydrate_items, list_items_page
+from app.services.jobs.queue import enqueue_job
+from app.services.storage.file_store import save_upload
 
 router = APIRouter()
 
@@ -17,12 +25,19 @@ def compute_hash(content: str) -> str:
     return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
 
+def _accepted(job) -> JSONResponse:
+    return JSONResponse(status_code=202, content={"success": True, "data": {"job_id": job.id, "status": job.status.value}})
+
+
 @router.post("/text")
 async def create_text_item(title: str = Form(...), content_text: str = Form(...), tags: str | None = Form(None), force: bool = Form(False), db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
     tags_list = [t.strip() for t in tags.split(',')] if tags else []
     existing = await db.execute(select(KnowledgeItem).where(KnowledgeItem.owner_id == current_user.id, KnowledgeItem.content_hash == compute_hash(content_text)))
     if existing.scalars().first() and not force:
         raise HTTPException(status_code=400, detail="Duplicate content")
+    if settings.ingest_async:
+        job = await enqueue_job(db, current_user, "text", {"title": title, "content_text": content_text, "tags": tags_list})
+        return _accepted(job)
     item = await ingest_text(db, current_user, title, content_text, tags_list)
     return {"success": True, "data": {"id": item.id}}
 
@@ -30,6 +45,9 @@ async def create_text_item(title: str = Form(...), content_text: str = Form(...)
 @router.post("/url")
 async def create_url_item(url: str = Form(...), title: str | None = Form(None), tags: str | None = Form(None), force: bool = Form(False), db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
     tags_list = [t.strip() for t in tags.split(',')] if tags else []
+    if settings.ingest_async:
+        job = await enqueue_job(db, current_user, "url", {"url": url, "title": title, "tags": tags_list, "force": force})
+        return _accepted(job)
     item = await ingest_url(db, current_user, url, title, tags_list, force=force)
     return {"success": True, "data": {"id": item.id}}
 
@@ -37,24 +55,55 @@ async def create_url_item(url: str = Form(...), title: str | None = Form(None),
 @router.post("/file")
 async def create_file_item(file: UploadFile = File(...), title: str | None = Form(None), tags: str | None = Form(None), force: bool = Form(False), db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
     tags_list = [t.strip() for t in tags.split(',')] if tags else []
-    item = await ingest_file(db, current_user, file, title, tags_list, force=force)
+    # The upload stream is only readable during this request, so persist it before queueing.
+    saved = await save_upload(file)
+    if not force:
+        await ensure_file_not_duplicate(db, current_user, saved["sha256"])
+    if settings.ingest_async:
+        job = await enqueue_job(db, current_user, "file", {"saved": saved, "title": title, "tags": tags_list, "force": force})
+        return _accepted(job)
+    item = await ingest_saved_file(db, current_user, saved, title, tags_list, force=force)
     return {"success": True, "data": {"id": item.id}}
 
 
+@router.post("/bulk")
+async def create_bulk_import(file: UploadFile = File(...), tags: str | None = Form(None), force: bool = Form(False), db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Import an NDJSON file or a zip archive as one background job."""
+    fmt = detect_format(file.filename or "")
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Bulk import expects an .ndjson/.jsonl file or a .zip archive")
+    tags_list = [t.strip() for t in tags.split(',')] if tags else []
+    saved = await save_upload(file)
+    job = await enqueue_job(db, current_user, "bulk", {"saved": saved, "format": fmt, "tags": tags_list, "force": force})
+    return _accepted(job)
+
+
+@router.post("/crawl")
+async def create_crawl(url: str | None = Form(None), sitemap_url: str | None = Form(None), max_depth: int | None = Form(None, ge=0, le=10), max_pages: int | None = Form(None, ge=1), include: List[str] = Form([]), exclude: List[str] = Form([]), tags: str | None = Form(None), force: bool = Form(False), db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    """Crawl a site from a seed URL and/or its sitemap.xml as one background job."""
+    if not (url or sitemap_url):
+        raise HTTPException(status_code=400, detail="A seed url or a sitemap_url is required")
+    for pattern in include + exclude:
+        try:
+            re.compile(pattern)
+        except re.error:
+            raise HTTPException(status_code=400, detail=f"Invalid pattern: {pattern}")
+    tags_list = [t.strip() for t in tags.split(',')] if tags else []
+    payload = {
+        "url": url, "sitemap_url": sitemap_url, "max_depth": max_depth, "max_pages": max_pages,
+        "include": include, "exclude": exclude, "tags": tags_list, "force": force,
+    }
+    job = await enqueue_job(db, current_user, "crawl", payload)
+    return _accepted(job)
+
+
 @router.get("")
-async def list_items(db: AsyncSession = Depends(get_db), current_user: User | None = Depends(get_current_user)):
-    result = await db.execute(select(KnowledgeItem).where(KnowledgeItem.is_deleted == False).order_by(KnowledgeItem.created_at.desc()))
-    items = result.scalars().all()
-    return {"success": True, "data": [
-        {
-            "id": item.id,
-            "title": item.title,
-            "tags": item.tags,
-            "summary": item.summary,
-            "created_at": item.created_at,
-        }
-        for item in items
-    ]}
+async def list_items(limit: int = Query(None, ge=1, le=100), cursor: str | None = None, db: AsyncSession = Depends(get_db), current_user: User | None = Depends(get_current_user)):
+    try:
+        rows, next_cursor = await list_items_page(db, limit or settings.items_page_size, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return {"success": True, "data": rows, "next_cursor": next_cursor}
 
 
 @router.get("/{item_id}")
@@ -72,9 +121,25 @@ async def get_item(item_id: str, db: AsyncSession = Depends(get_db)):
         "content_text": item.content_text,
         "source_type": item.source_type.value,
         "source_url": item.source_url,
+        "duplicate_of": item.duplicate_of,
     }}
 
 
+@router.get("/{item_id}/near-duplicates")
+async def get_near_duplicates(item_id: str, limit: int = Query(10, ge=1, le=100), threshold: float | None = Query(None, ge=0.0, le=1.0), db: AsyncSession = Depends(get_db)):
+    result = await db.execute(select(KnowledgeItem).where(KnowledgeItem.id == item_id, KnowledgeItem.is_deleted == False))
+    item = result.scalars().first()
+    if not item:
+        raise HTTPException(status_code=404, detail="Not found")
+    signature = signature_from_bytes(item.minhash)
+    if signature is None:
+        signature = await asyncio.to_thread(compute_signature, item.content_text)
+    matches = await find_near_duplicates(signature, exclude_id=item.id, threshold=threshold, limit=limit)
+    rows = await hydrate_items(db, [match_id for match_id, _ in matches])
+    data = [{**rows[match_id], "similarity": round(score, 4)} for match_id, score in matches if match_id in rows]
+    return {"success": True, "data": data}
+
+
 @router.put("/{item_id}")
 async def update_item(item_id: str, title: str | None = Form(None), summary: str | None = Form(None), keywords: str | None = Form(None), tags: str | None = Form(None), content_text: str | None = Form(None), reindex: bool = Form(False), db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
     result = await db.execute(select(KnowledgeItem).where(KnowledgeItem.id == item_id, KnowledgeItem.owner_id == current_user.id))
@@ -91,6 +156,7 @@ async def update_item(item_id: str, title: str | None = Form(None), summary: str
         item.tags = [t.strip() for t in tags.split(',') if t.strip()]
     if content_text:
         item.content_text = content_text
+        item.minhash = signature_to_bytes(await asyncio.to_thread(compute_signature, content_text))
     await db.commit()
     await db.refresh(item)
     if reindex:
@@ -106,4 +172,5 @@ async def delete_item(item_id: str, db: AsyncSession = Depends(get_db), current_
         raise HTTPException(status_code=404, detail="Not found")
     await db.delete(item)
     await db.commit()
+    await deindex_item(item_id)
     return {"success": True}
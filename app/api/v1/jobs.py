@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dependencies import get_current_user, get_db
+from app.db.models import IngestJob, User
+from app.services.jobs.queue import job_to_dict
+
+router = APIRouter()
+
+
+@router.get("/{job_id}")
+async def get_job(job_id: str, db: AsyncSession = Depends(get_db), current_user: User = Depends(get_current_user)):
+    result = await db.execute(select(IngestJob).where(IngestJob.id == job_id, IngestJob.owner_id == current_user.id))
+    job = result.scalars().first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Not found")
+    return {"success": True, "data": job_to_dict(job)}
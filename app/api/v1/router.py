@@ -1,8 +1,10 @@
 from fastapi import APIRouter
 
-from app.api.v1 import auth, items, search
+from app.api.v1 import admin, auth, items, jobs, search
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(items.router, prefix="/items", tags=["items"])
 api_router.include_router(search.router, prefix="/search", tags=["search"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(admin.router, prefix="/admin", tags=["admin"])
@@ -1,31 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import select
+import logging
+from datetime import datetime
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import settings
 from app.core.dependencies import get_db
-from app.db.models import KnowledgeItem
-from app.services.indexing.qdrant_store import QdrantStore
+from app.db.models import SourceType
+from app.llm.embedding_cache import get_query_cache
+from app.services.search.fulltext import search_fulltext
+from app.services.search.hybrid import hybrid_search
+from app.services.search.semantic import semantic_search
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
 @router.get('/text')
-async def text_search(q: str, db: AsyncSession = Depends(get_db)):
-    stmt = select(KnowledgeItem).where(
-        KnowledgeItem.is_deleted == False,
-        (KnowledgeItem.title.ilike(f"%{q}%")) | (KnowledgeItem.summary.ilike(f"%{q}%")) | (KnowledgeItem.content_text.ilike(f"%{q}%"))
-    )
-    result = await db.execute(stmt)
-    items = result.scalars().all()
-    return {"success": True, "data": [
-        {"id": item.id, "title": item.title, "summary": item.summary, "score": None}
-        for item in items
-    ]}
+async def text_search(q: str, limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0), db: AsyncSession = Depends(get_db)):
+    results, next_offset = await search_fulltext(db, q, limit, offset)
+    return {"success": True, "data": results, "next_offset": next_offset}
 
 
 @router.get('/semantic')
-async def semantic_search(q: str, top_k: int = 10):
-    store = QdrantStore()
-    results = await store.search(q, top_k=top_k)
+async def semantic(
+    q: str,
+    top_k: int = Query(10, ge=1, le=100),
+    owner_id: int | None = None,
+    tags: List[str] | None = Query(None),
+    source_type: SourceType | None = None,
+    created_from: datetime | None = None,
+    created_to: datetime | None = None,
+    hnsw_ef: int | None = Query(None, ge=1, le=4096),
+    exact: bool | None = None,
+    db: AsyncSession = Depends(get_db),
+):
+    try:
+        results = await semantic_search(
+            db, q, top_k, hnsw_ef=hnsw_ef, exact=exact, owner_id=owner_id, tags=tags, source_type=source_type.value if source_type else None,
+            created_from=created_from, created_to=created_to,
+        )
+    except HTTPException:
+        raise
+    except Exception as exc:
+        # Empty results would read as "nothing matched"; say the index is down instead.
+        logger.warning("Semantic search failed", exc_info=True)
+        raise HTTPException(status_code=503, detail="Vector search is unavailable") from exc
     return {"success": True, "data": results}
+
+
+@router.get('/hybrid')
+async def hybrid(q: str, top_k: int = Query(10, ge=1, le=100), fusion: str | None = Query(None, pattern="^(rrf|weighted)$"), db: AsyncSession = Depends(get_db)):
+    result = await hybrid_search(db, q, top_k, fusion)
+    return {"success": True, "data": result["items"], "fusion": result["fusion"], "degraded": result["degraded"]}
+
+
+@router.get('/cache-stats')
+async def cache_stats():
+    return {"success": True, "data": {"query_embeddings": get_query_cache().stats()}}
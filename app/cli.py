@@ -0,0 +1,58 @@
+"""Command line tools: `python -m app.cli import PATH --user NAME [--tags a,b] [--force]`.
+
+PATH may be an NDJSON file, a zip archive or a directory of documents. The import runs in
+this process (not through the job queue) and prints progress as batches are indexed.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from sqlalchemy import select
+
+from app.core.logging import setup_logging
+from app.db.models import User
+from app.db.session import get_session
+from app.services.extractors.engine import shutdown_extraction_pool
+from app.services.extractors.fetcher import close_fetcher
+from app.services.indexing.store import close_store, init_store
+from app.services.ingest.bulk import iter_records, run_bulk_import
+
+
+async def import_command(path: str, username: str, tags: list[str], force: bool) -> int:
+    async with get_session() as db:
+        user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+    if user is None:
+        print(f"Unknown user: {username}", file=sys.stderr)
+        return 2
+
+    async def on_progress(progress: dict) -> None:
+        print(f"read={progress['read']} ok={progress['succeeded']} failed={progress['failed']} pending={progress['pending']}", file=sys.stderr)
+
+    await init_store()
+    try:
+        summary = await run_bulk_import(user, iter_records(path), tags, force=force, on_progress=on_progress)
+    finally:
+        await close_store()
+        await close_fetcher()
+        shutdown_extraction_pool()
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    return 0 if summary["failed"] == 0 else 1
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Knowledge base command line tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="Bulk import an NDJSON file, zip archive or directory")
+    importer.add_argument("path")
+    importer.add_argument("--user", required=True, help="Owner of the imported items")
+    importer.add_argument("--tags", default="", help="Comma-separated tags added to every item")
+    importer.add_argument("--force", action="store_true", help="Import content even if it already exists")
+    args = parser.parse_args(argv)
+    setup_logging()
+    tags = [t.strip() for t in args.tags.split(",") if t.strip()]
+    return asyncio.run(import_command(args.path, args.user, tags, args.force))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
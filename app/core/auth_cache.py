@@ -0,0 +1,110 @@
+"""Short-lived caches on the authentication hot path: decoded tokens and user principals.
+
+Entries expire after `AUTH_CACHE_TTL_SECONDS` (0 disables both caches). A user is evicted
+as soon as this process flushes a change to their password or username, or deletes them;
+other processes see the change once their entry expires.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+from app.core.security import decode_access_token
+from app.db.models import User
+
+_PRINCIPAL_FIELDS = ("id", "username", "password_hash", "created_at")
+
+
+class _TTLCache:
+    """Size-bounded LRU whose entries expire after a TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_entries > 0
+
+    def get(self, key: Any) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any, expires_at: float | None = None) -> None:
+        if not self.enabled:
+            return
+        ttl_expiry = time.time() + self.ttl
+        self._entries[key] = (min(ttl_expiry, expires_at) if expires_at else ttl_expiry, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop_where(self, predicate: Callable[[Any, Any], bool]) -> None:
+        for key in [k for k, (_, v) in self._entries.items() if predicate(k, v)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_tokens = _TTLCache(settings.auth_cache_max_entries, settings.auth_cache_ttl_seconds)
+_principals = _TTLCache(settings.auth_cache_max_entries, settings.auth_cache_ttl_seconds)
+
+
+def decode_token(token: str) -> dict | None:
+    """`decode_access_token`, remembering valid tokens until the TTL or their `exp`, whichever is first."""
+    payload = _tokens.get(token)
+    if payload is not None:
+        return payload
+    payload = decode_access_token(token)
+    if payload:
+        _tokens.put(token, payload, expires_at=payload.get("exp"))
+    return payload
+
+
+async def load_user(db: AsyncSession, user_id: int) -> User | None:
+    """The user with `user_id`, attached to `db`; served without a query while cached."""
+    cached = _principals.get(user_id)
+    if cached is not None:
+        user = User(**cached)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalars().first()
+    if user is not None:
+        _principals.put(user_id, {field: getattr(user, field) for field in _PRINCIPAL_FIELDS})
+    return user
+
+
+def invalidate_user(user_id: int) -> None:
+    _principals.pop_where(lambda key, _: key == user_id)
+    _tokens.pop_where(lambda _, payload: payload.get("sub") == str(user_id))
+
+
+def clear() -> None:
+    _tokens.clear()
+    _principals.clear()
+
+
+@event.listens_for(User, "after_update")
+def _user_updated(mapper, connection, target: User) -> None:
+    state = inspect(target)
+    if state.attrs.password_hash.history.has_changes() or state.attrs.username.history.has_changes():
+        invalidate_user(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _user_deleted(mapper, connection, target: User) -> None:
+    invalidate_user(target.id)
@@ -14,16 +14,143 @@ class Settings(BaseSettings):
     database_url: str = Field("sqlite+aiosqlite:///./app.db", alias="DATABASE_URL")
     qdrant_url: str = Field("http://localhost:6333", alias="QDRANT_URL")
     qdrant_api_key: str | None = Field(None, alias="QDRANT_API_KEY")
+    qdrant_timeout_seconds: int = Field(10, alias="QDRANT_TIMEOUT_SECONDS")
+    qdrant_pool_size: int = Field(20, alias="QDRANT_POOL_SIZE")
+    qdrant_prefer_grpc: bool = Field(False, alias="QDRANT_PREFER_GRPC")
+    qdrant_grpc_port: int = Field(6334, alias="QDRANT_GRPC_PORT")
+    qdrant_collection: str = Field("knowledge_items", alias="QDRANT_COLLECTION")
     embedding_dim: int = Field(1536, alias="EMBEDDING_DIM")
 
+    # Collection storage. Applied when a collection is created (startup, reindex) and to the
+    # live collection by POST /api/v1/admin/vector-config.
+    # Quantization: "none"; "scalar" keeps an int8 copy of every vector (~4x less RAM, small
+    # recall loss, recovered by rescoring); "product" compresses further by
+    # QDRANT_PQ_COMPRESSION (x4..x64) with a larger recall loss.
+    qdrant_quantization: str = Field("none", alias="QDRANT_QUANTIZATION")
+    qdrant_scalar_quantile: float = Field(0.99, alias="QDRANT_SCALAR_QUANTILE")
+    qdrant_pq_compression: str = Field("x16", alias="QDRANT_PQ_COMPRESSION")
+    # Keep the quantized vectors in RAM even when the originals are on disk.
+    qdrant_quantization_always_ram: bool = Field(True, alias="QDRANT_QUANTIZATION_ALWAYS_RAM")
+    # Serve original vectors / payloads from disk (mmap) instead of RAM.
+    qdrant_on_disk_vectors: bool = Field(False, alias="QDRANT_ON_DISK_VECTORS")
+    qdrant_on_disk_payload: bool = Field(False, alias="QDRANT_ON_DISK_PAYLOAD")
+    # HNSW graph: more edges (m) and a wider build beam (ef_construct) raise recall and memory.
+    qdrant_hnsw_m: int = Field(16, alias="QDRANT_HNSW_M")
+    qdrant_hnsw_ef_construct: int = Field(100, alias="QDRANT_HNSW_EF_CONSTRUCT")
+    qdrant_hnsw_on_disk: bool = Field(False, alias="QDRANT_HNSW_ON_DISK")
+
+    # Per-query defaults, overridable on /search/semantic. hnsw_ef: search beam width (None =
+    # Qdrant default); exact: brute force, for recall checks. With quantization, the top
+    # `top_k * oversampling` candidates are rescored with the original vectors.
+    search_hnsw_ef: int | None = Field(None, alias="SEARCH_HNSW_EF")
+    search_exact: bool = Field(False, alias="SEARCH_EXACT")
+    search_quantization_rescore: bool = Field(True, alias="SEARCH_QUANTIZATION_RESCORE")
+    search_quantization_oversampling: float = Field(2.0, alias="SEARCH_QUANTIZATION_OVERSAMPLING")
+
+    # "qdrant", or "local" for the embedded brute-force index under LOCAL_VECTOR_DIR (single
+    # process, small corpora; no Qdrant needed). With VECTOR_LOCAL_FALLBACK, Qdrant writes are
+    # mirrored locally and searches fall back to the local index while Qdrant is failing.
+    vector_backend: str = Field("qdrant", alias="VECTOR_BACKEND")
+    vector_local_fallback: bool = Field(False, alias="VECTOR_LOCAL_FALLBACK")
+    vector_fallback_retry_seconds: float = Field(30.0, alias="VECTOR_FALLBACK_RETRY_SECONDS")
+    # Default: <UPLOAD_DIR>/vectors. int8 quarters the size at a small cost in score precision.
+    local_vector_dir: str = Field("", alias="LOCAL_VECTOR_DIR")
+    local_vector_dtype: str = Field("float32", alias="LOCAL_VECTOR_DTYPE")
+
     jwt_secret: str = Field("changeme", alias="JWT_SECRET")
     jwt_expire_minutes: int = Field(60, alias="JWT_EXPIRE_MINUTES")
+    password_hash_workers: int = Field(2, alias="PASSWORD_HASH_WORKERS")
+    auth_cache_ttl_seconds: float = Field(60.0, alias="AUTH_CACHE_TTL_SECONDS")
+    auth_cache_max_entries: int = Field(10000, alias="AUTH_CACHE_MAX_ENTRIES")
 
     allow_anonymous_read: bool = Field(True, alias="ALLOW_ANONYMOUS_READ")
     upload_dir: str = Field("/data/uploads", alias="UPLOAD_DIR")
+    max_upload_bytes: int = Field(512 * 1024 * 1024, alias="MAX_UPLOAD_BYTES")
+
+    fetch_timeout_seconds: float = Field(15.0, alias="FETCH_TIMEOUT_SECONDS")
+    fetch_max_bytes: int = Field(10 * 1024 * 1024, alias="FETCH_MAX_BYTES")
+    fetch_max_redirects: int = Field(5, alias="FETCH_MAX_REDIRECTS")
+    fetch_max_connections: int = Field(100, alias="FETCH_MAX_CONNECTIONS")
+    fetch_per_host_connections: int = Field(4, alias="FETCH_PER_HOST_CONNECTIONS")
+    fetch_user_agent: str = Field("knowledge-base-fetcher/1.0", alias="FETCH_USER_AGENT")
+    fetch_cache_enabled: bool = Field(True, alias="FETCH_CACHE_ENABLED")
+    fetch_cache_dir: str | None = Field(None, alias="FETCH_CACHE_DIR")
+
+    extract_workers: int = Field(0, alias="EXTRACT_WORKERS")
+    extract_timeout_seconds: float = Field(120.0, alias="EXTRACT_TIMEOUT_SECONDS")
+    extract_memory_limit_mb: int = Field(2048, alias="EXTRACT_MEMORY_LIMIT_MB")
+    extract_pdf_pages_per_task: int = Field(16, alias="EXTRACT_PDF_PAGES_PER_TASK")
+    extract_cache_enabled: bool = Field(True, alias="EXTRACT_CACHE_ENABLED")
 
     openai_api_key: str | None = Field(None, alias="OPENAI_API_KEY")
     openai_model: str = Field("gpt-3.5-turbo", alias="OPENAI_MODEL")
+    openai_embedding_model: str = Field("text-embedding-3-small", alias="OPENAI_EMBEDDING_MODEL")
+
+    llm_max_concurrency: int = Field(8, alias="LLM_MAX_CONCURRENCY")
+    llm_timeout_seconds: float = Field(60.0, alias="LLM_TIMEOUT_SECONDS")
+
+    embed_batch_max_size: int = Field(64, alias="EMBED_BATCH_MAX_SIZE")
+    embed_batch_max_wait_ms: float = Field(10.0, alias="EMBED_BATCH_MAX_WAIT_MS")
+
+    query_cache_size: int = Field(2048, alias="QUERY_CACHE_SIZE")
+    query_cache_ttl_seconds: float = Field(86400.0, alias="QUERY_CACHE_TTL_SECONDS")
+    query_cache_path: str | None = Field(None, alias="QUERY_CACHE_PATH")
+
+    items_page_size: int = Field(20, alias="ITEMS_PAGE_SIZE")
+    search_snippet_chars: int = Field(160, alias="SEARCH_SNIPPET_CHARS")
+
+    enrichment_cache_enabled: bool = Field(True, alias="ENRICHMENT_CACHE_ENABLED")
+
+    near_dup_mode: str = Field("off", alias="NEAR_DUP_MODE")
+    near_dup_threshold: float = Field(0.85, alias="NEAR_DUP_THRESHOLD")
+    near_dup_num_perm: int = Field(64, alias="NEAR_DUP_NUM_PERM")
+    near_dup_bands: int = Field(16, alias="NEAR_DUP_BANDS")
+    near_dup_shingle_size: int = Field(5, alias="NEAR_DUP_SHINGLE_SIZE")
+    near_dup_refresh_seconds: float = Field(5.0, alias="NEAR_DUP_REFRESH_SECONDS")
+
+    chunk_mode: str = Field("char", alias="CHUNK_MODE")
+    chunk_size: int = Field(800, alias="CHUNK_SIZE")
+    chunk_overlap: int = Field(100, alias="CHUNK_OVERLAP")
+    search_chunk_aggregation: str = Field("max", alias="SEARCH_CHUNK_AGGREGATION")
+    search_chunk_top_n: int = Field(3, alias="SEARCH_CHUNK_TOP_N")
+    search_chunk_overfetch: int = Field(4, alias="SEARCH_CHUNK_OVERFETCH")
+
+    hybrid_fusion: str = Field("rrf", alias="HYBRID_FUSION")
+    hybrid_rrf_k: int = Field(60, alias="HYBRID_RRF_K")
+    hybrid_semantic_weight: float = Field(0.5, alias="HYBRID_SEMANTIC_WEIGHT")
+    hybrid_candidate_factor: int = Field(3, alias="HYBRID_CANDIDATE_FACTOR")
+    hybrid_lexical_timeout_ms: float = Field(800.0, alias="HYBRID_LEXICAL_TIMEOUT_MS")
+    hybrid_semantic_timeout_ms: float = Field(800.0, alias="HYBRID_SEMANTIC_TIMEOUT_MS")
+
+    # Prometheus metrics at /metrics (API process): per-route HTTP latency, SQL statements per
+    # request, ingest stage / extractor / LLM / vector store timings. Off: no overhead.
+    metrics_enabled: bool = Field(False, alias="METRICS_ENABLED")
+    # On-demand cProfile of single requests: an admin sends `X-Profile: 1` (or `?profile=1`),
+    # or 1 in PROFILING_SAMPLE_RATE requests is picked (0 = no sampling). The newest
+    # PROFILING_MAX_PROFILES are kept in PROFILING_DIR (default <UPLOAD_DIR>/profiles).
+    profiling_enabled: bool = Field(False, alias="PROFILING_ENABLED")
+    profiling_sample_rate: int = Field(0, alias="PROFILING_SAMPLE_RATE")
+    profiling_dir: str = Field("", alias="PROFILING_DIR")
+    profiling_max_profiles: int = Field(50, alias="PROFILING_MAX_PROFILES")
+
+    ingest_async: bool = Field(True, alias="INGEST_ASYNC")
+    ingest_workers: int = Field(2, alias="INGEST_WORKERS")
+    ingest_max_attempts: int = Field(3, alias="INGEST_MAX_ATTEMPTS")
+    ingest_retry_backoff_seconds: float = Field(5.0, alias="INGEST_RETRY_BACKOFF_SECONDS")
+    ingest_poll_interval_seconds: float = Field(1.0, alias="INGEST_POLL_INTERVAL_SECONDS")
+    ingest_job_lease_seconds: int = Field(900, alias="INGEST_JOB_LEASE_SECONDS")
+
+    bulk_batch_size: int = Field(32, alias="BULK_BATCH_SIZE")
+    bulk_queue_size: int = Field(64, alias="BULK_QUEUE_SIZE")
+    bulk_extract_concurrency: int = Field(4, alias="BULK_EXTRACT_CONCURRENCY")
+    bulk_enrich_concurrency: int = Field(8, alias="BULK_ENRICH_CONCURRENCY")
+    bulk_embed_concurrency: int = Field(2, alias="BULK_EMBED_CONCURRENCY")
+    bulk_max_errors_reported: int = Field(100, alias="BULK_MAX_ERRORS_REPORTED")
+    crawl_concurrency: int = Field(8, alias="CRAWL_CONCURRENCY")
+    crawl_per_host_rps: float = Field(2.0, alias="CRAWL_PER_HOST_RPS")
+    crawl_max_depth: int = Field(2, alias="CRAWL_MAX_DEPTH")
+    crawl_max_pages: int = Field(500, alias="CRAWL_MAX_PAGES")
+    reindex_batch_size: int = Field(64, alias="REINDEX_BATCH_SIZE")
 
     admin_username: str | None = Field(None, alias="auth__admin_username")
     admin_password: str | None = Field(None, alias="auth__admin_password")
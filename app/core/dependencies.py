@@ -2,10 +2,10 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import decode_access_token
+from app.core.auth_cache import decode_token, load_user
+from app.core.config import settings
 from app.db.session import get_session
 from app.db.models import User
-from sqlalchemy import select
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
@@ -16,23 +16,33 @@ async def get_db() -> AsyncSession:
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User:
-    payload = decode_access_token(token)
+    payload = decode_token(token)
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    user_id = payload.get("sub")
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalars().first()
+    try:
+        user_id = int(payload["sub"])
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    user = await load_user(db, user_id)
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
 
+async def get_admin_user(current_user: User = Depends(get_current_user)) -> User:
+    if not settings.admin_username or current_user.username != settings.admin_username:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin only")
+    return current_user
+
+
 async def get_optional_user(token: str | None = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> User | None:
     if not token:
         return None
-    payload = decode_access_token(token)
+    payload = decode_token(token)
     if not payload or "sub" not in payload:
         return None
-    user_id = payload.get("sub")
-    result = await db.execute(select(User).where(User.id == user_id))
-    return result.scalars().first()
+    try:
+        user_id = int(payload["sub"])
+    except (ValueError, TypeError):
+        return None
+    return await load_user(db, user_id)
@@ -0,0 +1,276 @@
+"""In-process counters and histograms, exposed in Prometheus text format at `/metrics`.
+
+Everything is a no-op unless `METRICS_ENABLED` is set: `timer()` returns a shared null
+context, `timed` functions call straight through, and the HTTP middleware and SQLAlchemy
+hooks are not installed at all. The same timers feed the per-request breakdown of a
+profiled request (see `app.core.profiling`).
+"""
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Iterator
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+# Seconds; wide enough for a sub-millisecond query and a minute-long LLM call.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+_NULL = nullcontext()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = labels
+        self._lock = threading.Lock()
+        REGISTRY.register(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.type}\n"
+        return header + "".join(f"{line}\n" for line in self.samples())
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.label_names, key)} {value:g}"
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return int(sum(state[:-1])) if state else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = [(key, list(state)) for key, state in self._values.items()]
+        for key, state in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = 'le="%g"' % bound
+                yield f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+            cumulative += state[len(self.buckets)]
+            le = 'le="+Inf"'
+            yield f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, key)} {state[-1]:.6f}"
+            yield f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}"
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics.values())
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = Counter("kb_http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+HTTP_SECONDS = Histogram("kb_http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"))
+HTTP_DB_QUERIES = Histogram("kb_http_request_db_queries", "SQL statements executed per HTTP request.", ("route",), COUNT_BUCKETS)
+HTTP_DB_SECONDS = Histogram("kb_http_request_db_seconds", "Time spent in SQL statements per HTTP request.", ("route",))
+DB_SECONDS = Histogram("kb_db_query_duration_seconds", "SQL statement latency by statement type.", ("statement",))
+INGEST_STAGE_SECONDS = Histogram("kb_ingest_stage_duration_seconds", "Ingest pipeline stage latency.", ("stage",))
+EXTRACT_SECONDS = Histogram("kb_extract_duration_seconds", "Text extraction latency by source kind.", ("kind",))
+EXTRACT_ERRORS = Counter("kb_extract_errors_total", "Failed text extractions by source kind.", ("kind",))
+VECTOR_SECONDS = Histogram("kb_vector_store_duration_seconds", "Vector store call latency.", ("backend", "operation"))
+VECTOR_ERRORS = Counter("kb_vector_store_errors_total", "Failed vector store calls.", ("backend", "operation"))
+LLM_SECONDS = Histogram("kb_llm_duration_seconds", "LLM provider call latency (including queueing for a slot).", ("operation",))
+LLM_ERRORS = Counter("kb_llm_errors_total", "Failed LLM provider calls.", ("operation",))
+
+
+# Time spent per timer while handling a profiled request: "<metric>:<label values>" -> [calls, seconds].
+_breakdown: contextvars.ContextVar[dict | None] = contextvars.ContextVar("breakdown", default=None)
+
+
+def _record_breakdown(histogram: Histogram, labels: dict, elapsed: float) -> None:
+    breakdown = _breakdown.get()
+    if breakdown is not None:
+        name = histogram.name.removeprefix("kb_").removesuffix("_seconds").removesuffix("_duration")
+        entry = breakdown.setdefault(f"{name}:{','.join(str(v) for v in labels.values())}", [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+
+
+@contextmanager
+def _timer(histogram: Histogram, errors: Counter | None, labels: dict):
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        if errors is not None and settings.metrics_enabled:
+            errors.inc(**labels)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        if settings.metrics_enabled:
+            histogram.observe(elapsed, **labels)
+        _record_breakdown(histogram, labels, elapsed)
+
+
+def _active() -> bool:
+    return settings.metrics_enabled or _breakdown.get() is not None
+
+
+def timer(histogram: Histogram, errors: Counter | None = None, **labels):
+    """`with timer(INGEST_STAGE_SECONDS, stage="embed"): ...`"""
+    if not _active():
+        return _NULL
+    return _timer(histogram, errors, labels)
+
+
+def timed(histogram: Histogram, errors: Counter | None = None, **labels):
+    """Decorator form of `timer` for coroutine functions."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if not _active():
+                return await fn(*args, **kwargs)
+            with _timer(histogram, errors, labels):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# SQL statements run while handling the current request: [count, seconds], or None outside one.
+_request_db: contextvars.ContextVar[list | None] = contextvars.ContextVar("request_db", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["metrics_started"].pop()
+    elapsed = time.perf_counter() - started
+    kind = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+    labels = {"statement": kind if kind in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"}
+    if settings.metrics_enabled:
+        DB_SECONDS.observe(elapsed, **labels)
+    _record_breakdown(DB_SECONDS, labels, elapsed)
+    request = _request_db.get()
+    if request is not None:
+        request[0] += 1
+        request[1] += elapsed
+
+
+def _handle_error(exception_context) -> None:
+    started = exception_context.connection.info.get("metrics_started") if exception_context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine) -> None:
+    """Time every SQL statement on `engine` (an AsyncEngine or Engine)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if event.contains(sync_engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class MetricsMiddleware:
+    """Per-route latency, status and SQL statement counts for each HTTP request."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        db_stats = [0, 0.0]
+        token = _request_db.set(db_stats)
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_db.reset(token)
+            # The route template, not the raw path, keeps label cardinality bounded.
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status))
+            HTTP_SECONDS.observe(elapsed, method=method, route=route)
+            HTTP_DB_QUERIES.observe(db_stats[0], route=route)
+            HTTP_DB_SECONDS.observe(db_stats[1], route=route)
+
+
+def render() -> str:
+    return REGISTRY.render()
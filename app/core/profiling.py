@@ -0,0 +1,169 @@
+"""On-demand cProfile capture of single requests, kept in a bounded on-disk ring buffer.
+
+A request is profiled when an admin sends `X-Profile: 1` (or `?profile=1`), or when it is
+picked by 1-in-`PROFILING_SAMPLE_RATE` sampling. cProfile sees only Python running on the
+event loop thread, and only one request is profiled at a time. It also sees other requests
+interleaved on the loop during that time. Time spent awaiting SQL, the vector store, the LLM and
+the extractors is collected separately per request through the `app.core.metrics` timers
+and saved with the profile as `awaits`.
+"""
+import asyncio
+import cProfile
+import io
+import json
+import logging
+import pstats
+import random
+import re
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from app.core import metrics
+from app.core.auth_cache import decode_token, load_user
+from app.core.config import settings
+from app.db.session import get_session
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+_PROFILE_ID = re.compile(r"\d+-[0-9a-f]{8}")
+_TRUTHY = {"1", "true", "yes", "on"}
+
+# Only one cProfile can be attached to the loop's thread at a time.
+_busy = False
+
+
+def profile_dir() -> Path:
+    return Path(settings.profiling_dir or Path(settings.upload_dir) / "profiles")
+
+
+def valid_profile_id(profile_id: str) -> bool:
+    return bool(_PROFILE_ID.fullmatch(profile_id))
+
+
+def list_profiles() -> list[dict]:
+    """Saved profiles' metadata, newest first."""
+    profiles = []
+    for path in sorted(profile_dir().glob("*.json"), reverse=True):
+        try:
+            profiles.append(json.loads(path.read_text()))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(profile_id: str) -> Path | None:
+    path = profile_dir() / f"{profile_id}.prof"
+    return path if valid_profile_id(profile_id) and path.exists() else None
+
+
+def render_stats(path: Path, sort: str = "cumulative", limit: int = 50) -> str:
+    out = io.StringIO()
+    pstats.Stats(str(path), stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def _save(profiler: cProfile.Profile, meta: dict) -> None:
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(directory / f"{meta['id']}.prof"))
+    (directory / f"{meta['id']}.json").write_text(json.dumps(meta, ensure_ascii=False, indent=2))
+    # Ids start with a timestamp, so name order is age order.
+    for old in sorted(directory.glob("*.json"))[:-max(settings.profiling_max_profiles, 1)]:
+        old.unlink(missing_ok=True)
+        old.with_suffix(".prof").unlink(missing_ok=True)
+
+
+async def _is_admin(scope) -> bool:
+    if not settings.admin_username:
+        return False
+    authorization = dict(scope["headers"]).get(b"authorization", b"").decode("latin-1")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    payload = decode_token(token)
+    if not payload or "sub" not in payload:
+        return False
+    try:
+        user_id = int(payload["sub"])
+    except (ValueError, TypeError):
+        return False
+    async with get_session() as db:
+        user = await load_user(db, user_id)
+    return user is not None and user.username == settings.admin_username
+
+
+async def _trigger(scope) -> str | None:
+    requested = dict(scope["headers"]).get(PROFILE_HEADER, b"").decode("latin-1").lower() in _TRUTHY
+    if not requested and scope.get("query_string"):
+        values = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [])
+        requested = any(v.lower() in _TRUTHY for v in values)
+    if requested:
+        # Silently ignored for everyone else: a profile can reveal other users' requests.
+        return "request" if await _is_admin(scope) else None
+    rate = settings.profiling_sample_rate
+    if rate > 0 and random.random() < 1 / rate:
+        return "sample"
+    return None
+
+
+class ProfilingMiddleware:
+    """Profile selected requests; see the module docstring."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        global _busy
+        if scope["type"] != "http" or _busy or scope["path"].startswith("/api/v1/admin/profiles"):
+            await self.app(scope, receive, send)
+            return
+        trigger = await _trigger(scope)
+        if trigger is None or _busy:
+            await self.app(scope, receive, send)
+            return
+
+        _busy = True
+        status = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        breakdown: dict = {}
+        token = metrics._breakdown.set(breakdown)
+        profiler = cProfile.Profile()
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - started
+            metrics._breakdown.reset(token)
+            _busy = False
+            meta = {
+                "id": f"{time.time_ns()}-{uuid.uuid4().hex[:8]}",
+                "created_at": started_at.isoformat(),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None),
+                "status": status,
+                "duration_ms": round(elapsed * 1000, 2),
+                "trigger": trigger,
+                "awaits": {
+                    name: {"calls": calls, "ms": round(seconds * 1000, 2)}
+                    for name, (calls, seconds) in sorted(breakdown.items(), key=lambda kv: -kv[1][1])
+                },
+            }
+            try:
+                await asyncio.to_thread(_save, profiler, meta)
+                logger.info("Saved profile %s of %s %s (%.0f ms)", meta["id"], meta["method"], meta["path"], meta["duration_ms"])
+            except OSError:
+                logger.warning("Failed to save request profile", exc_info=True)
@@ -0,0 +1,77 @@
+"""Full-text index plumbing for `knowledge_items`.
+
+MySQL uses a FULLTEXT index with the ngram parser directly on the table. SQLite has no
+CJK-aware tokenizer, so items are mirrored into an FTS5 table with CJK runs pre-split
+into overlapping bigrams (the same thing MySQL's ngram parser does with size 2).
+"""
+import hashlib
+import re
+
+FTS_TABLE = "knowledge_items_fts"
+MYSQL_FULLTEXT_INDEX = "ft_items_text"
+
+SQLITE_FTS_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    "USING fts5(item_id UNINDEXED, title, summary, content, tokenize='unicode61')"
+)
+MYSQL_FULLTEXT_DDL = (
+    f"CREATE FULLTEXT INDEX {MYSQL_FULLTEXT_INDEX} ON knowledge_items (title, summary, content_text) WITH PARSER ngram"
+)
+
+_CJK_RUN_RE = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]+")
+
+
+def _bigrams(match: re.Match) -> str:
+    run = match.group(0)
+    if len(run) == 1:
+        return f" {run} "
+    return " " + " ".join(run[i:i + 2] for i in range(len(run) - 1)) + " "
+
+
+def segment_cjk(text: str | None) -> str:
+    """Split CJK runs into overlapping bigrams so unicode61 can index them as words."""
+    return _CJK_RUN_RE.sub(_bigrams, text or "")
+
+
+def fts_rowid(item_id: str) -> int:
+    # Item ids are UUID strings; FTS5 rows need an integer key for cheap point updates.
+    return int.from_bytes(hashlib.sha1(item_id.encode("utf-8")).digest()[:7], "big")
+
+
+def sqlite_upsert(connection, item_id: str, title: str | None, summary: str | None, content: str | None) -> None:
+    rowid = fts_rowid(item_id)
+    connection.exec_driver_sql(f"DELETE FROM {FTS_TABLE} WHERE rowid = ?", (rowid,))
+    connection.exec_driver_sql(
+        f"INSERT INTO {FTS_TABLE} (rowid, item_id, title, summary, content) VALUES (?, ?, ?, ?, ?)",
+        (rowid, item_id, segment_cjk(title), segment_cjk(summary), segment_cjk(content)),
+    )
+
+
+def sqlite_delete(connection, item_id: str) -> None:
+    connection.exec_driver_sql(f"DELETE FROM {FTS_TABLE} WHERE rowid = ?", (fts_rowid(item_id),))
+
+
+def ensure_index(connection) -> int:
+    """Create the SQLite FTS5 mirror if missing and rebuild it when it drifted from the table.
+
+    Returns the number of rows (re)indexed; a no-op on other dialects.
+    """
+    if connection.dialect.name != "sqlite":
+        return 0
+    connection.exec_driver_sql(SQLITE_FTS_DDL)
+    items = connection.exec_driver_sql("SELECT count(*) FROM knowledge_items").scalar()
+    indexed = connection.exec_driver_sql(f"SELECT count(*) FROM {FTS_TABLE}").scalar()
+    if items == indexed:
+        return 0
+    connection.exec_driver_sql(f"DELETE FROM {FTS_TABLE}")
+    last_id, total = "", 0
+    while True:
+        rows = connection.exec_driver_sql(
+            "SELECT id, title, summary, content_text FROM knowledge_items WHERE id > ? ORDER BY id LIMIT 500", (last_id,)
+        ).fetchall()
+        if not rows:
+            return total
+        for row in rows:
+            sqlite_upsert(connection, *row)
+        last_id = rows[-1][0]
+        total += len(rows)
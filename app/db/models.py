@@ -3,10 +3,12 @@ import uuid
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import JSON, Boolean, Column, DateTime, Enum, ForeignKey, Integer, String, Text
-from sqlalchemy.dialects.mysql import LONGTEXT
+from sqlalchemy import DDL, JSON, Boolean, Column, DateTime, Enum, ForeignKey, Index, Integer, LargeBinary, String, Text, UniqueConstraint, event, inspect
+from sqlalchemy.dialects.mysql import LONGBLOB, LONGTEXT
 from sqlalchemy.orm import declarative_base, relationship
 
+from app.db import fulltext
+
 Base = declarative_base()
 
 
@@ -16,6 +18,13 @@ class SourceType(str, enum.Enum):
     file = "file"
 
 
+class JobStatus(str, enum.Enum):
+    pending = "pending"
+    running = "running"
+    succeeded = "succeeded"
+    failed = "failed"
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -38,13 +47,97 @@ class KnowledgeItem(Base):
     original_filename = Column(String(255), nullable=True)
     file_path = Column(String(500), nullable=True)
     mime_type = Column(String(100), nullable=True)
-    content_text = Column(LONGTEXT, nullable=False)
+    content_text = Column(Text().with_variant(LONGTEXT, "mysql"), nullable=False)
     content_hash = Column(String(64), nullable=False, index=True)
+    file_hash = Column(String(64), nullable=True, index=True)
     summary = Column(Text, nullable=True)
     keywords = Column(JSON, default=list)
     tags = Column(JSON, default=list)
+    minhash = Column(LargeBinary, nullable=True)
+    duplicate_of = Column(String(36), nullable=True, index=True)
     is_deleted = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     owner = relationship("User", back_populates="items")
+
+    __table_args__ = (Index("idx_live_created_id", "is_deleted", "created_at", "id"),)
+
+
+# Full-text index: FULLTEXT (ngram) on MySQL; on SQLite an FTS5 mirror kept in sync on flush.
+event.listen(KnowledgeItem.__table__, "after_create", DDL(fulltext.MYSQL_FULLTEXT_DDL).execute_if(dialect="mysql"))
+event.listen(KnowledgeItem.__table__, "after_create", DDL(fulltext.SQLITE_FTS_DDL).execute_if(dialect="sqlite"))
+event.listen(KnowledgeItem.__table__, "after_drop", DDL(f"DROP TABLE IF EXISTS {fulltext.FTS_TABLE}").execute_if(dialect="sqlite"))
+
+_FULLTEXT_FIELDS = ("title", "summary", "content_text")
+
+
+@event.listens_for(KnowledgeItem, "after_insert")
+def _fulltext_insert(mapper, connection, target: KnowledgeItem) -> None:
+    if connection.dialect.name == "sqlite":
+        fulltext.sqlite_upsert(connection, target.id, target.title, target.summary, target.content_text)
+
+
+@event.listens_for(KnowledgeItem, "after_update")
+def _fulltext_update(mapper, connection, target: KnowledgeItem) -> None:
+    if connection.dialect.name != "sqlite":
+        return
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _FULLTEXT_FIELDS):
+        fulltext.sqlite_upsert(connection, target.id, target.title, target.summary, target.content_text)
+
+
+@event.listens_for(KnowledgeItem, "after_delete")
+def _fulltext_delete(mapper, connection, target: KnowledgeItem) -> None:
+    if connection.dialect.name == "sqlite":
+        fulltext.sqlite_delete(connection, target.id)
+
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    kind = Column(String(20), nullable=False)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.pending)
+    stage = Column(String(20), nullable=True)
+    payload = Column(JSON, default=dict)
+    progress = Column(JSON, default=dict)
+    result = Column(JSON, nullable=True)
+    item_id = Column(String(36), nullable=True)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    error = Column(Text, nullable=True)
+    run_after = Column(DateTime, default=datetime.utcnow)
+    locked_by = Column(String(64), nullable=True)
+    locked_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("idx_job_status_run_after", "status", "run_after"),
+        Index("idx_job_owner", "owner_id"),
+    )
+
+
+class EnrichmentCache(Base):
+    __tablename__ = "enrichment_cache"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    content_hash = Column(String(64), nullable=False)
+    provider = Column(String(50), nullable=False)
+    model = Column(String(100), nullable=False)
+    summary = Column(Text, nullable=True)
+    keywords = Column(JSON, default=list)
+    tags = Column(JSON, default=list)
+    embedding_model = Column(String(100), nullable=True)
+    chunking = Column(String(64), nullable=True)
+    embedding_dim = Column(Integer, nullable=True)
+    embeddings = Column(LargeBinary().with_variant(LONGBLOB, "mysql"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("content_hash", "provider", "model", name="uq_enrichment_key"),
+    )
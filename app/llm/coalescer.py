@@ -0,0 +1,74 @@
+import asyncio
+from functools import lru_cache
+from typing import List
+
+from app.core.config import settings
+from app.llm.providers.base import LLMProvider, get_provider
+
+
+class EmbeddingCoalescer:
+    """Collects concurrent `embed` calls into `provider.embed_batch` micro-batches.
+
+    A batch is sent as soon as `max_batch_size` texts are waiting, or `max_wait_ms`
+    after the first text of the batch arrived, whichever comes first. Batches go through
+    `provider.aembed_batch`, so they share the provider's concurrency limit and timeout.
+    """
+
+    def __init__(self, provider: LLMProvider, max_batch_size: int | None = None, max_wait_ms: float | None = None) -> None:
+        self.provider = provider
+        self.max_batch_size = max(1, max_batch_size or settings.embed_batch_max_size)
+        self.max_wait = (settings.embed_batch_max_wait_ms if max_wait_ms is None else max_wait_ms) / 1000
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._inflight: set[asyncio.Task] = set()
+
+    async def embed(self, text: str) -> List[float]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # State is bound to one event loop (tests and CLIs may create several).
+            self._loop = loop
+            self._pending = []
+            self._timer = None
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    async def embed_many(self, texts: List[str]) -> List[List[float]]:
+        return list(await asyncio.gather(*(self.embed(text) for text in texts)))
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[: self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        unique = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = await self.provider.aembed_batch(unique)
+            if len(vectors) != len(unique):
+                raise RuntimeError(f"Provider returned {len(vectors)} embeddings for {len(unique)} texts")
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        by_text = dict(zip(unique, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+
+@lru_cache()
+def get_embedding_coalescer() -> EmbeddingCoalescer:
+    return EmbeddingCoalescer(get_provider())
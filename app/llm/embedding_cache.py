@@ -0,0 +1,128 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import List
+
+from app.core.config import settings
+from app.llm.coalescer import get_embedding_coalescer
+from app.llm.providers.base import get_provider
+
+
+def normalize_query(text: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", text).split()).lower()
+
+
+def cache_key(provider: str, model: str, text: str) -> str:
+    return hashlib.sha256(f"{provider}\0{model}\0{normalize_query(text)}".encode("utf-8")).hexdigest()
+
+
+class _DiskTier:
+    """SQLite-backed second tier so hot queries survive restarts."""
+
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> List[float] | None:
+        with self._lock:
+            row = self._conn.execute("SELECT vector, expires_at FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+        if not row or row[1] < time.time():
+            return None
+        return array("f", row[0]).tolist()
+
+    def put(self, key: str, vector: List[float], expires_at: float) -> None:
+        blob = array("f", vector).tobytes()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_embeddings (key, vector, expires_at) VALUES (?, ?, ?)", (key, blob, expires_at)
+            )
+            self._conn.execute("DELETE FROM query_embeddings WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+
+
+class QueryEmbeddingCache:
+    """In-memory LRU + TTL cache of query embeddings with an optional SQLite tier."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float, disk_path: str | None = None) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries: OrderedDict[str, tuple[float, List[float]]] = OrderedDict()
+        self._disk = _DiskTier(disk_path) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> List[float] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, vector = entry
+        if expires_at < time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return vector
+
+    def put(self, key: str, vector: List[float], expires_at: float | None = None) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (expires_at or time.time() + self.ttl, vector)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_embed(self, key: str, text: str) -> List[float]:
+        vector = self.get(key)
+        if vector is not None:
+            self.hits += 1
+            return vector
+        if self._disk is not None:
+            vector = await asyncio.to_thread(self._disk.get, key)
+            if vector is not None:
+                self.disk_hits += 1
+                self.put(key, vector)
+                return vector
+        self.misses += 1
+        vector = await get_embedding_coalescer().embed(text)
+        expires_at = time.time() + self.ttl
+        self.put(key, vector, expires_at)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.put, key, vector, expires_at)
+        return vector
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "disk_enabled": self._disk is not None,
+        }
+
+
+@lru_cache()
+def get_query_cache() -> QueryEmbeddingCache:
+    return QueryEmbeddingCache(settings.query_cache_size, settings.query_cache_ttl_seconds, settings.query_cache_path)
+
+
+async def embed_query(text: str) -> List[float]:
+    provider = get_provider()
+    key = cache_key(provider.name, provider.embedding_model, text)
+    return await get_query_cache().get_or_embed(key, text)
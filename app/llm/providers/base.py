@@ -1,12 +1,62 @@
+import asyncio
+import contextvars
 import os
 from abc import ABC, abstractmethod
-from functools import lru_cache
-from typing import List
+from functools import lru_cache, partial
+from typing import Awaitable, Callable, List, Protocol, TypeVar
+
+from pydantic import BaseModel, Field, ValidationInfo, field_validator
 
 from app.core.config import settings
+from app.core.metrics import LLM_ERRORS, LLM_SECONDS, timed
+
+
+MAX_KEYWORDS = 8
+MAX_TAGS = 5
+
+
+class EnrichmentResult(BaseModel):
+    """Schema of the combined summary/keywords/tags output."""
+
+    summary: str
+    keywords: List[str] = Field(default_factory=list)
+    tags: List[str] = Field(default_factory=list)
+
+    @field_validator("keywords", "tags", mode="before")
+    @classmethod
+    def _split_terms(cls, value, info: ValidationInfo):
+        # Models sometimes answer with "a, b, c" instead of a JSON list, or ignore the length limit.
+        if isinstance(value, str):
+            value = value.split(",")
+        terms = list(dict.fromkeys(str(v).strip() for v in value or [] if str(v).strip()))
+        return terms[:MAX_KEYWORDS if info.field_name == "keywords" else MAX_TAGS]
+
+
+T = TypeVar("T")
+
+
+class AsyncLLMProvider(Protocol):
+    """The coroutine API used by the ingest pipeline and search."""
+
+    async def asummarize(self, text: str) -> str: ...
+
+    async def aextract_keywords(self, text: str) -> List[str]: ...
+
+    async def agenerate_tags(self, text: str) -> List[str]: ...
+
+    async def aenrich(self, text: str) -> EnrichmentResult: ...
+
+    async def aembed(self, text: str) -> List[float]: ...
+
+    async def aembed_batch(self, texts: List[str]) -> List[List[float]]: ...
 
 
 class LLMProvider(ABC):
+    # Identify the provider/model pair in caches keyed by embedding space.
+    name: str = "base"
+    model: str = ""
+    embedding_model: str = ""
+
     @abstractmethod
     def summarize(self, text: str) -> str: ...
 
@@ -19,6 +69,79 @@ class LLMProvider(ABC):
     @abstractmethod
     def embed(self, text: str) -> List[float]: ...
 
+    def enrich(self, text: str) -> EnrichmentResult:
+        """Summary, keywords and tags in one go; providers that can do it in one call should override this."""
+        return EnrichmentResult(
+            summary=self.summarize(text),
+            keywords=self.extract_keywords(text),
+            tags=self.generate_tags(text),
+        )
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed several texts at once; providers with a native batch API should override this."""
+        return [self.embed(text) for text in texts]
+
+    # Async API. The defaults adapt the sync methods by running them in a worker thread
+    # (`_guard_thread`); providers with a native async client override these and use
+    # `_guard`. Both apply the per-provider concurrency limit and timeout.
+
+    def _limiter(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if getattr(self, "_limiter_loop", None) is not loop:
+            self._limiter_loop = loop
+            self._semaphore = asyncio.Semaphore(max(settings.llm_max_concurrency, 1))
+        return self._semaphore
+
+    async def _guard(self, fn: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        async with self._limiter():
+            return await asyncio.wait_for(fn(*args, **kwargs), timeout=settings.llm_timeout_seconds)
+
+    async def _guard_thread(self, fn: Callable[..., T], *args) -> T:
+        """Run a blocking provider call in a thread under the concurrency limit and timeout.
+
+        A thread cannot be cancelled, so on timeout the caller gets the error but the slot stays
+        taken until the call actually returns; otherwise slow providers would pile up threads.
+        """
+        semaphore = self._limiter()
+        await semaphore.acquire()
+        try:
+            context = contextvars.copy_context()
+            future = asyncio.get_running_loop().run_in_executor(None, partial(context.run, fn, *args))
+        except BaseException:
+            semaphore.release()
+            raise
+        future.add_done_callback(lambda _: semaphore.release())
+        return await asyncio.wait_for(asyncio.shield(future), timeout=settings.llm_timeout_seconds)
+
+    @timed(LLM_SECONDS, LLM_ERRORS, operation="summarize")
+    async def asummarize(self, text: str) -> str:
+        return await self._guard_thread(self.summarize, text)
+
+    @timed(LLM_SECONDS, LLM_ERRORS, operation="keywords")
+    async def aextract_keywords(self, text: str) -> List[str]:
+        return await self._guard_thread(self.extract_keywords, text)
+
+    @timed(LLM_SECONDS, LLM_ERRORS, operation="tags")
+    async def agenerate_tags(self, text: str) -> List[str]:
+        return await self._guard_thread(self.generate_tags, text)
+
+    @timed(LLM_SECONDS, LLM_ERRORS, operation="enrich")
+    async def aenrich(self, text: str) -> EnrichmentResult:
+        if type(self).enrich is not LLMProvider.enrich:
+            return await self._guard_thread(self.enrich, text)
+        summary, keywords, tags = await asyncio.gather(
+            self.asummarize(text), self.aextract_keywords(text), self.agenerate_tags(text)
+        )
+        return EnrichmentResult(summary=summary, keywords=keywords, tags=tags)
+
+    @timed(LLM_SECONDS, LLM_ERRORS, operation="embed")
+    async def aembed(self, text: str) -> List[float]:
+        return await self._guard_thread(self.embed, text)
+
+    @timed(LLM_SECONDS, LLM_ERRORS, operation="embed_batch")
+    async def aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        return await self._guard_thread(self.embed_batch, texts)
+
 
 @lru_cache()
 def get_provider() -> LLMProvider:
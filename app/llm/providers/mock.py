@@ -7,6 +7,10 @@ from app.llm.providers.base import LLMProvider
 
 
 class MockProvider(LLMProvider):
+    name = "mock"
+    model = "mock"
+    embedding_model = f"mock-{settings.embedding_dim}"
+
     def summarize(self, text: str) -> str:
         return text[:200] + ("..." if len(text) > 200 else "")
 
@@ -18,5 +22,9 @@ class MockProvider(LLMProvider):
         return ["mock", "auto"]
 
     def embed(self, text: str) -> List[float]:
-        random.seed(hashlib.sha256(text.encode()).hexdigest())
-        return [random.random() for _ in range(settings.embedding_dim)]
+        # A private generator keeps this deterministic when called from several threads.
+        rng = random.Random(hashlib.sha256(text.encode()).hexdigest())
+        return [rng.random() for _ in range(settings.embedding_dim)]
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed(text) for text in texts]
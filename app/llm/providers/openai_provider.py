@@ -1,15 +1,31 @@
+import asyncio
+import logging
 from typing import List
 import openai
 
 from app.core.config import settings
-from app.llm.providers.base import LLMProvider
+from app.core.metrics import LLM_ERRORS, LLM_SECONDS, timed
+from app.llm.providers.base import MAX_KEYWORDS, MAX_TAGS, EnrichmentResult, LLMProvider
+
+logger = logging.getLogger(__name__)
+
+ENRICH_PROMPT = (
+    "You annotate documents for a knowledge base. Reply with a JSON object with exactly these keys: "
+    '"summary" (a concise summary in the language of the document), '
+    f'"keywords" (a list of up to {MAX_KEYWORDS} key terms) and '
+    f'"tags" (a list of up to {MAX_TAGS} short topical tags).'
+)
 
 
 class OpenAIProvider(LLMProvider):
+    name = "openai"
+
     def __init__(self) -> None:
         openai.api_key = settings.openai_api_key
         openai.base_url = getattr(openai, "base_url", None) or None
         self.model = settings.openai_model
+        self.embedding_model = settings.openai_embedding_model
+        self._aclient = openai.AsyncOpenAI(api_key=settings.openai_api_key, base_url=openai.base_url)
 
     def summarize(self, text: str) -> str:
         resp = openai.chat.completions.create(model=self.model, messages=[{"role": "user", "content": f"Summarize: {text}"}])
@@ -23,6 +39,69 @@ class OpenAIProvider(LLMProvider):
         resp = openai.chat.completions.create(model=self.model, messages=[{"role": "user", "content": f"Tags: {text}"}])
         return [k.strip() for k in resp.choices[0].message.content.split(',') if k.strip()]
 
+    def enrich(self, text: str) -> EnrichmentResult:
+        try:
+            resp = openai.chat.completions.create(
+                model=self.model,
+                response_format={"type": "json_object"},
+                messages=[{"role": "system", "content": ENRICH_PROMPT}, {"role": "user", "content": text}],
+            )
+            return EnrichmentResult.model_validate_json(resp.choices[0].message.content or "")
+        except (ValueError, openai.BadRequestError) as exc:
+            # Invalid JSON/schema, or a model without JSON mode: fall back to one call per field.
+            logger.warning("Structured enrichment failed, falling back to separate calls: %s", exc)
+            return super().enrich(text)
+
     def embed(self, text: str) -> List[float]:
-        resp = openai.embeddings.create(model="text-embedding-3-small", input=text)
+        resp = openai.embeddings.create(model=self.embedding_model, input=text)
         return resp.data[0].embedding
+
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        resp = openai.embeddings.create(model=self.embedding_model, input=texts)
+        return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
+
+    async def _achat(self, **kwargs) -> str:
+        resp = await self._guard(self._aclient.chat.completions.create, model=self.model, **kwargs)
+        return resp.choices[0].message.content or ""
+
+    @timed(LLM_SECONDS, LLM_ERRORS, operation="summarize")
+    async def asummarize(self, text: str) -> str:
+        return await self._achat(messages=[{"role": "user", "content": f"Summarize: {text}"}])
+
+    @timed(LLM_SECONDS, LLM_ERRORS, operation="keywords")
+    async def aextract_keywords(self, text: str) -> List[str]:
+        content = await self._achat(messages=[{"role": "user", "content": f"Keywords list: {text}"}])
+        return [k.strip() for k in content.split(',') if k.strip()]
+
+    @timed(LLM_SECONDS, LLM_ERRORS, operation="tags")
+    async def agenerate_tags(self, text: str) -> List[str]:
+        content = await self._achat(messages=[{"role": "user", "content": f"Tags: {text}"}])
+        return [k.strip() for k in content.split(',') if k.strip()]
+
+    @timed(LLM_SECONDS, LLM_ERRORS, operation="enrich")
+    async def aenrich(self, text: str) -> EnrichmentResult:
+        try:
+            content = await self._achat(
+                response_format={"type": "json_object"},
+                messages=[{"role": "system", "content": ENRICH_PROMPT}, {"role": "user", "content": text}],
+            )
+            return EnrichmentResult.model_validate_json(content)
+        except (ValueError, openai.BadRequestError) as exc:
+            logger.warning("Structured enrichment failed, falling back to separate calls: %s", exc)
+            summary, keywords, tags = await asyncio.gather(
+                self.asummarize(text), self.aextract_keywords(text), self.agenerate_tags(text)
+            )
+            return EnrichmentResult(summary=summary, keywords=keywords, tags=tags)
+
+    @timed(LLM_SECONDS, LLM_ERRORS, operation="embed")
+    async def aembed(self, text: str) -> List[float]:
+        return (await self.aembed_batch([text]))[0]
+
+    @timed(LLM_SECONDS, LLM_ERRORS, operation="embed_batch")
+    async def aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        resp = await self._guard(self._aclient.embeddings.create, model=self.embedding_model, input=texts)
+        return [d.embedding for d in sorted(resp.data, key=lambda d: d.index)]
@@ -1,14 +1,22 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, PlainTextResponse
 
 from app.api.v1.router import api_router
 from app.core.config import settings
 from app.core.logging import setup_logging
+from app.core import metrics, profiling
 from app.ui.routes import ui_router
+from app.db import fulltext
 from app.db.models import Base, User
 from app.db.session import engine, AsyncSessionLocal
-from app.core.security import get_password_hash
+from app.core.security import aget_password_hash
+from app.services.extractors.engine import shutdown_extraction_pool
+from app.services.extractors.fetcher import close_fetcher
+from app.services.indexing.store import close_store, init_store
+from app.services.ingest import near_duplicates
+from app.services.jobs.queue import start_worker_pool, stop_worker_pool
+from app.services.storage.file_store import UploadLimitMiddleware
 from sqlalchemy import select
 import asyncio
 
@@ -23,22 +31,43 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(UploadLimitMiddleware)
+if settings.metrics_enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+if settings.profiling_enabled:
+    # Outermost, so a profile covers the metrics middleware too.
+    app.add_middleware(profiling.ProfilingMiddleware)
+if settings.metrics_enabled or settings.profiling_enabled:
+    metrics.instrument_engine(engine)
 
 
 @app.on_event("startup")
 async def on_startup() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(fulltext.ensure_index)
     if settings.admin_username and settings.admin_password:
         async with AsyncSessionLocal() as session:
             result = await session.execute(select(User).where(User.username == settings.admin_username))
             if not result.scalars().first():
                 user = User(
                     username=settings.admin_username,
-                    password_hash=get_password_hash(settings.admin_password),
+                    password_hash=await aget_password_hash(settings.admin_password),
                 )
                 session.add(user)
                 await session.commit()
+    await init_store()
+    # Built in the background; a lookup that arrives first waits for it.
+    app.state.near_dup_index_task = asyncio.create_task(near_duplicates.build_index())
+    await start_worker_pool()
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    await stop_worker_pool()
+    await close_store()
+    await close_fetcher()
+    shutdown_extraction_pool()
 
 
 @app.get("/health")
@@ -46,6 +75,13 @@ async def health():
     return {"success": True, "data": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_endpoint():
+    if not settings.metrics_enabled:
+        return JSONResponse(status_code=404, content={"success": False, "error": {"code": "not_found", "message": "Metrics are disabled"}})
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(_, exc: Exception):
     return JSONResponse(
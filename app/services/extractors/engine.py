@@ -0,0 +1,214 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.metrics import EXTRACT_ERRORS, EXTRACT_SECONDS, timed
+from app.services.extractors import file_extractor
+
+logger = logging.getLogger(__name__)
+
+# Extra time the parent waits beyond EXTRACT_TIMEOUT_SECONDS for a worker to honour its deadline.
+_DEADLINE_GRACE_SECONDS = 5.0
+
+
+class ExtractionTimeout(Exception):
+    """Raised inside a pool worker when its document's deadline passes."""
+
+
+def _on_deadline(signum, frame) -> None:
+    raise ExtractionTimeout()
+
+
+def _init_worker(memory_limit_mb: int, pids) -> None:
+    # Reported so the parent can kill a worker stuck in native code without private pool state.
+    pids.put(os.getpid())
+    if hasattr(signal, "setitimer"):
+        signal.signal(signal.SIGALRM, _on_deadline)
+    # Cap the address space so a pathological document dies with MemoryError instead of
+    # swapping the host. RLIMIT_AS only exists on POSIX.
+    if memory_limit_mb <= 0:
+        return
+    try:
+        import resource
+    except ImportError:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _run_until(deadline: float, fn, *args):
+    """Run `fn` in a pool worker, interrupting it at the wall-clock `deadline`.
+
+    The task stops itself, so a slow document frees its worker without disturbing the
+    other tasks in the pool. Without SIGALRM (Windows) only the parent's timeout applies.
+    """
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise ExtractionTimeout()
+    if not hasattr(signal, "setitimer"):
+        return fn(*args)
+    signal.setitimer(signal.ITIMER_REAL, remaining)
+    try:
+        return fn(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+class _WorkerPool:
+    """A process pool plus what is needed to kill its workers: their pids and its open documents."""
+
+    def __init__(self) -> None:
+        context = multiprocessing.get_context("spawn")  # forking a process that runs an event loop and threads is not safe
+        self._pids = context.SimpleQueue()
+        self.executor = ProcessPoolExecutor(
+            max_workers=settings.extract_workers or os.cpu_count() or 1,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(settings.extract_memory_limit_mb, self._pids),
+        )
+        self.active = 0
+        self.retired = False
+
+    def terminate(self) -> None:
+        # Killing a worker breaks the whole executor, so this only runs once no other
+        # document is still using the pool.
+        while not self._pids.empty():
+            pid = self._pids.get()
+            try:
+                os.kill(pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+            except ProcessLookupError:
+                pass
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+_pool: _WorkerPool | None = None
+# Pools that stopped taking work but still have documents in flight.
+_retired: set[_WorkerPool] = set()
+
+
+def _current_pool() -> _WorkerPool:
+    global _pool
+    if _pool is None:
+        _pool = _WorkerPool()
+    return _pool
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    return _current_pool().executor
+
+
+def _retire_pool(pool: _WorkerPool) -> None:
+    """Route new work to a fresh pool; `pool`'s workers are killed once its last document is done."""
+    global _pool
+    if _pool is pool:
+        _pool = None
+    if not pool.retired:
+        pool.retired = True
+        _retired.add(pool)
+
+
+def _release_pool(pool: _WorkerPool) -> None:
+    pool.active -= 1
+    if pool.retired and pool.active <= 0:
+        _retired.discard(pool)
+        pool.terminate()
+
+
+def shutdown_extraction_pool() -> None:
+    # Kills the workers instead of waiting for them, so a stuck parser cannot block shutdown
+    # (the jobs whose extractions are cut off here are retried).
+    global _pool
+    pools = list(_retired) + ([_pool] if _pool is not None else [])
+    _pool = None
+    _retired.clear()
+    for pool in pools:
+        pool.terminate()
+
+
+def page_ranges(page_count: int, per_task: int) -> list[tuple[int, int]]:
+    per_task = max(per_task, 1)
+    return [(start, min(start + per_task, page_count)) for start in range(0, page_count, per_task)]
+
+
+def _cache_path(file_hash: str) -> Path:
+    return Path(settings.upload_dir) / "text" / file_hash[:2] / file_hash[2:4] / f"{file_hash}.txt"
+
+
+def _read_cache(file_hash: str) -> str | None:
+    path = _cache_path(file_hash)
+    return path.read_text(encoding="utf-8") if path.exists() else None
+
+
+def _write_cache(file_hash: str, text: str) -> None:
+    path = _cache_path(file_hash)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_name, path)
+
+
+async def _extract(pool: ProcessPoolExecutor, path: str, deadline: float) -> str:
+    loop = asyncio.get_running_loop()
+    kind = file_extractor.file_kind(path)
+    if kind == "docx":
+        return await loop.run_in_executor(pool, _run_until, deadline, file_extractor.extract_docx, path)
+    if kind == "plain":
+        return await loop.run_in_executor(pool, _run_until, deadline, file_extractor.extract_plain, path)
+    page_count = await loop.run_in_executor(pool, _run_until, deadline, file_extractor.pdf_page_count, path)
+    parts = await asyncio.gather(*(
+        loop.run_in_executor(pool, _run_until, deadline, file_extractor.extract_pdf_pages, path, start, end)
+        for start, end in page_ranges(page_count, settings.extract_pdf_pages_per_task)
+    ))
+    return "\n".join(parts)
+
+
+@timed(EXTRACT_SECONDS, EXTRACT_ERRORS, kind="file")
+async def extract_file(path: str, mime: str | None = None, file_hash: str | None = None) -> str:
+    """Extract a stored upload in the process pool; large PDFs are split into page ranges.
+
+    Text is cached by the upload's SHA-256. A document that exceeds the timeout or the
+    memory limit fails permanently (422). Its tasks stop themselves at the deadline. A worker
+    stuck in native code past the grace period ignores that, so new work moves to a fresh pool
+    and the old pool's workers are killed as soon as its other documents have finished.
+    """
+    use_cache = settings.extract_cache_enabled and file_hash
+    if use_cache:
+        cached = await asyncio.to_thread(_read_cache, file_hash)
+        if cached is not None:
+            return cached
+    pool = _current_pool()
+    pool.active += 1
+    deadline = time.time() + settings.extract_timeout_seconds
+    try:
+        text = await asyncio.wait_for(
+            _extract(pool.executor, path, deadline), timeout=settings.extract_timeout_seconds + _DEADLINE_GRACE_SECONDS,
+        )
+    except ExtractionTimeout:
+        raise HTTPException(status_code=422, detail="Document extraction timed out")
+    except asyncio.TimeoutError:
+        logger.warning("Extraction of %s ignored its %ss deadline, replacing the pool", path, settings.extract_timeout_seconds)
+        _retire_pool(pool)
+        raise HTTPException(status_code=422, detail="Document extraction timed out")
+    except MemoryError:
+        raise HTTPException(status_code=422, detail="Document exceeds the extraction memory limit")
+    except BrokenProcessPool:
+        # A worker died (OOM killer, segfault in a parser); the executor has already failed
+        # every task of that pool, so later work needs a new one.
+        _retire_pool(pool)
+        raise RuntimeError("Extraction worker died; the job will be retried")
+    finally:
+        _release_pool(pool)
+    if use_cache:
+        await asyncio.to_thread(_write_cache, file_hash, text)
+    return text
@@ -0,0 +1,165 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from collections import Counter
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import NamedTuple
+from urllib.parse import urlsplit
+
+import httpx
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+# Client errors that are worth retrying; any other 4xx fails the job for good.
+_TRANSIENT_STATUSES = {408, 425, 429}
+
+
+class FetchClientError(HTTPException):
+    """The server answered with a client error status that retrying will not change."""
+
+    def __init__(self, upstream_status: int) -> None:
+        super().__init__(status_code=400, detail=f"Failed to fetch url: {upstream_status}")
+        self.upstream_status = upstream_status
+
+
+class FetchResult(NamedTuple):
+    url: str
+    status: int
+    html: str
+    from_cache: bool
+
+
+class _ResponseCache:
+    """Validators and bodies of cacheable responses, one JSON + body file pair per URL."""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = Path(directory)
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = self.directory / key[:2] / key
+        return base.with_suffix(".json"), base.with_suffix(".body")
+
+    def load(self, url: str) -> tuple[dict, bytes] | None:
+        meta_path, body_path = self._paths(url)
+        try:
+            return json.loads(meta_path.read_text(encoding="utf-8")), body_path.read_bytes()
+        except (OSError, ValueError):
+            return None
+
+    def store(self, url: str, meta: dict, body: bytes) -> None:
+        meta_path, body_path = self._paths(url)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        # Body first, then metadata, each via rename: a reader never sees a half-written pair.
+        for path, data in ((body_path, body), (meta_path, json.dumps(meta).encode("utf-8"))):
+            fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_name, path)
+
+
+def _decode(body: bytes, encoding: str | None) -> str:
+    try:
+        return body.decode(encoding or "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+class UrlFetcher:
+    """Fetches pages over one pooled `httpx.AsyncClient` with conditional-request caching.
+
+    Redirects, response size and concurrent connections per host are capped. Client errors
+    (4xx, size and redirect limits) raise `HTTPException` so jobs do not retry them; server
+    and network errors stay retryable.
+    """
+
+    def __init__(self, client: httpx.AsyncClient | None = None, cache_dir: str | None = None) -> None:
+        self.client = client or httpx.AsyncClient(
+            follow_redirects=True,
+            max_redirects=settings.fetch_max_redirects,
+            timeout=settings.fetch_timeout_seconds,
+            headers={"User-Agent": settings.fetch_user_agent},
+            limits=httpx.Limits(max_connections=settings.fetch_max_connections),
+        )
+        if cache_dir is None and settings.fetch_cache_enabled:
+            cache_dir = settings.fetch_cache_dir or str(Path(settings.upload_dir) / "http-cache")
+        self.cache = _ResponseCache(cache_dir) if cache_dir else None
+        # Only hosts with a fetch in flight are tracked, so a long crawl does not accumulate them.
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+        self._host_users: Counter[str] = Counter()
+
+    @asynccontextmanager
+    async def _host_slot(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(max(settings.fetch_per_host_connections, 1))
+        semaphore = self._host_limits[host]
+        self._host_users[host] += 1
+        try:
+            async with semaphore:
+                yield
+        finally:
+            self._host_users[host] -= 1
+            if not self._host_users[host]:
+                del self._host_users[host], self._host_limits[host]
+
+    async def fetch(self, url: str) -> FetchResult:
+        cached = await asyncio.to_thread(self.cache.load, url) if self.cache else None
+        headers = {}
+        if cached:
+            meta = cached[0]
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        async with self._host_slot(url):
+            try:
+                async with self.client.stream("GET", url, headers=headers) as resp:
+                    if resp.status_code == 304 and cached:
+                        meta, body = cached
+                        return FetchResult(str(resp.url), 200, _decode(body, meta.get("encoding")), True)
+                    if 400 <= resp.status_code < 500 and resp.status_code not in _TRANSIENT_STATUSES:
+                        raise FetchClientError(resp.status_code)
+                    if resp.status_code != 200:
+                        raise ValueError(f"Failed to fetch url: {resp.status_code}")
+                    declared = int(resp.headers.get("content-length") or 0)
+                    if declared > settings.fetch_max_bytes:
+                        raise HTTPException(status_code=422, detail="Page exceeds the fetch size limit")
+                    chunks, size = [], 0
+                    async for chunk in resp.aiter_bytes():
+                        size += len(chunk)
+                        if size > settings.fetch_max_bytes:
+                            raise HTTPException(status_code=422, detail="Page exceeds the fetch size limit")
+                        chunks.append(chunk)
+                    body = b"".join(chunks)
+                    final_url, encoding = str(resp.url), resp.charset_encoding
+                    validators = {"etag": resp.headers.get("etag"), "last_modified": resp.headers.get("last-modified")}
+            except httpx.TooManyRedirects as exc:
+                raise HTTPException(status_code=400, detail="Too many redirects") from exc
+        if self.cache and (validators["etag"] or validators["last_modified"]):
+            await asyncio.to_thread(self.cache.store, url, {**validators, "url": final_url, "encoding": encoding}, body)
+        return FetchResult(final_url, 200, _decode(body, encoding), False)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+_fetcher: UrlFetcher | None = None
+
+
+def get_fetcher() -> UrlFetcher:
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = UrlFetcher()
+    return _fetcher
+
+
+async def close_fetcher() -> None:
+    global _fetcher
+    if _fetcher is not None:
+        await _fetcher.close()
+        _fetcher = None
@@ -3,14 +3,41 @@ from docx import Document
 from pypdf import PdfReader
 
 
-def extract_from_file(path: str, mime: str | None = None) -> str:
+# The functions below run inside the extraction process pool (see engine.py), so they
+# must stay top-level and only take/return picklable values.
+
+def pdf_page_count(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+
+def extract_pdf_pages(path: str, start: int, end: int) -> str:
+    reader = PdfReader(path)
+    return "\n".join(reader.pages[i].extract_text() or "" for i in range(start, min(end, len(reader.pages))))
+
+
+def extract_docx(path: str) -> str:
+    doc = Document(path)
+    return "\n".join(p.text for p in doc.paragraphs)
+
+
+def extract_plain(path: str) -> str:
+    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+        return f.read()
+
+
+def file_kind(path: str) -> str:
     _, ext = os.path.splitext(path.lower())
     if ext.endswith(".pdf"):
-        reader = PdfReader(path)
-        text = "\n".join(page.extract_text() or "" for page in reader.pages)
-        return text
+        return "pdf"
     if ext.endswith(".docx"):
-        doc = Document(path)
-        return "\n".join(p.text for p in doc.paragraphs)
-    with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-        return f.read()
+        return "docx"
+    return "plain"
+
+
+def extract_from_file(path: str, mime: str | None = None) -> str:
+    kind = file_kind(path)
+    if kind == "pdf":
+        return extract_pdf_pages(path, 0, pdf_page_count(path))
+    if kind == "docx":
+        return extract_docx(path)
+    return extract_plain(path)
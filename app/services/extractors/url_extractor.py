@@ -1,13 +1,15 @@
-import requests
+import asyncio
+
 import trafilatura
 
+from app.core.metrics import EXTRACT_ERRORS, EXTRACT_SECONDS, timed
+from app.services.extractors.fetcher import get_fetcher
+
 
-def extract_from_url(url: str) -> tuple[str, str]:
-    resp = requests.get(url, timeout=10)
-    if resp.status_code != 200:
-        raise ValueError(f"Failed to fetch url: {resp.status_code}")
-    downloaded = trafilatura.fetch_url(url)
-    text = trafilatura.extract(downloaded) if downloaded else None
-    if not text:
-        text = resp.text
-    return text, resp.text
+@timed(EXTRACT_SECONDS, EXTRACT_ERRORS, kind="url")
+async def extract_from_url(url: str) -> tuple[str, str]:
+    """Fetch the page once and extract its main text; returns (text, raw html)."""
+    page = await get_fetcher().fetch(url)
+    # trafilatura is CPU-bound lxml work; keep it off the event loop.
+    text = await asyncio.to_thread(trafilatura.extract, page.html)
+    return text or page.html, page.html
@@ -0,0 +1,474 @@
+"""Embedded vector store: brute-force cosine search over a memory-mapped matrix.
+
+Same interface as `QdrantStore`, for single-node deployments (`VECTOR_BACKEND=local`) and as
+the read fallback mirror of a Qdrant deployment (`VECTOR_LOCAL_FALLBACK`). Each collection
+is a directory under `LOCAL_VECTOR_DIR`:
+
+- `vectors.<dtype>`: a `(capacity, dim)` matrix of unit-normalized float32 or int8 rows;
+- `points.jsonl`: an append-only journal of row assignments (point id + payload) and
+  deletions, replayed on open and compacted when mostly dead;
+- `meta.json`: dim and dtype.
+
+Aliases live in `aliases.json` next to the collection directories. Search cost is one
+matrix-vector product over all rows, run off the event loop.
+
+The row allocator and journal are per process, so only one process may write an index
+directory; opening a store takes an exclusive `flock` on `<root>/.writer.lock`.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+import numpy as np
+from qdrant_client.http.models import FieldCondition, Filter, HasIdCondition, MatchAny, MatchValue, PointStruct, ScoredPoint
+
+from app.core.config import settings
+from app.core.metrics import VECTOR_ERRORS, VECTOR_SECONDS, timed
+from app.llm.embedding_cache import embed_query
+from app.services.indexing.qdrant_store import (
+    _collection_version, aggregate_chunk_hits, chunk_points, versioned_collection_name,
+)
+
+try:
+    import fcntl
+except ImportError:  # Windows: keeping to one writer is up to the deployment.
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_INT8_SCALE = 127.0
+_MIN_CAPACITY = 1024
+# Rows scored per matrix product, bounding the temporary float copy of an int8 matrix.
+_SCORE_BLOCK = 65536
+
+
+def _root() -> Path:
+    return Path(settings.local_vector_dir or Path(settings.upload_dir) / "vectors")
+
+
+class LocalIndexLocked(RuntimeError):
+    """Another process is already writing the local index directory."""
+
+
+# Lock files held by this process, by index root; held until the process exits.
+_writer_locks: dict[str, object] = {}
+
+
+def acquire_writer_lock(root: Path) -> None:
+    key = str(root.resolve())
+    if fcntl is None or key in _writer_locks:
+        return
+    root.mkdir(parents=True, exist_ok=True)
+    handle = open(root / ".writer.lock", "a")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        raise LocalIndexLocked(f"The local vector index in {root} is in use by another process")
+    _writer_locks[key] = handle
+
+
+def _values(payload: dict, key: str) -> list:
+    value = payload.get(key)
+    return value if isinstance(value, list) else [value]
+
+
+def matches_filter(point_id: str, payload: dict, query_filter: Filter | None) -> bool:
+    """Evaluate the subset of Qdrant filters the app builds (match / match-any / range / has-id)."""
+    if query_filter is None:
+        return True
+    if query_filter.must and not all(_matches_condition(point_id, payload, c) for c in query_filter.must):
+        return False
+    if query_filter.should and not any(_matches_condition(point_id, payload, c) for c in query_filter.should):
+        return False
+    if query_filter.must_not and any(_matches_condition(point_id, payload, c) for c in query_filter.must_not):
+        return False
+    return True
+
+
+def _matches_condition(point_id: str, payload: dict, condition) -> bool:
+    if isinstance(condition, Filter):
+        return matches_filter(point_id, payload, condition)
+    if isinstance(condition, HasIdCondition):
+        return point_id in {str(i) for i in condition.has_id}
+    if not isinstance(condition, FieldCondition):
+        raise ValueError(f"Unsupported filter condition: {type(condition).__name__}")
+    values = [v for v in _values(payload, condition.key) if v is not None]
+    if isinstance(condition.match, MatchValue):
+        return condition.match.value in values
+    if isinstance(condition.match, MatchAny):
+        return any(v in condition.match.any for v in values)
+    if condition.range is not None:
+        r = condition.range
+        return any(
+            (r.gte is None or v >= r.gte) and (r.gt is None or v > r.gt)
+            and (r.lte is None or v <= r.lte) and (r.lt is None or v < r.lt)
+            for v in values
+        )
+    raise ValueError(f"Unsupported field condition on {condition.key}")
+
+
+class LocalCollection:
+    """One collection directory; thread-safe, opened once per process (see `_open`)."""
+
+    def __init__(self, path: Path, dim: int, dtype: str) -> None:
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        meta_path = path / "meta.json"
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            dim, dtype = meta["dim"], meta["dtype"]
+        else:
+            meta_path.write_text(json.dumps({"dim": dim, "dtype": dtype}))
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        self._ids: list[str | None] = []
+        self._payloads: list[dict | None] = []
+        self._rows: dict[str, int] = {}
+        self._by_item: dict[str, set[str]] = {}
+        self._free: list[int] = []
+        self._journal_lines = 0
+        self._vectors_path = path / f"vectors.{self.dtype.name}"
+        self._journal_path = path / "points.jsonl"
+        self._matrix = None
+        self._replay()
+        self._map(max(len(self._ids), _MIN_CAPACITY))
+        self._journal = open(self._journal_path, "a", encoding="utf-8")
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _replay(self) -> None:
+        if not self._journal_path.exists():
+            return
+        with open(self._journal_path, encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash mid-write; its vector row is simply unused.
+                    break
+                self._journal_lines += 1
+                self._set_row(entry["row"], entry.get("id"), entry.get("payload"))
+        self._free = [row for row, point_id in enumerate(self._ids) if point_id is None]
+        if self._journal_lines > 2 * len(self._rows) + 1000:
+            self._compact()
+
+    def _set_row(self, row: int, point_id: str | None, payload: dict | None) -> None:
+        while len(self._ids) <= row:
+            self._ids.append(None)
+            self._payloads.append(None)
+        previous = self._ids[row]
+        if previous is not None and self._rows.get(previous) == row:
+            del self._rows[previous]
+            item_points = self._by_item.get(self._item_id(previous, self._payloads[row]))
+            if item_points is not None:
+                item_points.discard(previous)
+        self._ids[row], self._payloads[row] = point_id, payload
+        if point_id is not None:
+            self._rows[point_id] = row
+            self._by_item.setdefault(self._item_id(point_id, payload), set()).add(point_id)
+
+    @staticmethod
+    def _item_id(point_id: str, payload: dict | None) -> str:
+        # Items indexed before chunking used the item id itself as the point id.
+        return (payload or {}).get("item_id") or point_id
+
+    def _compact(self) -> None:
+        tmp = self._journal_path.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            for point_id, row in self._rows.items():
+                fh.write(json.dumps({"row": row, "id": point_id, "payload": self._payloads[row]}, ensure_ascii=False) + "\n")
+        os.replace(tmp, self._journal_path)
+        self._journal_lines = len(self._rows)
+
+    def _map(self, capacity: int) -> None:
+        if self._matrix is not None:
+            self._matrix.flush()
+            self._matrix = None
+        size = capacity * self.dim * self.dtype.itemsize
+        with open(self._vectors_path, "ab") as fh:
+            if fh.tell() < size:
+                fh.truncate(size)
+        rows = os.path.getsize(self._vectors_path) // (self.dim * self.dtype.itemsize)
+        self._matrix = np.memmap(self._vectors_path, dtype=self.dtype, mode="r+", shape=(rows, self.dim))
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        unit = vectors / np.where(norms == 0, 1, norms)
+        if self.dtype == np.int8:
+            return np.round(unit * _INT8_SCALE).astype(np.int8)
+        return unit.astype(self.dtype)
+
+    def _decode(self, rows: np.ndarray) -> np.ndarray:
+        return rows.astype(np.float32) / _INT8_SCALE if self.dtype == np.int8 else rows.astype(np.float32)
+
+    def upsert(self, points: list[PointStruct]) -> None:
+        if not points:
+            return
+        vectors = np.asarray([p.vector for p in points], dtype=np.float32)
+        if vectors.shape[1] != self.dim:
+            raise ValueError(f"Collection {self.path.name} holds {self.dim}-dim vectors, got {vectors.shape[1]}")
+        encoded = self._encode(vectors)
+        with self._lock:
+            rows = []
+            for point in points:
+                point_id = str(point.id)
+                row = self._rows.get(point_id)
+                if row is None:
+                    row = self._free.pop() if self._free else len(self._ids)
+                rows.append(row)
+                self._set_row(row, point_id, point.payload or {})
+            if max(rows) >= self._matrix.shape[0]:
+                self._map(max(max(rows) + 1, self._matrix.shape[0] * 2))
+            self._matrix[rows] = encoded
+            # Vectors reach the file before the journal points at them.
+            self._matrix.flush()
+            self._write(
+                {"row": row, "id": str(point.id), "payload": point.payload or {}} for row, point in zip(rows, points)
+            )
+
+    def delete_item(self, item_id: str, from_chunk: int = 0) -> int:
+        """Delete the item's points with `chunk_index >= from_chunk`."""
+        with self._lock:
+            rows = [
+                self._rows[point_id] for point_id in self._by_item.get(item_id, ())
+                if (self._payloads[self._rows[point_id]] or {}).get("chunk_index", 0) >= from_chunk or point_id == item_id
+            ]
+            for row in rows:
+                self._set_row(row, None, None)
+            if not self._by_item.get(item_id):
+                self._by_item.pop(item_id, None)
+            self._free.extend(rows)
+            self._write({"row": row, "id": None} for row in rows)
+        return len(rows)
+
+    def set_payload(self, item_id: str, payload: dict) -> int:
+        """Merge `payload` into the payload of every point of the item."""
+        with self._lock:
+            entries = []
+            for point_id in list(self._by_item.get(item_id, ())):
+                row = self._rows[point_id]
+                merged = {**(self._payloads[row] or {}), **payload}
+                self._set_row(row, point_id, merged)
+                entries.append({"row": row, "id": point_id, "payload": merged})
+            self._write(entries)
+        return len(entries)
+
+    def _write(self, entries) -> None:
+        lines = [json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries]
+        self._journal.writelines(lines)
+        self._journal.flush()
+        self._journal_lines += len(lines)
+
+    def _scores(self, matrix: np.ndarray, count: int, encoded: np.ndarray) -> np.ndarray:
+        scores = np.empty(count, dtype=np.float32)
+        query = encoded.astype(np.float32)
+        for start in range(0, count, _SCORE_BLOCK):
+            block = np.asarray(matrix[start:min(start + _SCORE_BLOCK, count)], dtype=np.float32)
+            scores[start:start + len(block)] = block @ query
+        return scores / (_INT8_SCALE * _INT8_SCALE) if self.dtype == np.int8 else scores
+
+    def search(self, query: list[float], limit: int, query_filter: Filter | None = None) -> list[ScoredPoint]:
+        encoded = self._encode(np.asarray([query], dtype=np.float32))[0]
+        with self._lock:
+            if not self._rows or limit <= 0:
+                return []
+            ids, payloads, matrix = list(self._ids), list(self._payloads), self._matrix
+        # Scored outside the lock; a row rewritten meanwhile is scored with either version.
+        live = np.fromiter(
+            (point_id is not None and (query_filter is None or matches_filter(point_id, payload, query_filter))
+             for point_id, payload in zip(ids, payloads)),
+            dtype=bool, count=len(ids),
+        )
+        candidates = np.flatnonzero(live)
+        if not len(candidates):
+            return []
+        scores = self._scores(matrix, len(ids), encoded)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [
+            ScoredPoint(id=ids[row], version=0, score=float(scores[row]), payload=dict(payloads[row]))
+            for row in candidates
+        ]
+
+    def item_points(self, item_id: str) -> list[PointStruct]:
+        """The item's points with vectors, e.g. to replay it into Qdrant."""
+        with self._lock:
+            rows = [self._rows[point_id] for point_id in self._by_item.get(item_id, ())]
+            vectors = self._decode(np.asarray(self._matrix[rows])) if rows else []
+            return [
+                PointStruct(id=self._ids[row], vector=vector.tolist(), payload=dict(self._payloads[row]))
+                for row, vector in zip(rows, vectors)
+            ]
+
+    def close(self) -> None:
+        with self._lock:
+            self._journal.close()
+            if self._matrix is not None:
+                self._matrix.flush()
+                self._matrix = None
+
+
+_collections: dict[Path, LocalCollection] = {}
+_collections_lock = threading.Lock()
+
+
+def _open(path: Path, create: bool = True) -> LocalCollection | None:
+    with _collections_lock:
+        collection = _collections.get(path)
+        if collection is None and (create or (path / "meta.json").exists()):
+            collection = _collections[path] = LocalCollection(path, settings.embedding_dim, settings.local_vector_dtype)
+        return collection
+
+
+class LocalVectorStore:
+    """`QdrantStore` look-alike backed by `LocalCollection`s under `root`.
+
+    Collections are held in process memory, so only one process may write to `root`: run
+    ingestion in the API process rather than a separate `app.worker`.
+    """
+
+    def __init__(self, root: Path | str | None = None, collection: str | None = None) -> None:
+        self.root = Path(root) if root else _root()
+        acquire_writer_lock(self.root)
+        self.collection = collection or settings.qdrant_collection
+        self._ready = False
+
+    def _aliases_path(self) -> Path:
+        return self.root / "aliases.json"
+
+    def _read_aliases(self) -> dict[str, str]:
+        path = self._aliases_path()
+        return json.loads(path.read_text()) if path.exists() else {}
+
+    def _write_aliases(self, aliases: dict[str, str]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._aliases_path().with_suffix(".tmp")
+        tmp.write_text(json.dumps(aliases))
+        os.replace(tmp, self._aliases_path())
+
+    def _target(self, name: str | None = None) -> LocalCollection:
+        name = name or self.collection
+        return _open(self.root / self._read_aliases().get(name, name))
+
+    def for_collection(self, name: str) -> "LocalVectorStore":
+        return LocalVectorStore(self.root, name)
+
+    async def list_collections(self) -> tuple[set[str], dict[str, str]]:
+        names = {p.name for p in self.root.iterdir() if (p / "meta.json").exists()} if self.root.exists() else set()
+        return names, self._read_aliases()
+
+    async def create_collection(self, name: str) -> None:
+        logger.info("Creating local vector collection %s", name)
+        await asyncio.to_thread(_open, self.root / name)
+
+    async def drop_collection(self, name: str) -> None:
+        path = self.root / name
+        with _collections_lock:
+            collection = _collections.pop(path, None)
+        if collection is not None:
+            collection.close()
+        for child in path.glob("*") if path.exists() else []:
+            child.unlink()
+        if path.exists():
+            path.rmdir()
+
+    async def ensure_collection(self) -> None:
+        if self._ready:
+            return
+        collections, aliases = await self.list_collections()
+        if self.collection not in collections and self.collection not in aliases:
+            target = versioned_collection_name(self.collection, 1)
+            await self.create_collection(target)
+            self._write_aliases({**aliases, self.collection: target})
+        collection = self._target()
+        if collection.dim != settings.embedding_dim:
+            logger.warning(
+                "Local vector collection %s holds %s-dim vectors but EMBEDDING_DIM is %s; run a reindex",
+                self.collection, collection.dim, settings.embedding_dim,
+            )
+        self._ready = True
+
+    async def apply_collection_config(self) -> dict:
+        # Quantization / HNSW settings are Qdrant's; the local matrix only has a dtype.
+        collection = await self.resolve_collection()
+        return {"collection": collection, "status": "green", "backend": "local", "dtype": self._target().dtype.name, "points": len(self._target())}
+
+    async def resolve_collection(self) -> str:
+        await self.ensure_collection()
+        return self._read_aliases().get(self.collection, self.collection)
+
+    async def next_collection_name(self) -> str:
+        collections, _ = await self.list_collections()
+        versions = [v for v in (_collection_version(self.collection, name) for name in collections) if v is not None]
+        return versioned_collection_name(self.collection, max(versions, default=0) + 1)
+
+    async def swap_alias(self, target: str) -> str | None:
+        aliases = self._read_aliases()
+        previous = aliases.get(self.collection)
+        self._write_aliases({**aliases, self.collection: target})
+        return previous
+
+    async def close(self) -> None:
+        with _collections_lock:
+            opened = [c for path, c in _collections.items() if path.parent == self.root]
+            for collection in opened:
+                del _collections[collection.path]
+        for collection in opened:
+            collection.close()
+
+    @timed(VECTOR_SECONDS, VECTOR_ERRORS, backend="local", operation="upsert")
+    async def upsert_points(self, item_id: str, points: list[PointStruct]) -> None:
+        await self.ensure_collection()
+        collection = self._target()
+        await asyncio.to_thread(collection.upsert, points)
+        await asyncio.to_thread(collection.delete_item, item_id, len(points))
+
+    async def upsert_chunks(self, item_id: str, chunks: list, embeddings: list[list[float]], payload: dict) -> None:
+        await self.upsert_points(item_id, chunk_points(item_id, chunks, embeddings, payload))
+
+    @timed(VECTOR_SECONDS, VECTOR_ERRORS, backend="local", operation="upsert_many")
+    async def upsert_many(self, entries: list[tuple[str, list, list[list[float]], dict]]) -> None:
+        await self.ensure_collection()
+        points = [point for entry in entries for point in chunk_points(*entry)]
+        await asyncio.to_thread(self._target().upsert, points)
+
+    @timed(VECTOR_SECONDS, VECTOR_ERRORS, backend="local", operation="set_payload")
+    async def set_payloads(self, entries: list[tuple[str, dict]]) -> None:
+        await self.ensure_collection()
+        collection = self._target()
+
+        def apply() -> None:
+            for item_id, payload in entries:
+                collection.set_payload(item_id, payload)
+
+        await asyncio.to_thread(apply)
+
+    async def item_points(self, item_id: str) -> list[PointStruct]:
+        await self.ensure_collection()
+        return await asyncio.to_thread(self._target().item_points, item_id)
+
+    @timed(VECTOR_SECONDS, VECTOR_ERRORS, backend="local", operation="delete")
+    async def delete_item(self, item_id: str) -> None:
+        """Delete from the live collection and from any version a reindex is still building."""
+        await self.ensure_collection()
+        collections, aliases = await self.list_collections()
+        live = aliases.get(self.collection, self.collection)
+        for name in collections:
+            if name == live or _collection_version(self.collection, name) is not None:
+                await asyncio.to_thread(_open(self.root / name).delete_item, item_id)
+
+    @timed(VECTOR_SECONDS, VECTOR_ERRORS, backend="local", operation="search")
+    async def search(self, text: str, top_k: int = 10, query_filter: Filter | None = None, hnsw_ef: int | None = None, exact: bool | None = None, vector: list[float] | None = None) -> list[dict]:
+        # Always exact; `hnsw_ef` only applies to Qdrant.
+        query = vector if vector is not None else await embed_query(text)
+        limit = top_k * max(settings.search_chunk_overfetch, 1)
+        await self.ensure_collection()
+        hits = await asyncio.to_thread(self._target().search, query, limit, query_filter)
+        return aggregate_chunk_hits(hits, top_k)
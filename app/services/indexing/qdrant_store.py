@@ -1,54 +1,380 @@
 import asyncio
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchValue
+import logging
+import re
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import (
+    Distance, VectorParams, PointStruct, Filter, FieldCondition, MatchAny, MatchValue, Range, FilterSelector,
+    HasIdCondition, PayloadSchemaType, CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation,
+    CollectionParamsDiff, CompressionRatio, Disabled, HnswConfigDiff, ProductQuantization, ProductQuantizationConfig,
+    QuantizationSearchParams, ScalarQuantization, ScalarQuantizationConfig, ScalarType, SearchParams, SetPayload,
+    SetPayloadOperation, VectorParamsDiff,
+)
 
 from app.core.config import settings
-from app.llm.providers.base import get_provider
+from app.core.metrics import VECTOR_ERRORS, VECTOR_SECONDS, timed
+from app.llm.embedding_cache import embed_query
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_NAMESPACE = uuid.UUID("6f1c1f5e-8d0a-4a53-9a4e-2b1f0c6e7d21")
+
+
+# Fields used in search filters and deletes; indexed so Qdrant filters during the HNSW walk.
+PAYLOAD_INDEXES = {
+    "item_id": PayloadSchemaType.KEYWORD,
+    "owner_id": PayloadSchemaType.INTEGER,
+    "tags": PayloadSchemaType.KEYWORD,
+    "source_type": PayloadSchemaType.KEYWORD,
+    "created_ts": PayloadSchemaType.FLOAT,
+}
+
+
+def _timestamp(value: datetime) -> float:
+    # Stored datetimes are naive UTC.
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
+
+
+def item_payload(item) -> dict:
+    """Payload shared by all chunk points of a `KnowledgeItem`."""
+    return {
+        "title": item.title,
+        "tags": item.tags or [],
+        "keywords": item.keywords or [],
+        "owner_id": item.owner_id,
+        "source_type": item.source_type.value,
+        "created_at": item.created_at.isoformat(),
+        "created_ts": _timestamp(item.created_at),
+    }
+
+
+def build_search_filter(owner_id: int | None = None, tags: list[str] | None = None, source_type: str | None = None, created_from: datetime | None = None, created_to: datetime | None = None) -> Filter | None:
+    must = []
+    if owner_id is not None:
+        must.append(FieldCondition(key="owner_id", match=MatchValue(value=owner_id)))
+    if tags:
+        must.append(FieldCondition(key="tags", match=MatchAny(any=list(tags))))
+    if source_type:
+        must.append(FieldCondition(key="source_type", match=MatchValue(value=source_type)))
+    if created_from or created_to:
+        must.append(FieldCondition(key="created_ts", range=Range(
+            gte=_timestamp(created_from) if created_from else None,
+            lte=_timestamp(created_to) if created_to else None,
+        )))
+    return Filter(must=must) if must else None
+
+
+def quantization_config() -> ScalarQuantization | ProductQuantization | None:
+    """`QDRANT_QUANTIZATION`: none, scalar (int8, ~4x smaller) or product (`QDRANT_PQ_COMPRESSION`)."""
+    mode = settings.qdrant_quantization
+    if mode == "scalar":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8, quantile=settings.qdrant_scalar_quantile, always_ram=settings.qdrant_quantization_always_ram,
+        ))
+    if mode == "product":
+        return ProductQuantization(product=ProductQuantizationConfig(
+            compression=CompressionRatio(settings.qdrant_pq_compression), always_ram=settings.qdrant_quantization_always_ram,
+        ))
+    if mode not in ("", "none"):
+        raise ValueError(f"Unknown QDRANT_QUANTIZATION: {mode}")
+    return None
+
+
+def hnsw_config() -> HnswConfigDiff:
+    return HnswConfigDiff(m=settings.qdrant_hnsw_m, ef_construct=settings.qdrant_hnsw_ef_construct, on_disk=settings.qdrant_hnsw_on_disk)
+
+
+def search_params(hnsw_ef: int | None = None, exact: bool | None = None) -> SearchParams:
+    """Per-query knobs; arguments override `SEARCH_HNSW_EF`/`SEARCH_EXACT`."""
+    quantization = None
+    if settings.qdrant_quantization in ("scalar", "product"):
+        # Search the compressed vectors, then rescore the oversampled top hits with the originals.
+        quantization = QuantizationSearchParams(
+            rescore=settings.search_quantization_rescore, oversampling=settings.search_quantization_oversampling,
+        )
+    return SearchParams(
+        hnsw_ef=hnsw_ef if hnsw_ef is not None else settings.search_hnsw_ef,
+        exact=exact if exact is not None else settings.search_exact,
+        quantization=quantization,
+    )
+
+
+def versioned_collection_name(alias: str, version: int) -> str:
+    return f"{alias}_v{version}"
+
+
+def _collection_version(alias: str, name: str) -> int | None:
+    match = re.fullmatch(rf"{re.escape(alias)}_v(\d+)", name)
+    return int(match.group(1)) if match else None
+
+
+def chunk_point_id(item_id: str, chunk_index: int) -> str:
+    # Qdrant point ids must be UUIDs or integers; derive a stable one per chunk.
+    return str(uuid.uuid5(_CHUNK_NAMESPACE, f"{item_id}:{chunk_index}"))
+
+
+def chunk_points(item_id: str, chunks: list, embeddings: list[list[float]], payload: dict) -> list[PointStruct]:
+    return [
+        PointStruct(
+            id=chunk_point_id(item_id, chunk.index),
+            vector=embedding,
+            payload={**payload, "item_id": item_id, "chunk_index": chunk.index, "text": chunk.text},
+        )
+        for chunk, embedding in zip(chunks, embeddings)
+    ]
+
+
+def item_points_filter(item_id: str) -> Filter:
+    return Filter(should=[
+        FieldCondition(key="item_id", match=MatchValue(value=item_id)),
+        # Items indexed before chunking used the item id itself as the point id.
+        HasIdCondition(has_id=[item_id]),
+    ])
+
+
+def stale_chunks_filter(item_id: str, chunk_count: int) -> Filter:
+    """Points left over from a longer previous version of the item."""
+    return Filter(should=[
+        Filter(must=[
+            FieldCondition(key="item_id", match=MatchValue(value=item_id)),
+            FieldCondition(key="chunk_index", range=Range(gte=chunk_count)),
+        ]),
+        HasIdCondition(has_id=[item_id]),
+    ])
+
+
+def aggregate_chunk_hits(hits: list, top_k: int, mode: str | None = None, top_n: int | None = None) -> list[dict]:
+    """Group chunk hits by parent item and score each item by its best (or top-n summed) chunks."""
+    mode = mode or settings.search_chunk_aggregation
+    top_n = top_n or settings.search_chunk_top_n
+    grouped: dict[str, dict] = {}
+    for hit in hits:
+        payload = dict(hit.payload or {})
+        item_id = payload.pop("item_id", None) or str(hit.id)
+        text = payload.pop("text", None)
+        chunk_index = payload.pop("chunk_index", 0)
+        entry = grouped.setdefault(item_id, {"id": item_id, "payload": payload, "passages": []})
+        entry["passages"].append({"chunk_index": chunk_index, "score": hit.score, "text": text})
+    results = []
+    for entry in grouped.values():
+        passages = sorted(entry["passages"], key=lambda p: p["score"], reverse=True)[:top_n]
+        scores = [p["score"] for p in passages]
+        entry["score"] = sum(scores) if mode == "sum" else scores[0]
+        entry["passages"] = passages
+        results.append(entry)
+    results.sort(key=lambda r: r["score"], reverse=True)
+    return results[:top_k]
+
+
+def _build_client() -> AsyncQdrantClient:
+    if settings.qdrant_url == ":memory:":
+        # Embedded local mode, handy for tests and offline development.
+        return AsyncQdrantClient(location=":memory:")
+    return AsyncQdrantClient(
+        url=settings.qdrant_url,
+        api_key=settings.qdrant_api_key,
+        timeout=settings.qdrant_timeout_seconds,
+        prefer_grpc=settings.qdrant_prefer_grpc,
+        grpc_port=settings.qdrant_grpc_port,
+        limits=httpx.Limits(max_connections=settings.qdrant_pool_size, max_keepalive_connections=settings.qdrant_pool_size),
+    )
 
 
 class QdrantStore:
-    def __init__(self) -> None:
-        self.client = QdrantClient(url=settings.qdrant_url, api_key=settings.qdrant_api_key)
-        self.collection = "knowledge_items"
-        self._ensure_collection()
+    """Reads and writes go through `collection`, normally an alias of a versioned collection
+    (`<alias>_v<n>`) so a reindex can build a new version and swap it in atomically."""
 
-    def _ensure_collection(self) -> None:
-        try:
-            self.client.get_collection(self.collection)
-        except Exception:
-            self.client.recreate_collection(
-                collection_name=self.collection,
-                vectors_config=VectorParams(size=settings.embedding_dim, distance=Distance.COSINE),
-            )
-
-    async def upsert_item(self, item_id: str, embedding: list[float], payload: dict) -> None:
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(
-            None,
-            lambda: self.client.upsert(
-                collection_name=self.collection,
-                points=[PointStruct(id=item_id, vector=embedding, payload=payload)],
-            ),
+    def __init__(self, client: AsyncQdrantClient | None = None, collection: str | None = None) -> None:
+        self.client = client or _build_client()
+        self.collection = collection or settings.qdrant_collection
+        self._ready = False
+        self._ready_lock = asyncio.Lock()
+
+    async def list_collections(self) -> tuple[set[str], dict[str, str]]:
+        """Existing collection names and the alias -> collection mapping."""
+        collections = await self.client.get_collections()
+        aliases = await self.client.get_aliases()
+        return {c.name for c in collections.collections}, {a.alias_name: a.collection_name for a in aliases.aliases}
+
+    async def _ensure_payload_indexes(self, name: str) -> None:
+        if settings.qdrant_url == ":memory:":
+            # Local mode ignores payload indexes (and warns about each one).
+            return
+        info = await self.client.get_collection(name)
+        for field, schema in PAYLOAD_INDEXES.items():
+            if field not in (info.payload_schema or {}):
+                await self.client.create_payload_index(name, field_name=field, field_schema=schema)
+
+    async def create_collection(self, name: str) -> None:
+        """Create a collection for the current `EMBEDDING_DIM` and storage settings, with payload indexes."""
+        logger.info("Creating Qdrant collection %s", name)
+        await self.client.create_collection(
+            collection_name=name,
+            vectors_config=VectorParams(size=settings.embedding_dim, distance=Distance.COSINE, on_disk=settings.qdrant_on_disk_vectors),
+            hnsw_config=hnsw_config(),
+            quantization_config=quantization_config(),
+            on_disk_payload=settings.qdrant_on_disk_payload,
         )
+        await self._ensure_payload_indexes(name)
 
-    async def delete_item(self, item_id: str) -> None:
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(
-            None, lambda: self.client.delete(collection_name=self.collection, points_selector=[item_id])
+    async def apply_collection_config(self) -> dict:
+        """Bring the live collection in line with the storage settings.
+
+        Qdrant rebuilds the HNSW graph / quantized vectors in the background; the collection
+        keeps serving queries meanwhile (status `yellow` until the optimizers finish).
+        """
+        await self.ensure_collection()
+        quantization = quantization_config()
+        await self.client.update_collection(
+            collection_name=self.collection,
+            vectors_config={"": VectorParamsDiff(on_disk=settings.qdrant_on_disk_vectors)},
+            hnsw_config=hnsw_config(),
+            quantization_config=quantization or Disabled.DISABLED,
+            collection_params=CollectionParamsDiff(on_disk_payload=settings.qdrant_on_disk_payload),
         )
+        info = await self.client.get_collection(self.collection)
+        return {
+            "collection": await self.resolve_collection(),
+            "status": str(info.status),
+            "quantization": settings.qdrant_quantization,
+            "on_disk_vectors": settings.qdrant_on_disk_vectors,
+            "on_disk_payload": settings.qdrant_on_disk_payload,
+            "hnsw": {"m": settings.qdrant_hnsw_m, "ef_construct": settings.qdrant_hnsw_ef_construct, "on_disk": settings.qdrant_hnsw_on_disk},
+        }
 
-    async def search(self, text: str, top_k: int = 10) -> list[dict]:
-        provider = get_provider()
-        query = provider.embed(text)
-        loop = asyncio.get_event_loop()
+    async def ensure_collection(self) -> None:
+        """Create the first collection version and its alias if missing; runs once per store instance."""
+        if self._ready:
+            return
+        async with self._ready_lock:
+            if self._ready:
+                return
+            collections, aliases = await self.list_collections()
+            if self.collection not in collections and self.collection not in aliases:
+                await self._create_first_version(collections)
+            else:
+                await self._ensure_payload_indexes(self.collection)
+                info = await self.client.get_collection(self.collection)
+                size = getattr(info.config.params.vectors, "size", None)
+                if size is not None and size != settings.embedding_dim:
+                    logger.warning(
+                        "Qdrant collection %s holds %s-dim vectors but EMBEDDING_DIM is %s; run a reindex",
+                        self.collection, size, settings.embedding_dim,
+                    )
+            self._ready = True
+
+    async def _create_first_version(self, collections: set[str]) -> None:
+        # Other processes (API workers, app.worker) bootstrap at the same time; losing the race
+        # to create the collection or the alias is fine as long as it exists afterwards.
+        target = versioned_collection_name(self.collection, 1)
+        if target not in collections:
+            try:
+                await self.create_collection(target)
+            except Exception:
+                if target not in (await self.list_collections())[0]:
+                    raise
+                logger.info("Qdrant collection %s was created concurrently", target)
         try:
-            result = await loop.run_in_executor(
-                None,
-                lambda: self.client.search(collection_name=self.collection, query_vector=query, limit=top_k),
-            )
-            return [
-                {"id": r.id, "score": r.score, "payload": r.payload}
-                for r in result
-            ]
+            await self.client.update_collection_aliases(change_aliases_operations=[
+                CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=self.collection)),
+            ])
         except Exception:
-            return []
+            if self.collection not in (await self.list_collections())[1]:
+                raise
+            logger.info("Qdrant alias %s was created concurrently", self.collection)
+
+    async def resolve_collection(self) -> str:
+        """The concrete collection currently behind the alias."""
+        await self.ensure_collection()
+        _, aliases = await self.list_collections()
+        return aliases.get(self.collection, self.collection)
+
+    async def next_collection_name(self) -> str:
+        collections, _ = await self.list_collections()
+        versions = [v for v in (_collection_version(self.collection, name) for name in collections) if v is not None]
+        return versioned_collection_name(self.collection, max(versions, default=0) + 1)
+
+    async def swap_alias(self, target: str) -> str | None:
+        """Point the alias at `target` in one operation; returns the collection it pointed at before."""
+        collections, aliases = await self.list_collections()
+        previous = aliases.get(self.collection)
+        operations = []
+        if previous is not None:
+            operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=self.collection)))
+        elif self.collection in collections:
+            # A pre-alias deployment: the alias name is taken by a real collection, which has
+            # to go first. Queries fail for the moment between the two calls.
+            logger.warning("Replacing unversioned collection %s with alias -> %s", self.collection, target)
+            await self.client.delete_collection(self.collection)
+            previous = None
+        operations.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=target, alias_name=self.collection)))
+        await self.client.update_collection_aliases(change_aliases_operations=operations)
+        return previous
+
+    def for_collection(self, name: str) -> "QdrantStore":
+        """A store writing to `name` directly, sharing this store's client."""
+        return QdrantStore(self.client, name)
+
+    async def drop_collection(self, name: str) -> None:
+        await self.client.delete_collection(name)
+
+    async def close(self) -> None:
+        await self.client.close()
+
+    @timed(VECTOR_SECONDS, VECTOR_ERRORS, backend="qdrant", operation="upsert")
+    async def upsert_points(self, item_id: str, points: list[PointStruct]) -> None:
+        """Write all points of one item, then drop points left over from a longer previous version."""
+        await self.ensure_collection()
+        await self.client.upsert(collection_name=self.collection, points=points)
+        await self._delete(stale_chunks_filter(item_id, len(points)))
+
+    async def upsert_chunks(self, item_id: str, chunks: list, embeddings: list[list[float]], payload: dict) -> None:
+        """Index one point per chunk."""
+        await self.upsert_points(item_id, chunk_points(item_id, chunks, embeddings, payload))
+
+    @timed(VECTOR_SECONDS, VECTOR_ERRORS, backend="qdrant", operation="upsert_many")
+    async def upsert_many(self, entries: list[tuple[str, list, list[list[float]], dict]]) -> None:
+        """Index several new items in one request; `entries` are (item_id, chunks, embeddings, payload)."""
+        await self.ensure_collection()
+        points = [point for entry in entries for point in chunk_points(*entry)]
+        if points:
+            await self.client.upsert(collection_name=self.collection, points=points)
+
+    @timed(VECTOR_SECONDS, VECTOR_ERRORS, backend="qdrant", operation="set_payload")
+    async def set_payloads(self, entries: list[tuple[str, dict]]) -> None:
+        """Merge `payload` into every point of each (item_id, payload) entry, in one request; vectors are untouched."""
+        await self.ensure_collection()
+        if entries:
+            await self.client.batch_update_points(collection_name=self.collection, update_operations=[
+                SetPayloadOperation(set_payload=SetPayload(payload=payload, filter=item_points_filter(item_id)))
+                for item_id, payload in entries
+            ])
+
+    @timed(VECTOR_SECONDS, VECTOR_ERRORS, backend="qdrant", operation="delete")
+    async def delete_item(self, item_id: str) -> None:
+        """Delete from the live collection and from any version a reindex is still building."""
+        await self.ensure_collection()
+        collections, aliases = await self.list_collections()
+        live = aliases.get(self.collection, self.collection)
+        building = [name for name in collections if name != live and _collection_version(self.collection, name) is not None]
+        for name in [self.collection, *building]:
+            await self._delete(item_points_filter(item_id), name)
+
+    async def _delete(self, points_filter: Filter, collection: str | None = None) -> None:
+        await self.client.delete(collection_name=collection or self.collection, points_selector=FilterSelector(filter=points_filter))
+
+    @timed(VECTOR_SECONDS, VECTOR_ERRORS, backend="qdrant", operation="search")
+    async def search(self, text: str, top_k: int = 10, query_filter: Filter | None = None, hnsw_ef: int | None = None, exact: bool | None = None, vector: list[float] | None = None) -> list[dict]:
+        """Chunk hits aggregated per item; `vector` skips embedding `text` when the caller already has it."""
+        query = vector if vector is not None else await embed_query(text)
+        limit = top_k * max(settings.search_chunk_overfetch, 1)
+        await self.ensure_collection()
+        result = await self.client.search(
+            collection_name=self.collection, query_vector=query, query_filter=query_filter, limit=limit,
+            search_params=search_params(hnsw_ef, exact),
+        )
+        return aggregate_chunk_hits(result, top_k)
+
@@ -0,0 +1,164 @@
+"""Full-corpus re-embedding into a new versioned collection.
+
+The live alias keeps serving queries from the old collection while the new one is built;
+progress is checkpointed (last copied item id) so a crashed job resumes where it stopped.
+Items written during the copy are picked up by a catch-up pass before and after the swap.
+"""
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import KnowledgeItem
+from app.db.session import get_session
+from app.llm.coalescer import get_embedding_coalescer
+from app.services.indexing.qdrant_store import item_payload
+from app.services.indexing.store import VectorStore, get_store
+from app.services.ingest.chunking import chunk_text
+
+ProgressCallback = Callable[[dict], Awaitable[None]]
+
+# Columns needed to rebuild the points of an item; loading rows rather than ORM entities
+# keeps the session's identity map from growing with the corpus.
+_REINDEX_COLUMNS = (
+    KnowledgeItem.id, KnowledgeItem.title, KnowledgeItem.tags, KnowledgeItem.keywords, KnowledgeItem.owner_id,
+    KnowledgeItem.source_type, KnowledgeItem.created_at, KnowledgeItem.content_text, KnowledgeItem.is_deleted,
+    KnowledgeItem.duplicate_of,
+)
+
+# Slack for clock differences between the API and worker hosts when selecting changed rows.
+_CATCH_UP_MARGIN = timedelta(minutes=1)
+
+_CHECKPOINT_KEYS = ("collection", "source", "phase", "started_at", "last_id", "indexed", "caught_up")
+
+
+async def _item_batches(db: AsyncSession, after_id: str = "", changed_since: datetime | None = None, batch_size: int | None = None) -> AsyncIterator[list]:
+    """Yield item rows in id order, `batch_size` at a time."""
+    batch_size = batch_size or settings.reindex_batch_size
+    stmt = select(*_REINDEX_COLUMNS).order_by(KnowledgeItem.id)
+    if changed_since is not None:
+        stmt = stmt.where(KnowledgeItem.updated_at >= changed_since)
+    else:
+        # Items linked to a near-duplicate original have no vectors of their own.
+        stmt = stmt.where(KnowledgeItem.is_deleted == False, KnowledgeItem.duplicate_of.is_(None))  # noqa: E712
+    if db.bind.dialect.name == "sqlite":
+        # An open SQLite read cursor blocks every writer until it is closed, which would stall
+        # ingestion (and our own checkpoints) for the whole run; page by keyset instead.
+        while True:
+            rows = (await db.execute(stmt.where(KnowledgeItem.id > after_id).limit(batch_size))).all()
+            if not rows:
+                return
+            yield rows
+            after_id = rows[-1].id
+    else:
+        result = await db.stream(stmt.where(KnowledgeItem.id > after_id).execution_options(yield_per=batch_size))
+        async for rows in result.partitions(batch_size):
+            yield rows
+
+
+async def _index_rows(target: VectorStore, rows: list, replace: bool = False) -> None:
+    live = [row for row in rows if not row.is_deleted and row.duplicate_of is None]
+    chunked = [chunk_text(row.content_text) for row in live]
+    texts = [chunk.text for chunks in chunked for chunk in chunks]
+    vectors = await get_embedding_coalescer().embed_many(texts) if texts else []
+    entries, offset = [], 0
+    for row, chunks in zip(live, chunked):
+        entries.append((row.id, chunks, vectors[offset:offset + len(chunks)], item_payload(row)))
+        offset += len(chunks)
+    if replace:
+        # Catch-up rows may already be in the target with more chunks, or may be deleted since.
+        for entry in entries:
+            await target.upsert_chunks(*entry)
+        for row in rows:
+            if row.is_deleted or row.duplicate_of is not None:
+                await target.delete_item(row.id)
+    else:
+        await target.upsert_many(entries)
+
+
+async def _catch_up(target: VectorStore, since: datetime) -> int:
+    changed = 0
+    async with get_session() as db:
+        async for rows in _item_batches(db, changed_since=since - _CATCH_UP_MARGIN):
+            await _index_rows(target, rows, replace=True)
+            changed += len(rows)
+    return changed
+
+
+async def run_reindex(checkpoint: dict | None = None, keep_old: bool = False, on_progress: ProgressCallback | None = None) -> dict:
+    """Re-embed every live item into a new collection version and swap the alias to it.
+
+    `checkpoint` is the state reported through `on_progress` by an earlier, interrupted run.
+    """
+    store = get_store()
+    state = {key: value for key, value in (checkpoint or {}).items() if key in _CHECKPOINT_KEYS}
+
+    async def report() -> None:
+        if on_progress:
+            await on_progress(dict(state))
+
+    if not state.get("collection"):
+        state = {
+            "collection": await store.next_collection_name(),
+            "source": await store.resolve_collection(),
+            "phase": "copy",
+            "started_at": datetime.utcnow().isoformat(),
+            "last_id": "",
+            "indexed": 0,
+        }
+    collections, _ = await store.list_collections()
+    if state["collection"] not in collections:
+        await store.create_collection(state["collection"])
+    target = store.for_collection(state["collection"])
+    await report()
+
+    if state["phase"] == "copy":
+        async with get_session() as db:
+            async for rows in _item_batches(db, after_id=state["last_id"]):
+                await _index_rows(target, rows)
+                state["last_id"] = rows[-1].id
+                state["indexed"] += len(rows)
+                await report()
+        state["phase"] = "catch_up"
+        await report()
+
+    if state["phase"] == "catch_up":
+        swap_started = datetime.utcnow()
+        caught_up = await _catch_up(target, datetime.fromisoformat(state["started_at"]))
+        await store.swap_alias(state["collection"])
+        # Writes that landed in the old collection between the catch-up pass and the swap.
+        caught_up += await _catch_up(target, swap_started)
+        state["caught_up"] = state.get("caught_up", 0) + caught_up
+        state["phase"] = "swapped"
+        await report()
+
+    # The source was checkpointed before the swap, so a run that crashed between the swap and
+    # the "swapped" checkpoint still drops it. A pre-alias collection was removed by the swap.
+    source = state.get("source")
+    if source not in (None, state["collection"], store.collection) and not keep_old:
+        collections, _ = await store.list_collections()
+        if source in collections:
+            await store.drop_collection(source)
+    state["phase"] = "done"
+    await report()
+    return state
+
+
+async def run_payload_backfill(checkpoint: dict | None = None, on_progress: ProgressCallback | None = None) -> dict:
+    """Rewrite the filter payload (owner, tags, source type, dates) of every live item's points from the database.
+
+    Points indexed before those fields were stored cannot be matched by payload filters; this
+    repairs them in place without re-embedding. Resumes after `checkpoint["last_id"]`.
+    """
+    store = get_store()
+    state = {"last_id": (checkpoint or {}).get("last_id", ""), "updated": (checkpoint or {}).get("updated", 0)}
+    async with get_session() as db:
+        async for rows in _item_batches(db, after_id=state["last_id"]):
+            await store.set_payloads([(row.id, item_payload(row)) for row in rows])
+            state["last_id"] = rows[-1].id
+            state["updated"] += len(rows)
+            if on_progress:
+                await on_progress(dict(state))
+    return state
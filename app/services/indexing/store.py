@@ -0,0 +1,186 @@
+"""Selects the vector store backend (`VECTOR_BACKEND`) and the optional local read fallback."""
+import json
+import logging
+import time
+
+from qdrant_client.http.models import Filter
+
+from app.core.config import settings
+from app.llm.embedding_cache import embed_query
+from app.services.indexing.local_store import LocalIndexLocked, LocalVectorStore
+from app.services.indexing.qdrant_store import QdrantStore
+
+logger = logging.getLogger(__name__)
+
+
+class FallbackStore:
+    """Qdrant with every write mirrored into a `LocalVectorStore`.
+
+    Searches are served locally while Qdrant is failing, and for `VECTOR_FALLBACK_RETRY_SECONDS`
+    after each failure so an outage does not cost every query a timeout. Writes that Qdrant
+    missed are remembered and replayed from the local copy once it answers again.
+    """
+
+    def __init__(self, primary: QdrantStore, replica: LocalVectorStore, strict: bool = False) -> None:
+        self.primary = primary
+        self.replica = replica
+        self.collection = primary.collection
+        # Stores used by a reindex write to both sides and fail loudly instead.
+        self.strict = strict
+        self._down_until = 0.0
+        self._pending_path = replica.root / "pending.json"
+        self._pending: set[str] | None = None
+
+    def for_collection(self, name: str) -> "FallbackStore":
+        return FallbackStore(self.primary.for_collection(name), self.replica.for_collection(name), strict=True)
+
+    @property
+    def primary_available(self) -> bool:
+        return time.monotonic() >= self._down_until
+
+    def _primary_failed(self, action: str) -> None:
+        logger.warning("Qdrant %s failed; using the local vector index for %ss", action, settings.vector_fallback_retry_seconds, exc_info=True)
+        self._down_until = time.monotonic() + settings.vector_fallback_retry_seconds
+
+    def _pending_items(self) -> set[str]:
+        """Items whose last write did not reach Qdrant; kept on disk so a restart does not lose them."""
+        if self._pending is None:
+            self._pending = set(json.loads(self._pending_path.read_text())) if self._pending_path.exists() else set()
+        return self._pending
+
+    def _save_pending(self) -> None:
+        self._pending_path.parent.mkdir(parents=True, exist_ok=True)
+        self._pending_path.write_text(json.dumps(sorted(self._pending_items())))
+
+    async def _replay_pending(self) -> None:
+        pending = self._pending_items()
+        if not pending:
+            return
+        for item_id in list(pending):
+            # The replica holds the item's current state: its points, or none if deleted.
+            points = await self.replica.item_points(item_id)
+            if points:
+                await self.primary.upsert_points(item_id, points)
+            else:
+                await self.primary.delete_item(item_id)
+            pending.discard(item_id)
+        self._save_pending()
+        logger.info("Replayed missed writes into Qdrant")
+
+    async def _write(self, action: str, call, item_ids: list[str]) -> None:
+        if self.strict:
+            await call()
+            return
+        if self.primary_available:
+            try:
+                await self._replay_pending()
+                await call()
+                return
+            except Exception:
+                self._primary_failed(action)
+        self._pending_items().update(item_ids)
+        self._save_pending()
+
+    async def upsert_chunks(self, item_id: str, chunks: list, embeddings: list[list[float]], payload: dict) -> None:
+        await self.replica.upsert_chunks(item_id, chunks, embeddings, payload)
+        await self._write("upsert", lambda: self.primary.upsert_chunks(item_id, chunks, embeddings, payload), [item_id])
+
+    async def upsert_many(self, entries: list[tuple[str, list, list[list[float]], dict]]) -> None:
+        await self.replica.upsert_many(entries)
+        await self._write("upsert", lambda: self.primary.upsert_many(entries), [entry[0] for entry in entries])
+
+    async def set_payloads(self, entries: list[tuple[str, dict]]) -> None:
+        await self.replica.set_payloads(entries)
+        await self._write("set_payload", lambda: self.primary.set_payloads(entries), [item_id for item_id, _ in entries])
+
+    async def delete_item(self, item_id: str) -> None:
+        await self.replica.delete_item(item_id)
+        await self._write("delete", lambda: self.primary.delete_item(item_id), [item_id])
+
+    async def search(self, text: str, top_k: int = 10, query_filter: Filter | None = None, hnsw_ef: int | None = None, exact: bool | None = None, vector: list[float] | None = None) -> list[dict]:
+        # Embedded once, outside the try: an embedding failure is not a Qdrant outage.
+        vector = vector if vector is not None else await embed_query(text)
+        if self.primary_available:
+            try:
+                return await self.primary.search(text, top_k, query_filter, hnsw_ef=hnsw_ef, exact=exact, vector=vector)
+            except Exception:
+                self._primary_failed("search")
+        return await self.replica.search(text, top_k, query_filter, vector=vector)
+
+    async def ensure_collection(self) -> None:
+        await self.replica.ensure_collection()
+        await self.primary.ensure_collection()
+
+    # Collection management (reindex, admin) goes to both sides; a failure here is not masked.
+
+    async def list_collections(self) -> tuple[set[str], dict[str, str]]:
+        return await self.primary.list_collections()
+
+    async def resolve_collection(self) -> str:
+        return await self.primary.resolve_collection()
+
+    async def next_collection_name(self) -> str:
+        return await self.primary.next_collection_name()
+
+    async def create_collection(self, name: str) -> None:
+        await self.primary.create_collection(name)
+        await self.replica.create_collection(name)
+
+    async def swap_alias(self, target: str) -> str | None:
+        await self.replica.swap_alias(target)
+        return await self.primary.swap_alias(target)
+
+    async def drop_collection(self, name: str) -> None:
+        await self.primary.drop_collection(name)
+        await self.replica.drop_collection(name)
+
+    async def apply_collection_config(self) -> dict:
+        return await self.primary.apply_collection_config()
+
+    async def close(self) -> None:
+        await self.primary.close()
+        await self.replica.close()
+
+
+VectorStore = QdrantStore | LocalVectorStore | FallbackStore
+
+_store: VectorStore | None = None
+
+
+def build_store() -> VectorStore:
+    if settings.vector_backend == "local":
+        return LocalVectorStore()
+    if settings.vector_backend != "qdrant":
+        raise ValueError(f"Unknown VECTOR_BACKEND: {settings.vector_backend}")
+    if settings.vector_local_fallback:
+        try:
+            replica = LocalVectorStore()
+        except LocalIndexLocked:
+            # Only one process may keep the mirror; a second one writing it would corrupt it.
+            logger.warning("Another process owns the local vector index; running without VECTOR_LOCAL_FALLBACK", exc_info=True)
+            return QdrantStore()
+        return FallbackStore(QdrantStore(), replica)
+    return QdrantStore()
+
+
+def get_store() -> VectorStore:
+    """The application-wide store; one client (and connection pool) per process."""
+    global _store
+    if _store is None:
+        _store = build_store()
+    return _store
+
+
+async def init_store() -> None:
+    try:
+        await get_store().ensure_collection()
+    except Exception:
+        # Qdrant may come up after the API; operations retry the bootstrap lazily.
+        logger.warning("Vector store is not ready at startup", exc_info=True)
+
+
+async def close_store() -> None:
+    global _store
+    if _store is not None:
+        await _store.close()
+        _store = None
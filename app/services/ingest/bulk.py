@@ -0,0 +1,461 @@
+"""Bulk import: NDJSON, zip archives and directories through a staged, bounded pipeline.
+
+    read -> extract -> enrich -> embed -> index
+
+Each arrow is a bounded `asyncio.Queue`, so a slow stage applies back-pressure instead of
+buffering the whole collection. Embedding and indexing work on batches: chunk texts of
+several documents go to the embedding coalescer together, and each batch of items is
+inserted in one transaction and upserted to Qdrant in one request. A failing item is
+recorded in the progress report and the run goes on. When a run contains the same
+content twice, the first record in input order is imported and later copies are
+reported as duplicates, however the extraction workers happen to interleave.
+"""
+import asyncio
+import io
+import json
+import logging
+import os
+import zipfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Iterator, List, NamedTuple
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.models import EnrichmentCache, KnowledgeItem, SourceType, User
+from app.db.session import get_session
+from app.llm.coalescer import get_embedding_coalescer
+from app.llm.providers.base import EnrichmentResult, get_provider
+from app.services.extractors.engine import extract_file
+from app.services.extractors.text_extractor import extract_text
+from app.services.extractors.url_extractor import extract_from_url
+from app.services.indexing.qdrant_store import item_payload
+from app.services.indexing.store import get_store
+from app.services.ingest.chunking import Chunk, chunk_text
+from app.services.ingest.enrichment_cache import cached_embeddings, load_enrichment, store_enrichment
+from app.services.ingest.near_duplicates import compute_signature, signature_to_bytes
+from app.services.ingest.pipeline import compute_hash
+from app.services.storage.file_store import save_file, save_html
+
+logger = logging.getLogger(__name__)
+
+FILE_SUFFIXES = {".pdf", ".docx", ".txt", ".md"}
+NDJSON_SUFFIXES = {".ndjson", ".jsonl"}
+
+
+class BulkRecord(NamedTuple):
+    ref: str  # "name.ndjson:12" or an archive member, used in error reports
+    kind: str  # text | url | file
+    title: str | None = None
+    content_text: str | None = None
+    url: str | None = None
+    saved: dict | None = None
+    tags: List[str] | None = None
+    error: str | None = None
+    seq: int = 0  # position in the input, assigned by the reader
+
+
+@dataclass
+class _Doc:
+    record: BulkRecord
+    content_text: str = ""
+    content_hash: str = ""
+    minhash: bytes | None = None
+    source_url: str | None = None
+    file_meta: dict | None = None
+    chunks: List[Chunk] = field(default_factory=list)
+    cached: EnrichmentCache | None = None
+    enrichment: EnrichmentResult | None = None
+    embeddings: List[List[float]] | None = None
+    from_cache: bool = False
+
+
+class BulkProgress:
+    def __init__(self) -> None:
+        self.read = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+
+    def fail(self, ref: str, exc: Exception | str) -> None:
+        self.failed += 1
+        if isinstance(exc, HTTPException):
+            message = str(exc.detail)
+        elif isinstance(exc, Exception):
+            message = f"{type(exc).__name__}: {exc}"
+        else:
+            message = exc
+        if len(self.errors) < settings.bulk_max_errors_reported:
+            self.errors.append({"ref": ref, "error": message})
+
+    def snapshot(self) -> dict:
+        return {
+            "read": self.read,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "pending": self.read - self.succeeded - self.failed,
+            "errors": list(self.errors),
+        }
+
+
+ProgressCallback = Callable[[dict], Awaitable[None]]
+
+
+class _FirstCopies:
+    """Decides which of several identical records in one run is imported: the first in input order.
+
+    Extraction is concurrent, so a later copy can finish first. A record therefore waits
+    until every record before it has been extracted (or failed) before claiming its hash.
+    Records are taken from the extract queue in order, so the wait always ends.
+    """
+
+    def __init__(self) -> None:
+        self._first: dict[str, int] = {}
+        self._done: set[int] = set()
+        self._watermark = 0  # every seq below this has been extracted
+        self._changed = asyncio.Condition()
+
+    async def extracted(self, seq: int, content_hash: str | None) -> None:
+        async with self._changed:
+            if content_hash is not None:
+                self._first[content_hash] = min(self._first.get(content_hash, seq), seq)
+            self._done.add(seq)
+            while self._watermark in self._done:
+                self._done.remove(self._watermark)
+                self._watermark += 1
+            self._changed.notify_all()
+
+    async def is_first(self, seq: int, content_hash: str) -> bool:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self._watermark >= seq)
+        return self._first.get(content_hash, seq) == seq
+
+
+def _ndjson_records(lines, source: str) -> Iterator[BulkRecord]:
+    for lineno, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        ref = f"{source}:{lineno}"
+        try:
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as exc:
+            yield BulkRecord(ref, "invalid", error=f"Invalid JSON: {exc}")
+            continue
+        tags = row.get("tags")
+        if isinstance(tags, str):
+            tags = [t.strip() for t in tags.split(",") if t.strip()]
+        if row.get("content_text"):
+            yield BulkRecord(ref, "text", title=row.get("title"), content_text=row["content_text"], tags=tags)
+        elif row.get("url"):
+            yield BulkRecord(ref, "url", title=row.get("title"), url=row["url"], tags=tags)
+        else:
+            yield BulkRecord(ref, "invalid", error="Record needs content_text or url")
+
+
+def _ndjson_file(path: str) -> Iterator[BulkRecord]:
+    with open(path, encoding="utf-8") as f:
+        yield from _ndjson_records(f, Path(path).name)
+
+
+def _file_record(src, name: str) -> BulkRecord:
+    try:
+        saved = save_file(src, Path(name).name)
+    except HTTPException as exc:
+        return BulkRecord(name, "invalid", error=str(exc.detail))
+    return BulkRecord(name, "file", title=Path(name).name, saved=saved)
+
+
+def _zip_records(path: str) -> Iterator[BulkRecord]:
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            suffix = Path(info.filename).suffix.lower()
+            if info.is_dir() or Path(info.filename).name.startswith("."):
+                continue
+            if suffix in NDJSON_SUFFIXES:
+                with archive.open(info) as member:
+                    yield from _ndjson_records(io.TextIOWrapper(member, encoding="utf-8"), info.filename)
+            elif suffix in FILE_SUFFIXES:
+                with archive.open(info) as member:
+                    yield _file_record(member, info.filename)
+
+
+def _dir_records(path: str) -> Iterator[BulkRecord]:
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            suffix = Path(name).suffix.lower()
+            if suffix in NDJSON_SUFFIXES:
+                with open(full, encoding="utf-8") as f:
+                    yield from _ndjson_records(f, os.path.relpath(full, path))
+            elif suffix in FILE_SUFFIXES:
+                with open(full, "rb") as f:
+                    yield _file_record(f, os.path.relpath(full, path))
+
+
+def detect_format(name: str) -> str | None:
+    suffix = Path(name).suffix.lower()
+    if suffix == ".zip":
+        return "zip"
+    if suffix in NDJSON_SUFFIXES or suffix == ".json":
+        return "ndjson"
+    return None
+
+
+def iter_records(path: str, fmt: str | None = None) -> Iterator[BulkRecord]:
+    """Records from an NDJSON file, a zip archive (files and/or NDJSON) or a directory."""
+    if os.path.isdir(path):
+        return _dir_records(path)
+    fmt = fmt or detect_format(path)
+    if fmt == "zip":
+        return _zip_records(path)
+    if fmt == "ndjson":
+        return _ndjson_file(path)
+    raise ValueError(f"Unsupported bulk import source: {path}")
+
+
+_DONE = object()
+
+
+async def _run_stage(inbox: asyncio.Queue, outbox: asyncio.Queue | None, workers: int, downstream: int, fn, progress: BulkProgress) -> None:
+    """Run `workers` consumers of `inbox`; each result goes to `outbox`, failures to `progress`."""
+    async def worker() -> None:
+        # Entries are BulkRecords before the extract stage and _Docs after it.
+        while (doc := await inbox.get()) is not _DONE:
+            try:
+                result = await fn(doc)
+            except Exception as exc:
+                progress.fail(getattr(doc, "record", doc).ref, exc)
+                continue
+            if outbox is not None and result is not None:
+                await outbox.put(result)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    if outbox is not None:
+        for _ in range(downstream):
+            await outbox.put(_DONE)
+
+
+async def _drain_batch(inbox: asyncio.Queue, size: int) -> tuple[list, bool]:
+    """Block for one entry, then take whatever else is already queued, up to `size`."""
+    first = await inbox.get()
+    if first is _DONE:
+        return [], True
+    batch = [first]
+    while len(batch) < size:
+        try:
+            entry = inbox.get_nowait()
+        except asyncio.QueueEmpty:
+            break
+        if entry is _DONE:
+            return batch, True
+        batch.append(entry)
+    return batch, False
+
+
+async def _extract(record: BulkRecord) -> _Doc:
+    if record.kind == "invalid":
+        raise ValueError(record.error)
+    doc = _Doc(record)
+    if record.kind == "text":
+        doc.content_text = extract_text(record.content_text)
+    elif record.kind == "url":
+        doc.content_text, raw_html = await extract_from_url(record.url)
+        doc.source_url = record.url
+        doc.file_meta = await asyncio.to_thread(save_html, raw_html)
+    else:
+        doc.content_text = await extract_file(record.saved["path"], record.saved["mime"], record.saved["sha256"])
+        doc.file_meta = record.saved
+    if not doc.content_text or not doc.content_text.strip():
+        raise ValueError("No text could be extracted")
+    doc.content_hash = compute_hash(doc.content_text)
+    doc.minhash = signature_to_bytes(await asyncio.to_thread(compute_signature, doc.content_text))
+    doc.chunks = chunk_text(doc.content_text)
+    return doc
+
+
+async def _enrich(doc: _Doc) -> _Doc:
+    provider = get_provider()
+    async with get_session() as db:
+        doc.cached = await load_enrichment(db, doc.content_hash, provider)
+    if doc.cached is not None:
+        doc.enrichment = EnrichmentResult(
+            summary=doc.cached.summary or "", keywords=doc.cached.keywords or [], tags=doc.cached.tags or []
+        )
+        doc.embeddings = cached_embeddings(doc.cached, provider, len(doc.chunks))
+        doc.from_cache = doc.embeddings is not None
+    else:
+        doc.enrichment = await provider.aenrich(doc.content_text)
+    return doc
+
+
+async def _embed_batches(inbox: asyncio.Queue, outbox: asyncio.Queue, progress: BulkProgress) -> None:
+    while True:
+        batch, done = await _drain_batch(inbox, settings.bulk_batch_size)
+        pending = [doc for doc in batch if doc.embeddings is None]
+        texts = [chunk.text for doc in pending for chunk in doc.chunks]
+        try:
+            # One call for the whole batch; the coalescer cuts it into provider-sized requests.
+            vectors = await get_embedding_coalescer().embed_many(texts) if texts else []
+        except Exception as exc:
+            for doc in pending:
+                progress.fail(doc.record.ref, exc)
+            batch = [doc for doc in batch if doc.embeddings is not None]
+        else:
+            offset = 0
+            for doc in pending:
+                doc.embeddings = vectors[offset:offset + len(doc.chunks)]
+                offset += len(doc.chunks)
+        if batch:
+            await outbox.put(batch)
+        if done:
+            await outbox.put(_DONE)
+            return
+
+
+async def _index_batch(user: User, batch: list[_Doc], tags: List[str] | None, force: bool, progress: BulkProgress) -> None:
+    async with get_session() as db:
+        seen: set[str] = set()
+        if not force:
+            result = await db.execute(
+                select(KnowledgeItem.content_hash).where(
+                    KnowledgeItem.owner_id == user.id,
+                    KnowledgeItem.content_hash.in_([doc.content_hash for doc in batch]),
+                )
+            )
+            seen.update(result.scalars().all())
+        rows: list[tuple[_Doc, KnowledgeItem]] = []
+        for doc in batch:
+            if not force and doc.content_hash in seen:
+                progress.fail(doc.record.ref, "Duplicate content")
+                continue
+            seen.add(doc.content_hash)
+            record, enrichment = doc.record, doc.enrichment
+            meta = doc.file_meta or {}
+            item = KnowledgeItem(
+                owner_id=user.id,
+                title=(record.title or record.url or doc.content_text.strip().splitlines()[0])[:255],
+                source_type=SourceType(record.kind),
+                source_url=doc.source_url,
+                original_filename=meta.get("filename"),
+                file_path=meta.get("path"),
+                mime_type=meta.get("mime"),
+                file_hash=meta.get("sha256") if record.kind == "file" else None,
+                content_text=doc.content_text,
+                content_hash=doc.content_hash,
+                minhash=doc.minhash,
+                summary=enrichment.summary,
+                keywords=enrichment.keywords,
+                tags=sorted(set((tags or []) + (record.tags or []) + enrichment.tags)),
+            )
+            db.add(item)
+            rows.append((doc, item))
+        if not rows:
+            return
+        await db.commit()
+
+        try:
+            await get_store().upsert_many([
+                (item.id, doc.chunks, doc.embeddings, item_payload(item)) for doc, item in rows
+            ])
+        except Exception as exc:
+            # Same rule as single ingest: no DB rows without vectors.
+            for doc, item in rows:
+                await db.delete(item)
+                progress.fail(doc.record.ref, exc)
+            await db.commit()
+            return
+
+    provider = get_provider()
+    for doc, item in rows:
+        progress.succeeded += 1
+        if not doc.from_cache:
+            await store_enrichment(
+                doc.cached, doc.content_hash, provider, doc.enrichment.summary, doc.enrichment.keywords,
+                doc.enrichment.tags, doc.embeddings,
+            )
+
+
+async def run_bulk_import(user: User, records: Iterator[BulkRecord], tags: List[str] | None = None, force: bool = False, on_progress: ProgressCallback | None = None) -> dict:
+    """Import `records` for `user`; returns the final progress report."""
+    progress = BulkProgress()
+    size = max(settings.bulk_queue_size, 1)
+    extract_workers = max(settings.bulk_extract_concurrency, 1)
+    enrich_workers = max(settings.bulk_enrich_concurrency, 1)
+    embed_workers = max(settings.bulk_embed_concurrency, 1)
+    first_copies = _FirstCopies()
+    to_extract, to_enrich, to_embed, to_index = (asyncio.Queue(size) for _ in range(4))
+
+    async def read() -> None:
+        iterator = iter(records)
+        try:
+            while (record := await asyncio.to_thread(next, iterator, None)) is not None:
+                await to_extract.put(record._replace(seq=progress.read))
+                progress.read += 1
+        finally:
+            for _ in range(extract_workers):
+                await to_extract.put(_DONE)
+
+    async def index() -> None:
+        while (batch := await to_index.get()) is not _DONE:
+            try:
+                await _index_batch(user, batch, tags, force, progress)
+            except Exception as exc:
+                logger.exception("Bulk import batch failed")
+                for doc in batch:
+                    progress.fail(doc.record.ref, exc)
+            if on_progress:
+                await on_progress(progress.snapshot())
+
+    async def embed() -> None:
+        # Several embedders share the queue; index() needs a single end marker.
+        inner = asyncio.Queue(size)
+
+        async def forward() -> None:
+            remaining = embed_workers
+            while remaining:
+                entry = await inner.get()
+                if entry is _DONE:
+                    remaining -= 1
+                else:
+                    await to_index.put(entry)
+            await to_index.put(_DONE)
+
+        await asyncio.gather(forward(), *(_embed_batches(to_embed, inner, progress) for _ in range(embed_workers)))
+
+    async def extract(record: BulkRecord) -> _Doc:
+        content_hash = None
+        try:
+            doc = await _extract(record)
+            content_hash = doc.content_hash
+            return doc
+        finally:
+            await first_copies.extracted(record.seq, content_hash)
+
+    async def enrich(doc: _Doc) -> _Doc:
+        # Decided before enrichment, so a later copy costs no LLM call.
+        if not force and not await first_copies.is_first(doc.record.seq, doc.content_hash):
+            raise HTTPException(status_code=400, detail="Duplicate content")
+        return await _enrich(doc)
+
+    # Every stage forwards its end markers even when it fails, so the others always finish.
+    outcomes = await asyncio.gather(
+        read(),
+        _run_stage(to_extract, to_enrich, extract_workers, enrich_workers, extract, progress),
+        _run_stage(to_enrich, to_embed, enrich_workers, embed_workers, enrich, progress),
+        embed(),
+        index(),
+        return_exceptions=True,
+    )
+    for outcome in outcomes:
+        if isinstance(outcome, Exception):
+            raise outcome
+    summary = progress.snapshot()
+    if on_progress:
+        await on_progress(summary)
+    return summary
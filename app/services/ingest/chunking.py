@@ -0,0 +1,88 @@
+import re
+from typing import List, NamedTuple
+
+from app.core.config import settings
+
+_CJK = r"\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+# A sentence ends at CJK/Latin terminal punctuation or a line break. Latin periods only
+# count when followed by whitespace so numbers like "3.14" are not split.
+_BOUNDARY_RE = re.compile(r"[。！？；!?;]+|\.(?=\s)|\n+")
+# Approximate tokens: every CJK character, every Latin word/number, every other symbol.
+_TOKEN_RE = re.compile(rf"[{_CJK}]|[^\s{_CJK}\W]+|[^\s\w]")
+
+
+class Chunk(NamedTuple):
+    index: int
+    text: str
+    start: int
+    end: int
+
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN_RE.findall(text))
+
+
+def _measure(text: str, mode: str) -> int:
+    return count_tokens(text) if mode == "token" else len(text)
+
+
+def _split_long(start: int, end: int, text: str, size: int, mode: str) -> List[tuple[int, int]]:
+    """Hard-split a span that is longer than `size` on its own."""
+    if mode != "token":
+        return [(s, min(s + size, end)) for s in range(start, end, size)]
+    bounds = [m.start() + start for m in _TOKEN_RE.finditer(text[start:end])]
+    pieces = []
+    for i in range(0, len(bounds), size):
+        piece_end = bounds[i + size] if i + size < len(bounds) else end
+        pieces.append((bounds[i] if i else start, piece_end))
+    return pieces
+
+
+def _sentence_spans(text: str, size: int, mode: str) -> List[tuple[int, int]]:
+    ends = [m.end() for m in _BOUNDARY_RE.finditer(text)] + [len(text)]
+    spans = []
+    start = 0
+    for end in ends:
+        if end <= start:
+            continue
+        if text[start:end].strip():
+            if _measure(text[start:end], mode) > size:
+                spans.extend(_split_long(start, end, text, size, mode))
+            else:
+                spans.append((start, end))
+        start = end
+    return spans
+
+
+def chunk_text(text: str, size: int | None = None, overlap: int | None = None, mode: str | None = None) -> List[Chunk]:
+    """Split text into windows of at most `size` chars (or tokens) on sentence boundaries.
+
+    Consecutive chunks share up to `overlap` chars/tokens of trailing sentences. CJK text is
+    handled by splitting on full-width punctuation and counting each ideograph as a token.
+    """
+    size = size or settings.chunk_size
+    overlap = settings.chunk_overlap if overlap is None else overlap
+    mode = mode or settings.chunk_mode
+    overlap = max(0, min(overlap, size // 2))
+    spans = _sentence_spans(text, size, mode)
+    chunks: List[Chunk] = []
+    i = 0
+    while i < len(spans):
+        j = i + 1
+        while j < len(spans) and _measure(text[spans[i][0]:spans[j][1]], mode) <= size:
+            j += 1
+        start, end = spans[i][0], spans[j - 1][1]
+        body = text[start:end].strip()
+        if body:
+            chunks.append(Chunk(len(chunks), body, start, end))
+        if j >= len(spans):
+            break
+        # Step back over trailing sentences that fit into the overlap budget.
+        k = j
+        while k - 1 > i and _measure(text[spans[k - 1][0]:end], mode) <= overlap:
+            k -= 1
+        # The next chunk must still have room for at least one new sentence.
+        if _measure(text[spans[k][0]:spans[j][1]], mode) > size:
+            k = j
+        i = k
+    return chunks
@@ -0,0 +1,245 @@
+"""Site crawl ingestion: a sitemap.xml or a seed URL followed to a given depth.
+
+Pages are fetched through the shared `UrlFetcher` (pooled, cached, per-host connection
+cap) with an additional per-host request rate, robots.txt is honoured, and pages are
+deduplicated by normalized URL and by content hash before they reach `enrich_and_save`.
+"""
+import asyncio
+import re
+import time
+import xml.etree.ElementTree as ET
+from typing import Awaitable, Callable, Iterable, List
+from urllib.parse import parse_qsl, urldefrag, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.robotparser import RobotFileParser
+
+import lxml.html
+import trafilatura
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.db.models import KnowledgeItem, SourceType, User
+from app.db.session import get_session
+from app.services.extractors.fetcher import FetchClientError, get_fetcher
+from app.services.ingest.pipeline import compute_hash, enrich_and_save
+from app.services.storage.file_store import save_html
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_TRACKING_PARAM_RE = re.compile(r"^(utm_\w+|fbclid|gclid)$")
+_SITEMAP_NS = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+ProgressCallback = Callable[[dict], Awaitable[None]]
+
+
+def normalize_url(url: str) -> str:
+    """Canonical form used for dedupe: no fragment, lowercase host, default port and tracking params dropped."""
+    url, _ = urldefrag(url.strip())
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _TRACKING_PARAM_RE.match(k)))
+    return urlunsplit((scheme, host, parts.path or "/", query, ""))
+
+
+def parse_sitemap(xml_text: str) -> tuple[list[str], list[str]]:
+    """Return (page urls, nested sitemap urls) from a urlset or sitemapindex document."""
+    root = ET.fromstring(xml_text.encode("utf-8"))
+    locs = [el.text.strip() for el in root.iter(f"{_SITEMAP_NS}loc") if el.text]
+    if root.tag == f"{_SITEMAP_NS}sitemapindex":
+        return [], locs
+    return locs, []
+
+
+def extract_links(html: str, base_url: str) -> tuple[str | None, list[str]]:
+    """The page title and the absolute http(s) targets of its <a href> links."""
+    try:
+        doc = lxml.html.fromstring(html)
+    except (ValueError, lxml.etree.ParserError):
+        return None, []
+    title = (doc.findtext(".//title") or "").strip() or None
+    links = []
+    for href in doc.xpath("//a/@href"):
+        target = urljoin(base_url, href)
+        if urlsplit(target).scheme in ("http", "https"):
+            links.append(target)
+    return title, links
+
+
+class _HostThrottle:
+    """Spaces requests to each host at least 1 / rate seconds apart."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next: dict[str, float] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def wait(self, host: str, min_interval: float = 0.0) -> None:
+        interval = max(self.interval, min_interval)
+        if interval <= 0:
+            return
+        async with self._locks.setdefault(host, asyncio.Lock()):
+            delay = self._next.get(host, 0.0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next[host] = time.monotonic() + interval
+
+
+class SiteCrawler:
+    """Breadth-first crawl of one site; every new page goes through `enrich_and_save`."""
+
+    def __init__(self, user: User, seed_url: str | None = None, sitemap_url: str | None = None, max_depth: int | None = None, include: Iterable[str] = (), exclude: Iterable[str] = (), max_pages: int | None = None, tags: List[str] | None = None, force: bool = False, on_progress: ProgressCallback | None = None) -> None:
+        if not (seed_url or sitemap_url):
+            raise ValueError("A seed URL or a sitemap URL is required")
+        self.user = user
+        self.seed_url = seed_url
+        self.sitemap_url = sitemap_url
+        self.max_depth = settings.crawl_max_depth if max_depth is None else max_depth
+        self.include = [re.compile(p) for p in include]
+        self.exclude = [re.compile(p) for p in exclude]
+        self.max_pages = max_pages or settings.crawl_max_pages
+        self.tags = tags
+        self.force = force
+        self.on_progress = on_progress
+        self.fetcher = get_fetcher()
+        self.throttle = _HostThrottle(settings.crawl_per_host_rps)
+        self._robots: dict[str, RobotFileParser | None] = {}
+        self._robots_locks: dict[str, asyncio.Lock] = {}
+        self._seen_urls: set[str] = set()
+        self._seen_hashes: set[str] = set()
+        self._hash_lock = asyncio.Lock()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.stats = {"discovered": 0, "fetched": 0, "ingested": 0, "skipped": 0, "failed": 0, "errors": []}
+        self.item_ids: list[str] = []
+
+    def _allowed_pattern(self, url: str) -> bool:
+        if self.include and not any(p.search(url) for p in self.include):
+            return False
+        return not any(p.search(url) for p in self.exclude)
+
+    async def _robots_for(self, url: str) -> RobotFileParser | None:
+        """The origin's robots.txt rules, fetched once per crawl; None means no restrictions."""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        # One fetch per origin, however many workers reach it first.
+        async with self._robots_locks.setdefault(origin, asyncio.Lock()):
+            if origin not in self._robots:
+                self._robots[origin] = await self._fetch_robots(origin, parts.netloc)
+        return self._robots[origin]
+
+    async def _fetch_robots(self, origin: str, host: str) -> RobotFileParser | None:
+        await self.throttle.wait(host)
+        parser = RobotFileParser()
+        try:
+            page = await self.fetcher.fetch(f"{origin}/robots.txt")
+        except FetchClientError:
+            # RFC 9309: a robots.txt that is unavailable (4xx) places no restrictions.
+            return None
+        except Exception as exc:
+            # Unreachable (5xx, 429, network error): assume everything is disallowed.
+            self._fail(f"{origin}/robots.txt", exc)
+            parser.disallow_all = True
+            return parser
+        parser.parse(page.html.splitlines())
+        return parser
+
+    def _enqueue(self, url: str, depth: int) -> None:
+        normalized = normalize_url(url)
+        if normalized in self._seen_urls or len(self._seen_urls) >= self.max_pages:
+            return
+        if not self._allowed_pattern(normalized):
+            return
+        self._seen_urls.add(normalized)
+        self.stats["discovered"] += 1
+        self._queue.put_nowait((normalized, depth))
+
+    def _fail(self, url: str, exc: Exception | str) -> None:
+        self.stats["failed"] += 1
+        if len(self.stats["errors"]) < settings.bulk_max_errors_reported:
+            message = exc if isinstance(exc, str) else f"{type(exc).__name__}: {exc}"
+            self.stats["errors"].append({"ref": url, "error": message})
+
+    async def _seed_from_sitemap(self, url: str, budget: int = 20) -> None:
+        pending = [url]
+        while pending and budget > 0:
+            budget -= 1
+            sitemap = pending.pop(0)
+            await self.throttle.wait(urlsplit(sitemap).netloc)
+            page = await self.fetcher.fetch(sitemap)
+            urls, nested = parse_sitemap(page.html)
+            pending.extend(nested)
+            for page_url in urls:
+                self._enqueue(page_url, self.max_depth)  # listed pages are not followed further
+
+    async def _is_new_content(self, content_hash: str) -> bool:
+        async with self._hash_lock:
+            if content_hash in self._seen_hashes:
+                return False
+            self._seen_hashes.add(content_hash)
+        if self.force:
+            return True
+        async with get_session() as db:
+            existing = await db.execute(
+                select(KnowledgeItem.id).where(
+                    KnowledgeItem.owner_id == self.user.id, KnowledgeItem.content_hash == content_hash
+                ).limit(1)
+            )
+            return existing.first() is None
+
+    async def _process(self, url: str, depth: int) -> None:
+        host = urlsplit(url).netloc
+        robots = await self._robots_for(url)
+        crawl_delay = 0.0
+        if robots is not None:
+            if not robots.can_fetch(settings.fetch_user_agent, url):
+                self.stats["skipped"] += 1
+                return
+            crawl_delay = float(robots.crawl_delay(settings.fetch_user_agent) or 0.0)
+        await self.throttle.wait(host, crawl_delay)
+        page = await self.fetcher.fetch(url)
+        self.stats["fetched"] += 1
+        title, links = await asyncio.to_thread(extract_links, page.html, page.url)
+        if depth < self.max_depth:
+            for link in links:
+                if urlsplit(link).netloc == host:
+                    self._enqueue(link, depth + 1)
+        text = await asyncio.to_thread(trafilatura.extract, page.html)
+        if not text or not await self._is_new_content(compute_hash(text)):
+            self.stats["skipped"] += 1
+            return
+        html_meta = await asyncio.to_thread(save_html, page.html)
+        async with get_session() as db:
+            item = await enrich_and_save(
+                db, self.user, title or url, text, SourceType.url, tags=self.tags, source_url=url, file_meta=html_meta
+            )
+        self.item_ids.append(item.id)
+        self.stats["ingested"] += 1
+
+    async def _worker(self) -> None:
+        while True:
+            url, depth = await self._queue.get()
+            try:
+                await self._process(url, depth)
+            except Exception as exc:
+                self._fail(url, exc)
+            finally:
+                self._queue.task_done()
+                if self.on_progress:
+                    await self.on_progress(self.snapshot())
+
+    def snapshot(self) -> dict:
+        return {**self.stats, "errors": list(self.stats["errors"]), "queued": self._queue.qsize()}
+
+    async def run(self) -> dict:
+        if self.sitemap_url:
+            await self._seed_from_sitemap(self.sitemap_url)
+        if self.seed_url:
+            self._enqueue(self.seed_url, 0)
+        workers = [asyncio.create_task(self._worker()) for _ in range(max(settings.crawl_concurrency, 1))]
+        try:
+            await self._queue.join()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return self.snapshot()
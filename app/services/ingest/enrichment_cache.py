@@ -0,0 +1,92 @@
+import hashlib
+import logging
+from array import array
+from typing import List
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import EnrichmentCache
+from app.db.session import get_session
+from app.llm.providers.base import LLMProvider
+
+logger = logging.getLogger(__name__)
+
+
+def chunking_signature() -> str:
+    """Embeddings are only reusable when the text was chunked the same way."""
+    return hashlib.sha256(f"{settings.chunk_mode}:{settings.chunk_size}:{settings.chunk_overlap}".encode()).hexdigest()[:16]
+
+
+def pack_embeddings(embeddings: List[List[float]]) -> bytes:
+    flat = array("f")
+    for vector in embeddings:
+        flat.extend(vector)
+    return flat.tobytes()
+
+
+def unpack_embeddings(blob: bytes, dim: int) -> List[List[float]]:
+    flat = array("f", blob).tolist()
+    return [flat[i:i + dim] for i in range(0, len(flat), dim)]
+
+
+async def load_enrichment(db: AsyncSession, content_hash: str, provider: LLMProvider) -> EnrichmentCache | None:
+    if not settings.enrichment_cache_enabled:
+        return None
+    result = await db.execute(
+        select(EnrichmentCache).where(
+            EnrichmentCache.content_hash == content_hash,
+            EnrichmentCache.provider == provider.name,
+            EnrichmentCache.model == provider.model,
+        )
+    )
+    return result.scalars().first()
+
+
+def cached_embeddings(entry: EnrichmentCache | None, provider: LLMProvider, chunk_count: int) -> List[List[float]] | None:
+    if (
+        entry is None
+        or not entry.embeddings
+        or entry.embedding_model != provider.embedding_model
+        or entry.chunking != chunking_signature()
+        or entry.embedding_dim != settings.embedding_dim
+    ):
+        return None
+    vectors = unpack_embeddings(entry.embeddings, entry.embedding_dim)
+    return vectors if len(vectors) == chunk_count else None
+
+
+async def store_enrichment(entry: EnrichmentCache | None, content_hash: str, provider: LLMProvider, summary: str, keywords: List[str], tags: List[str], embeddings: List[List[float]]) -> None:
+    """Insert or refresh the cache row in its own session, so a lost race never touches the caller's."""
+    if not settings.enrichment_cache_enabled:
+        return
+    async with get_session() as session:
+        if entry is not None:
+            entry = await session.get(EnrichmentCache, entry.id)
+        entry = entry or EnrichmentCache(content_hash=content_hash, provider=provider.name, model=provider.model)
+        entry.summary = summary
+        entry.keywords = keywords
+        entry.tags = tags
+        entry.embedding_model = provider.embedding_model
+        entry.chunking = chunking_signature()
+        entry.embedding_dim = settings.embedding_dim
+        entry.embeddings = pack_embeddings(embeddings)
+        session.add(entry)
+        try:
+            await session.commit()
+        except IntegrityError:
+            await session.rollback()
+            logger.debug("Enrichment cache row for %s already written by another ingest", content_hash)
+
+
+async def invalidate_enrichment_cache(db: AsyncSession, provider: str | None = None, model: str | None = None) -> int:
+    stmt = delete(EnrichmentCache)
+    if provider:
+        stmt = stmt.where(EnrichmentCache.provider == provider)
+    if model:
+        stmt = stmt.where(EnrichmentCache.model == model)
+    result = await db.execute(stmt)
+    await db.commit()
+    return result.rowcount or 0
@@ -0,0 +1,406 @@
+"""Near-duplicate detection: MinHash signatures over character shingles plus an LSH index.
+
+Signatures (`NEAR_DUP_NUM_PERM` 32-bit minimums) are stored per item in
+`knowledge_items.minhash`. Each process keeps an in-memory banded LSH index: per band a
+sorted array of band hashes (binary search) plus a small dict of recent additions that is
+merged in by a background rebuild. The index is built at startup, updated by this process's
+own writes through mapper events, and picks up other processes' writes every
+`NEAR_DUP_REFRESH_SECONDS`.
+
+Writers compute signatures off the event loop (`asyncio.to_thread(compute_signature, ...)`)
+before flushing; the mapper events never hash text. A row written without one is signed by
+the next refresh.
+"""
+import asyncio
+import logging
+import time
+import unicodedata
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+import numpy as np
+from fastapi import HTTPException
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import KnowledgeItem, User
+from app.db.session import get_session
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_61 = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_FNV_OFFSET = np.uint64(14695981039346656037)
+_FNV_PRIME = np.uint64(1099511628211)
+_BLOCK = 4096
+_LOAD_BATCH = 5000
+# Re-read rows changed slightly before the watermark; clocks of API and worker hosts differ.
+_REFRESH_MARGIN = timedelta(seconds=30)
+
+
+@lru_cache()
+def _permutations(num_perm: int) -> tuple[np.ndarray, np.ndarray]:
+    # Fixed seed: signatures are persisted and must stay comparable across restarts.
+    rng = np.random.RandomState(0x5EED)
+    a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+    b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+    return a, b
+
+
+def _shingle_hashes(text: str, size: int) -> np.ndarray:
+    """Distinct 32-bit hashes of the character `size`-grams of the normalized text."""
+    normalized = " ".join(unicodedata.normalize("NFKC", text).lower().split())
+    codes = np.frombuffer(normalized.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if codes.size == 0:
+        return np.zeros(1, dtype=np.uint64)
+    size = min(size, codes.size)
+    count = codes.size - size + 1
+    hashes = np.full(count, _FNV_OFFSET, dtype=np.uint64)
+    for offset in range(size):
+        hashes = (hashes ^ codes[offset:offset + count]) * _FNV_PRIME  # wraps mod 2**64
+    return np.unique((hashes ^ (hashes >> np.uint64(32))) & _MAX_HASH)
+
+
+def compute_signature(text: str, num_perm: int | None = None, shingle_size: int | None = None) -> np.ndarray:
+    """MinHash signature (uint32[num_perm]); the share of equal slots estimates Jaccard similarity."""
+    num_perm = num_perm or settings.near_dup_num_perm
+    a, b = _permutations(num_perm)
+    hashes = _shingle_hashes(text, shingle_size or settings.near_dup_shingle_size)
+    signature = np.full(num_perm, _MAX_HASH, dtype=np.uint64)
+    for start in range(0, hashes.size, _BLOCK):
+        block = hashes[start:start + _BLOCK, None]
+        np.minimum(signature, (((block * a + b) % _MERSENNE_61) & _MAX_HASH).min(axis=0), out=signature)
+    return signature.astype(np.uint32)
+
+
+def signature_to_bytes(signature: np.ndarray) -> bytes:
+    return signature.astype("<u4").tobytes()
+
+
+def signature_from_bytes(blob: bytes | None) -> np.ndarray | None:
+    if not blob or len(blob) != settings.near_dup_num_perm * 4:
+        # Missing, or computed with a different NEAR_DUP_NUM_PERM.
+        return None
+    return np.frombuffer(blob, dtype="<u4").astype(np.uint32)
+
+
+def _band_keys(signatures: np.ndarray, bands: int) -> np.ndarray:
+    """One 64-bit hash per (row, band) of an (n, num_perm) signature matrix."""
+    rows = signatures.shape[1] // bands
+    sliced = signatures[:, :bands * rows].astype(np.uint64).reshape(len(signatures), bands, rows)
+    keys = np.full((len(signatures), bands), _FNV_OFFSET, dtype=np.uint64)
+    for row in range(rows):
+        keys = (keys ^ sliced[:, :, row]) * _FNV_PRIME
+    return keys
+
+
+def _sort_bands(signatures: np.ndarray, bands: int) -> tuple[list, list]:
+    """Per band, the sorted band hashes and the row each came from."""
+    keys = _band_keys(signatures, bands)
+    orders = [np.argsort(keys[:, band], kind="stable") for band in range(bands)]
+    return [keys[order, band] for band, order in enumerate(orders)], orders
+
+
+class NearDuplicateIndex:
+    def __init__(self, num_perm: int, bands: int) -> None:
+        self.num_perm = num_perm
+        self.bands = max(1, min(bands, num_perm))
+        self._ids: list[str | None] = []
+        self._positions: dict[str, int] = {}
+        self._owners = np.zeros(0, dtype=np.int64)
+        self._signatures = np.zeros((0, num_perm), dtype=np.uint32)
+        self._sorted_keys = [np.zeros(0, dtype=np.uint64) for _ in range(self.bands)]
+        self._sorted_positions = [np.zeros(0, dtype=np.int64) for _ in range(self.bands)]
+        self._recent: list[dict[int, list[int]]] = [{} for _ in range(self.bands)]
+        self._recent_count = 0
+        # Writes recorded while `rebuild_async` sorts a snapshot; None when no rebuild runs.
+        self._journal: list[tuple[str, int, np.ndarray | None]] | None = None
+        self.loaded = False
+        self.watermark: datetime | None = None
+        self.refreshed_at = 0.0
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def _append(self, item_id: str, owner_id: int, signature: np.ndarray) -> int:
+        position = len(self._ids)
+        if position >= len(self._owners):
+            capacity = max(1024, 2 * len(self._owners))
+            self._owners = np.resize(self._owners, capacity)
+            signatures = np.zeros((capacity, self.num_perm), dtype=np.uint32)
+            signatures[:position] = self._signatures[:position]
+            self._signatures = signatures
+        self._ids.append(item_id)
+        self._positions[item_id] = position
+        self._owners[position] = owner_id
+        self._signatures[position] = signature
+        return position
+
+    def _live(self) -> tuple[list[str], np.ndarray, np.ndarray]:
+        positions = np.fromiter(self._positions.values(), dtype=np.int64, count=len(self._positions))
+        return list(self._positions), self._signatures[positions], self._owners[positions]
+
+    def _install(self, ids: list[str], signatures: np.ndarray, owners: np.ndarray, bands: tuple[list, list]) -> None:
+        self._ids = ids
+        self._positions = {item_id: position for position, item_id in enumerate(ids)}
+        self._signatures = signatures
+        self._owners = owners
+        self._sorted_keys, self._sorted_positions = bands
+        self._recent = [{} for _ in range(self.bands)]
+        self._recent_count = 0
+
+    def rebuild(self) -> None:
+        """Drop removed slots and re-sort every band, folding in the recent additions."""
+        ids, signatures, owners = self._live()
+        self._install(ids, signatures, owners, _sort_bands(signatures, self.bands))
+
+    async def rebuild_async(self) -> None:
+        """`rebuild` with the sorting in a worker thread; writes made meanwhile are replayed on top."""
+        ids, signatures, owners = self._live()
+        self._journal = []
+        try:
+            bands = await asyncio.to_thread(_sort_bands, signatures, self.bands)
+        finally:
+            journal, self._journal = self._journal, None
+        self._install(ids, signatures, owners, bands)
+        for item_id, owner_id, signature in journal:
+            if signature is None:
+                self.remove(item_id)
+            else:
+                self.add(item_id, owner_id, signature)
+
+    @property
+    def needs_rebuild(self) -> bool:
+        return self._recent_count > max(10_000, len(self._positions) // 10)
+
+    def extend(self, entries: list[tuple[str, int, np.ndarray]]) -> None:
+        """Bulk insert without updating the band arrays; call `rebuild` afterwards."""
+        for item_id, owner_id, signature in entries:
+            self.remove(item_id)
+            self._append(item_id, owner_id, signature)
+
+    def add(self, item_id: str, owner_id: int, signature: np.ndarray) -> None:
+        position = self._positions.get(item_id)
+        if position is not None and self._owners[position] == owner_id and np.array_equal(self._signatures[position], signature):
+            return
+        self.remove(item_id)
+        position = self._append(item_id, owner_id, signature)
+        for band, key in enumerate(_band_keys(signature[None, :], self.bands)[0].tolist()):
+            self._recent[band].setdefault(key, []).append(position)
+        self._recent_count += 1
+        if self._journal is not None:
+            self._journal.append((item_id, owner_id, signature))
+
+    def remove(self, item_id: str) -> None:
+        if self._journal is not None:
+            self._journal.append((item_id, 0, None))
+        position = self._positions.pop(item_id, None)
+        if position is not None:
+            # The slot stays in the band arrays until the next rebuild; lookups skip it.
+            self._ids[position] = None
+
+    def query(self, signature: np.ndarray, threshold: float, owner_id: int | None = None, exclude_id: str | None = None, limit: int = 10) -> list[tuple[str, float]]:
+        candidates: set[int] = set()
+        for band, key in enumerate(_band_keys(signature[None, :], self.bands)[0]):
+            keys = self._sorted_keys[band]
+            lo, hi = np.searchsorted(keys, key, "left"), np.searchsorted(keys, key, "right")
+            candidates.update(self._sorted_positions[band][lo:hi].tolist())
+            candidates.update(self._recent[band].get(int(key), ()))
+        positions = [
+            p for p in candidates
+            if self._ids[p] is not None and self._ids[p] != exclude_id and (owner_id is None or self._owners[p] == owner_id)
+        ]
+        if not positions:
+            return []
+        scores = (self._signatures[positions] == signature).mean(axis=1)
+        matches = sorted(
+            ((self._ids[p], float(score)) for p, score in zip(positions, scores) if score >= threshold),
+            key=lambda match: match[1], reverse=True,
+        )
+        return matches[:limit]
+
+
+_index: NearDuplicateIndex | None = None
+_index_lock = asyncio.Lock()
+_rebuild_task: asyncio.Task | None = None
+
+
+def get_index() -> NearDuplicateIndex:
+    global _index
+    if _index is None:
+        _index = NearDuplicateIndex(settings.near_dup_num_perm, settings.near_dup_bands)
+    return _index
+
+
+async def _rebuild_in_background(index: NearDuplicateIndex) -> None:
+    try:
+        await index.rebuild_async()
+    except Exception:
+        logger.warning("Failed to rebuild the near-duplicate index", exc_info=True)
+
+
+def _schedule_rebuild(index: NearDuplicateIndex) -> None:
+    """Fold recent additions in from a background task, never inside the caller's flush."""
+    global _rebuild_task
+    if not index.needs_rebuild or (_rebuild_task is not None and not _rebuild_task.done()):
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        index.rebuild()
+        return
+    _rebuild_task = loop.create_task(_rebuild_in_background(index))
+
+
+async def _backfill(db: AsyncSession, rows: list) -> list[tuple[str, int, np.ndarray]]:
+    """Compute and store signatures for items ingested before they existed."""
+    entries = []
+    for row in rows:
+        signature = await asyncio.to_thread(compute_signature, row.content_text)
+        await db.execute(update(KnowledgeItem).where(KnowledgeItem.id == row.id).values(minhash=signature_to_bytes(signature)))
+        entries.append((row.id, row.owner_id, signature))
+    await db.commit()
+    return entries
+
+
+async def _load(index: NearDuplicateIndex) -> None:
+    started = datetime.utcnow()
+    after_id = ""
+    async with get_session() as db:
+        while True:
+            rows = (await db.execute(
+                select(KnowledgeItem.id, KnowledgeItem.owner_id, KnowledgeItem.minhash)
+                .where(KnowledgeItem.is_deleted == False, KnowledgeItem.id > after_id)  # noqa: E712
+                .order_by(KnowledgeItem.id)
+                .limit(_LOAD_BATCH)
+            )).all()
+            if not rows:
+                break
+            after_id = rows[-1].id
+            entries, missing = [], []
+            for row in rows:
+                signature = signature_from_bytes(row.minhash)
+                if signature is None:
+                    missing.append(row.id)
+                else:
+                    entries.append((row.id, row.owner_id, signature))
+            if missing:
+                stale = (await db.execute(
+                    select(KnowledgeItem.id, KnowledgeItem.owner_id, KnowledgeItem.content_text).where(KnowledgeItem.id.in_(missing))
+                )).all()
+                entries.extend(await _backfill(db, stale))
+            index.extend(entries)
+    # Nothing else touches the index until it is marked loaded.
+    await asyncio.to_thread(index.rebuild)
+    index.loaded = True
+    index.watermark = started
+    index.refreshed_at = time.monotonic()
+    logger.info("Near-duplicate index loaded with %s items", len(index))
+
+
+async def _refresh(index: NearDuplicateIndex) -> None:
+    started = datetime.utcnow()
+    async with get_session() as db:
+        rows = (await db.execute(
+            select(KnowledgeItem.id, KnowledgeItem.owner_id, KnowledgeItem.minhash, KnowledgeItem.is_deleted)
+            .where(KnowledgeItem.updated_at >= index.watermark - _REFRESH_MARGIN)
+        )).all()
+        missing = {row.id for row in rows if not row.is_deleted and signature_from_bytes(row.minhash) is None}
+        signed = {}
+        if missing:
+            stale = (await db.execute(
+                select(KnowledgeItem.id, KnowledgeItem.owner_id, KnowledgeItem.content_text).where(KnowledgeItem.id.in_(missing))
+            )).all()
+            signed = {item_id: (owner_id, signature) for item_id, owner_id, signature in await _backfill(db, stale)}
+    for row in rows:
+        if row.id in missing:
+            index.add(row.id, *signed[row.id])
+            continue
+        signature = signature_from_bytes(row.minhash)
+        if row.is_deleted or signature is None:
+            index.remove(row.id)
+        else:
+            index.add(row.id, row.owner_id, signature)
+    index.watermark = started
+    index.refreshed_at = time.monotonic()
+    _schedule_rebuild(index)
+
+
+async def ensure_index() -> NearDuplicateIndex:
+    """The process-wide index, loaded on first use and refreshed from the database periodically."""
+    index = get_index()
+    if index.loaded and time.monotonic() - index.refreshed_at < settings.near_dup_refresh_seconds:
+        return index
+    async with _index_lock:
+        if not index.loaded:
+            await _load(index)
+        elif time.monotonic() - index.refreshed_at >= settings.near_dup_refresh_seconds:
+            await _refresh(index)
+    return index
+
+
+async def build_index() -> None:
+    """Startup hook: load the index in the background so the first lookup finds it ready."""
+    try:
+        await ensure_index()
+    except Exception:
+        logger.warning("Failed to build the near-duplicate index", exc_info=True)
+
+
+async def find_near_duplicates(signature: np.ndarray, owner_id: int | None = None, exclude_id: str | None = None, threshold: float | None = None, limit: int = 10) -> list[tuple[str, float]]:
+    index = await ensure_index()
+    threshold = settings.near_dup_threshold if threshold is None else threshold
+    return index.query(signature, threshold, owner_id=owner_id, exclude_id=exclude_id, limit=limit)
+
+
+async def check_near_duplicate(db: AsyncSession, user: User, content_text: str, force: bool = False) -> tuple[np.ndarray, KnowledgeItem | None]:
+    """Signature of `content_text` and, in link mode, the item it nearly duplicates.
+
+    Raises 400 in reject mode. Runs before enrichment so a near-duplicate costs no LLM calls.
+    """
+    signature = await asyncio.to_thread(compute_signature, content_text)
+    if force or settings.near_dup_mode not in ("reject", "link"):
+        return signature, None
+    matches = await find_near_duplicates(signature, owner_id=user.id)
+    if not matches:
+        return signature, None
+    # The index may still hold an item another process just deleted.
+    result = await db.execute(
+        select(KnowledgeItem).where(KnowledgeItem.id.in_([item_id for item_id, _ in matches]), KnowledgeItem.is_deleted == False)  # noqa: E712
+    )
+    found = {item.id: item for item in result.scalars().all()}
+    original = next((found[item_id] for item_id, _ in matches if item_id in found), None)
+    if original is None:
+        return signature, None
+    if settings.near_dup_mode == "reject":
+        raise HTTPException(status_code=400, detail=f"Near-duplicate of item {original.id}")
+    return signature, original
+
+
+@event.listens_for(KnowledgeItem, "before_update")
+def _drop_stale_signature(mapper, connection, target: KnowledgeItem) -> None:
+    # Hashing here would block the event loop; the next refresh signs the new text instead.
+    state = inspect(target)
+    if state.attrs.content_text.history.has_changes() and not state.attrs.minhash.history.has_changes():
+        target.minhash = None
+
+
+@event.listens_for(KnowledgeItem, "after_insert")
+@event.listens_for(KnowledgeItem, "after_update")
+def _index_write(mapper, connection, target: KnowledgeItem) -> None:
+    index = get_index()
+    if not index.loaded:
+        return
+    signature = signature_from_bytes(target.minhash)
+    if target.is_deleted or signature is None:
+        index.remove(target.id)
+    else:
+        index.add(target.id, target.owner_id, signature)
+        _schedule_rebuild(index)
+
+
+@event.listens_for(KnowledgeItem, "after_delete")
+def _index_delete(mapper, connection, target: KnowledgeItem) -> None:
+    if _index is not None:
+        _index.remove(target.id)
@@ -1,30 +1,73 @@
+import asyncio
 import hashlib
-from typing import List
+import logging
+from typing import Awaitable, Callable, List
 from fastapi import UploadFile, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from app.core.metrics import INGEST_STAGE_SECONDS, timer
 from app.db.models import KnowledgeItem, SourceType, User
 from app.services.extractors.text_extractor import extract_text
 from app.services.extractors.url_extractor import extract_from_url
-from app.services.extractors.file_extractor import extract_from_file
-from app.services.indexing.qdrant_store import QdrantStore
-from app.llm.providers.base import get_provider
+from app.services.extractors.engine import extract_file
+from app.services.indexing.qdrant_store import item_payload
+from app.services.indexing.store import get_store
+from app.llm.providers.base import EnrichmentResult, get_provider
+from app.llm.coalescer import get_embedding_coalescer
+from app.services.ingest.chunking import chunk_text
+from app.services.ingest.enrichment_cache import cached_embeddings, load_enrichment, store_enrichment
+from app.services.ingest.near_duplicates import check_near_duplicate, compute_signature, signature_to_bytes
 from app.services.storage.file_store import save_upload, save_html
 
+logger = logging.getLogger(__name__)
+
+# Called with the name of each pipeline stage (extract/enrich/embed/index) as it starts.
+StageCallback = Callable[[str], Awaitable[None]]
+
 
 def compute_hash(content: str) -> str:
     return hashlib.sha256(content.encode("utf-8")).hexdigest()
 
 
-async def enrich_and_save(db: AsyncSession, user: User, title: str, content_text: str, source_type: SourceType, tags: List[str] | None = None, source_url: str | None = None, file_meta: dict | None = None, existing: KnowledgeItem | None = None) -> KnowledgeItem:
+async def _report(on_stage: StageCallback | None, stage: str) -> None:
+    if on_stage:
+        await on_stage(stage)
+
+
+async def enrich_and_save(db: AsyncSession, user: User, title: str, content_text: str, source_type: SourceType, tags: List[str] | None = None, source_url: str | None = None, file_meta: dict | None = None, existing: KnowledgeItem | None = None, on_stage: StageCallback | None = None, minhash: bytes | None = None) -> KnowledgeItem:
     provider = get_provider()
-    summary = provider.summarize(content_text)
-    keywords = provider.extract_keywords(content_text)
-    model_tags = provider.generate_tags(content_text)
+    content_hash = compute_hash(content_text)
+    with timer(INGEST_STAGE_SECONDS, stage="cache_lookup"):
+        cached = await load_enrichment(db, content_hash, provider)
+    with timer(INGEST_STAGE_SECONDS, stage="chunk"):
+        chunks = chunk_text(content_text)
+    cached_vectors = cached_embeddings(cached, provider, len(chunks))
+
+    async def _enrich() -> EnrichmentResult:
+        if cached is not None:
+            result = EnrichmentResult(summary=cached.summary or "", keywords=cached.keywords or [], tags=cached.tags or [])
+        else:
+            with timer(INGEST_STAGE_SECONDS, stage="enrich"):
+                result = await provider.aenrich(content_text)
+        # Enrichment and embedding run concurrently; from here on only embeddings are outstanding.
+        await _report(on_stage, "embed")
+        return result
+
+    async def _embed() -> List[List[float]]:
+        if cached_vectors is not None:
+            return cached_vectors
+        with timer(INGEST_STAGE_SECONDS, stage="embed"):
+            return await get_embedding_coalescer().embed_many([chunk.text for chunk in chunks])
+
+    await _report(on_stage, "enrich")
+    enrichment, embeddings = await asyncio.gather(_enrich(), _embed())
+    summary, keywords, model_tags = enrichment.summary, enrichment.keywords, enrichment.tags
     merged_tags = sorted(set((tags or []) + model_tags))
-    embedding = provider.embed(content_text)
 
+    await _report(on_stage, "index")
+    if minhash is None:
+        minhash = signature_to_bytes(await asyncio.to_thread(compute_signature, content_text))
     item = existing or KnowledgeItem(owner_id=user.id)
     item.title = title
     item.source_type = source_type
@@ -33,53 +76,124 @@ async def enrich_and_save(db: AsyncSession, user: User, title: str, content_text
     item.summary = summary
     item.keywords = keywords
     item.tags = merged_tags
-    item.content_hash = compute_hash(content_text)
+    item.content_hash = content_hash
+    item.minhash = minhash
 
     if file_meta:
         item.original_filename = file_meta.get("filename")
         item.file_path = file_meta.get("path")
         item.mime_type = file_meta.get("mime")
+        item.file_hash = file_meta.get("sha256")
 
+    with timer(INGEST_STAGE_SECONDS, stage="db_commit"):
+        db.add(item)
+        await db.commit()
+        await db.refresh(item)
+
+    try:
+        with timer(INGEST_STAGE_SECONDS, stage="vector_upsert"):
+            await get_store().upsert_chunks(item.id, chunks, embeddings, item_payload(item))
+    except Exception:
+        # Don't leave an unindexed row behind, otherwise a job retry would create a duplicate.
+        if existing is None:
+            await db.delete(item)
+            await db.commit()
+        raise
+    if cached_vectors is None:
+        with timer(INGEST_STAGE_SECONDS, stage="cache_store"):
+            await store_enrichment(cached, content_hash, provider, summary, keywords, model_tags, embeddings)
+    return item
+
+
+async def link_near_duplicate(db: AsyncSession, user: User, original: KnowledgeItem, title: str, content_text: str, source_type: SourceType, tags: List[str] | None = None, source_url: str | None = None, file_meta: dict | None = None, minhash: bytes | None = None) -> KnowledgeItem:
+    """Store a near-duplicate as a link to `original`: its enrichment is reused and it gets no vectors."""
+    item = KnowledgeItem(
+        owner_id=user.id,
+        title=title,
+        source_type=source_type,
+        source_url=source_url,
+        content_text=content_text,
+        content_hash=compute_hash(content_text),
+        summary=original.summary,
+        keywords=original.keywords,
+        tags=sorted(set((tags or []) + (original.tags or []))),
+        minhash=minhash,
+        duplicate_of=original.id,
+    )
+    if file_meta:
+        item.original_filename = file_meta.get("filename")
+        item.file_path = file_meta.get("path")
+        item.mime_type = file_meta.get("mime")
+        item.file_hash = file_meta.get("sha256")
     db.add(item)
     await db.commit()
     await db.refresh(item)
-
-    store = QdrantStore()
-    await store.upsert_item(item.id, embedding, {
-        "title": item.title,
-        "tags": item.tags,
-        "keywords": item.keywords,
-        "owner_id": item.owner_id,
-        "created_at": item.created_at.isoformat(),
-    })
     return item
 
 
-async def ingest_text(db: AsyncSession, user: User, title: str, content_text: str, tags: List[str] | None = None, existing: KnowledgeItem | None = None) -> KnowledgeItem:
-    return await enrich_and_save(db, user, title, content_text, SourceType.text, tags=tags, existing=existing)
+async def deindex_item(item_id: str) -> None:
+    """Remove all chunk points of a deleted item; the DB row is already gone, so only log failures."""
+    try:
+        await get_store().delete_item(item_id)
+    except Exception:
+        logger.warning("Failed to remove vectors of item %s", item_id, exc_info=True)
+
+
+async def _ensure_not_duplicate(db: AsyncSession, user: User, content_text: str) -> None:
+    existing = await db.execute(
+        select(KnowledgeItem).where(KnowledgeItem.owner_id == user.id, KnowledgeItem.content_hash == compute_hash(content_text))
+    )
+    if existing.scalars().first():
+        raise HTTPException(status_code=400, detail="Duplicate content")
+
+
+async def ensure_file_not_duplicate(db: AsyncSession, user: User, file_hash: str | None) -> None:
+    """Reject a byte-identical re-upload before paying for extraction."""
+    if not file_hash:
+        return
+    existing = await db.execute(
+        select(KnowledgeItem.id).where(KnowledgeItem.owner_id == user.id, KnowledgeItem.file_hash == file_hash).limit(1)
+    )
+    if existing.first():
+        raise HTTPException(status_code=400, detail="Duplicate content")
+
 
+async def ingest_text(db: AsyncSession, user: User, title: str, content_text: str, tags: List[str] | None = None, existing: KnowledgeItem | None = None, on_stage: StageCallback | None = None) -> KnowledgeItem:
+    await _report(on_stage, "extract")
+    content_text = extract_text(content_text)
+    return await enrich_and_save(db, user, title, content_text, SourceType.text, tags=tags, existing=existing, on_stage=on_stage)
 
-async def ingest_url(db: AsyncSession, user: User, url: str, title: str | None, tags: List[str] | None = None, force: bool = False) -> KnowledgeItem:
-    content_text, raw_html = extract_from_url(url)
+
+async def ingest_url(db: AsyncSession, user: User, url: str, title: str | None, tags: List[str] | None = None, force: bool = False, on_stage: StageCallback | None = None) -> KnowledgeItem:
+    await _report(on_stage, "extract")
+    content_text, raw_html = await extract_from_url(url)
     title = title or url
-    html_meta = save_html(raw_html)
+    html_meta = await asyncio.to_thread(save_html, raw_html)
+    if not force:
+        await _ensure_not_duplicate(db, user, content_text)
+    signature, original = await check_near_duplicate(db, user, content_text, force=force)
+    minhash = signature_to_bytes(signature)
+    if original is not None:
+        return await link_near_duplicate(db, user, original, title, content_text, SourceType.url, tags=tags, source_url=url, file_meta=html_meta, minhash=minhash)
+    return await enrich_and_save(db, user, title, content_text, SourceType.url, tags=tags, source_url=url, file_meta=html_meta, on_stage=on_stage, minhash=minhash)
+
+
+async def ingest_saved_file(db: AsyncSession, user: User, saved: dict, title: str | None, tags: List[str] | None = None, force: bool = False, on_stage: StageCallback | None = None) -> KnowledgeItem:
+    """Ingest a file already persisted by `save_upload` (used by the job queue)."""
     if not force:
-        existing = await db.execute(
-            select(KnowledgeItem).where(KnowledgeItem.owner_id == user.id, KnowledgeItem.content_hash == compute_hash(content_text))
-        )
-        if existing.scalars().first():
-            raise HTTPException(status_code=400, detail="Duplicate content")
-    return await enrich_and_save(db, user, title, content_text, SourceType.url, tags=tags, source_url=url, file_meta=html_meta)
-
-
-async def ingest_file(db: AsyncSession, user: User, file: UploadFile, title: str | None, tags: List[str] | None = None, force: bool = False) -> KnowledgeItem:
-    saved = save_upload(file)
-    content_text = extract_from_file(saved["path"], saved["mime"])
-    title = title or (file.filename or "uploaded file")
+        await ensure_file_not_duplicate(db, user, saved.get("sha256"))
+    await _report(on_stage, "extract")
+    content_text = await extract_file(saved["path"], saved["mime"], saved.get("sha256"))
+    title = title or saved.get("filename") or "uploaded file"
     if not force:
-        existing = await db.execute(
-            select(KnowledgeItem).where(KnowledgeItem.owner_id == user.id, KnowledgeItem.content_hash == compute_hash(content_text))
-        )
-        if existing.scalars().first():
-            raise HTTPException(status_code=400, detail="Duplicate content")
-    return await enrich_and_save(db, user, title, content_text, SourceType.file, tags=tags, file_meta=saved)
+        await _ensure_not_duplicate(db, user, content_text)
+    signature, original = await check_near_duplicate(db, user, content_text, force=force)
+    minhash = signature_to_bytes(signature)
+    if original is not None:
+        return await link_near_duplicate(db, user, original, title, content_text, SourceType.file, tags=tags, file_meta=saved, minhash=minhash)
+    return await enrich_and_save(db, user, title, content_text, SourceType.file, tags=tags, file_meta=saved, on_stage=on_stage, minhash=minhash)
+
+
+async def ingest_file(db: AsyncSession, user: User, file: UploadFile, title: str | None, tags: List[str] | None = None, force: bool = False, on_stage: StageCallback | None = None) -> KnowledgeItem:
+    saved = await save_upload(file)
+    return await ingest_saved_file(db, user, saved, title or file.filename, tags, force=force, on_stage=on_stage)
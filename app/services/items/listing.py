@@ -0,0 +1,62 @@
+import base64
+import binascii
+from datetime import datetime
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import KnowledgeItem
+
+# Only what list views render; never pull content_text for a listing.
+LIST_COLUMNS = (
+    KnowledgeItem.id,
+    KnowledgeItem.title,
+    KnowledgeItem.tags,
+    KnowledgeItem.summary,
+    KnowledgeItem.created_at,
+)
+
+
+HYDRATE_COLUMNS = LIST_COLUMNS + (KnowledgeItem.source_type,)
+
+
+async def hydrate_items(db: AsyncSession, ids: list[str]) -> dict[str, dict]:
+    """Live items for search hits, fetched in one IN query and keyed by id; deleted ids are absent."""
+    if not ids:
+        return {}
+    result = await db.execute(
+        select(*HYDRATE_COLUMNS).where(KnowledgeItem.id.in_(ids), KnowledgeItem.is_deleted == False)
+    )
+    return {row["id"]: {**row, "source_type": row["source_type"].value} for row in result.mappings().all()}
+
+
+def encode_cursor(created_at: datetime, item_id: str) -> str:
+    raw = f"{created_at.isoformat()}|{item_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        created_at, item_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), item_id
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+async def list_items_page(db: AsyncSession, limit: int, cursor: str | None = None) -> tuple[list[dict], str | None]:
+    """One page of live items, newest first, seeking on (created_at, id) instead of OFFSET."""
+    stmt = select(*LIST_COLUMNS).where(KnowledgeItem.is_deleted == False)
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(
+            KnowledgeItem.created_at < created_at,
+            and_(KnowledgeItem.created_at == created_at, KnowledgeItem.id < item_id),
+        ))
+    stmt = stmt.order_by(KnowledgeItem.created_at.desc(), KnowledgeItem.id.desc()).limit(limit + 1)
+    rows = [dict(row) for row in (await db.execute(stmt)).mappings().all()]
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["id"])
+    return rows, next_cursor
@@ -0,0 +1,98 @@
+from datetime import datetime
+from typing import Awaitable, Callable
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import IngestJob, User
+from app.db.session import get_session
+from app.services.indexing.reindex import run_payload_backfill, run_reindex
+from app.services.ingest.bulk import iter_records, run_bulk_import
+from app.services.ingest.crawler import SiteCrawler
+from app.services.ingest.pipeline import StageCallback, ingest_saved_file, ingest_text, ingest_url
+
+# A handler runs one job and returns {"item_id": ..., "result": ...} for the job row.
+JobHandler = Callable[[AsyncSession, User, IngestJob, StageCallback], Awaitable[dict]]
+
+
+async def handle_text(db: AsyncSession, user: User, job: IngestJob, on_stage: StageCallback) -> dict:
+    payload = job.payload or {}
+    item = await ingest_text(db, user, payload["title"], payload["content_text"], payload.get("tags"), on_stage=on_stage)
+    return {"item_id": item.id}
+
+
+async def handle_url(db: AsyncSession, user: User, job: IngestJob, on_stage: StageCallback) -> dict:
+    payload = job.payload or {}
+    item = await ingest_url(db, user, payload["url"], payload.get("title"), payload.get("tags"), force=payload.get("force", False), on_stage=on_stage)
+    return {"item_id": item.id}
+
+
+async def handle_file(db: AsyncSession, user: User, job: IngestJob, on_stage: StageCallback) -> dict:
+    payload = job.payload or {}
+    item = await ingest_saved_file(db, user, payload["saved"], payload.get("title"), payload.get("tags"), force=payload.get("force", False), on_stage=on_stage)
+    return {"item_id": item.id}
+
+
+def _progress_writer(job: IngestJob, stage: str) -> Callable[[dict], Awaitable[None]]:
+    async def on_progress(progress: dict) -> None:
+        # Also renews the job lease, which matters for long imports and crawls.
+        async with get_session() as session:
+            await session.execute(
+                update(IngestJob)
+                .where(IngestJob.id == job.id)
+                .values(progress={stage: "running", **progress}, locked_at=datetime.utcnow())
+            )
+            await session.commit()
+
+    return on_progress
+
+
+async def handle_bulk(db: AsyncSession, user: User, job: IngestJob, on_stage: StageCallback) -> dict:
+    payload = job.payload or {}
+    await on_stage("import")
+    records = iter_records(payload["saved"]["path"], payload.get("format"))
+    summary = await run_bulk_import(user, records, payload.get("tags"), force=payload.get("force", False), on_progress=_progress_writer(job, "import"))
+    return {"result": summary}
+
+
+async def handle_crawl(db: AsyncSession, user: User, job: IngestJob, on_stage: StageCallback) -> dict:
+    payload = job.payload or {}
+    await on_stage("crawl")
+    crawler = SiteCrawler(
+        user,
+        seed_url=payload.get("url"),
+        sitemap_url=payload.get("sitemap_url"),
+        max_depth=payload.get("max_depth"),
+        include=payload.get("include") or (),
+        exclude=payload.get("exclude") or (),
+        max_pages=payload.get("max_pages"),
+        tags=payload.get("tags"),
+        force=payload.get("force", False),
+        on_progress=_progress_writer(job, "crawl"),
+    )
+    return {"result": await crawler.run()}
+
+
+async def handle_reindex(db: AsyncSession, user: User, job: IngestJob, on_stage: StageCallback) -> dict:
+    payload = job.payload or {}
+    await on_stage("reindex")
+    # The progress written by an interrupted attempt is the checkpoint to resume from.
+    summary = await run_reindex(job.progress, keep_old=payload.get("keep_old", False), on_progress=_progress_writer(job, "reindex"))
+    return {"result": summary}
+
+
+async def handle_payload_backfill(db: AsyncSession, user: User, job: IngestJob, on_stage: StageCallback) -> dict:
+    await on_stage("backfill")
+    summary = await run_payload_backfill(job.progress, on_progress=_progress_writer(job, "backfill"))
+    return {"result": summary}
+
+
+JOB_HANDLERS: dict[str, JobHandler] = {
+    "text": handle_text,
+    "url": handle_url,
+    "file": handle_file,
+    "bulk": handle_bulk,
+    "crawl": handle_crawl,
+    "reindex": handle_reindex,
+    "payload_backfill": handle_payload_backfill,
+}
@@ -0,0 +1,333 @@
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import IngestJob, JobStatus, User
+from app.db.session import AsyncSessionLocal
+from app.services.jobs.handlers import JOB_HANDLERS
+
+logger = logging.getLogger(__name__)
+
+_worker_pool: "JobWorkerPool | None" = None
+
+# How long an exclusive job stays unclaimable while its enqueuer checks for a rival; if the
+# enqueuer dies in between, the job simply becomes runnable afterwards.
+_EXCLUSIVE_HOLD = timedelta(seconds=30)
+
+
+async def enqueue_job(db: AsyncSession, user: User, kind: str, payload: dict, run_after: datetime | None = None) -> IngestJob:
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    job = IngestJob(
+        owner_id=user.id,
+        kind=kind,
+        status=JobStatus.pending,
+        payload=payload,
+        progress={},
+        attempts=0,
+        max_attempts=settings.ingest_max_attempts,
+        run_after=run_after or datetime.utcnow(),
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    if _worker_pool is not None:
+        _worker_pool.notify()
+    return job
+
+
+async def enqueue_exclusive_job(db: AsyncSession, user: User, kind: str, payload: dict) -> IngestJob | None:
+    """Enqueue a job unless another job of `kind` is pending or running; returns None if one is.
+
+    The job is inserted first and then checked for rivals, so two concurrent callers can never
+    both see an empty queue (at worst both back off). It is not claimable until it has won.
+    """
+    job = await enqueue_job(db, user, kind, payload, run_after=datetime.utcnow() + _EXCLUSIVE_HOLD)
+    rival = await db.execute(
+        select(IngestJob.id).where(
+            IngestJob.kind == kind,
+            IngestJob.status.in_([JobStatus.pending, JobStatus.running]),
+            IngestJob.id != job.id,
+        ).limit(1)
+    )
+    if rival.first():
+        await db.execute(delete(IngestJob).where(IngestJob.id == job.id))
+        await db.commit()
+        return None
+    job.run_after = datetime.utcnow()
+    await db.commit()
+    if _worker_pool is not None:
+        _worker_pool.notify()
+    return job
+
+
+def job_to_dict(job: IngestJob) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status.value,
+        "stage": job.stage,
+        "progress": job.progress or {},
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "item_id": job.item_id,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+        "finished_at": job.finished_at,
+    }
+
+
+def _backoff(attempts: int) -> timedelta:
+    return timedelta(seconds=settings.ingest_retry_backoff_seconds * (2 ** max(attempts - 1, 0)))
+
+
+def _is_permanent(exc: Exception) -> bool:
+    # Client errors (duplicate content, unsupported file, ...) will not succeed on retry.
+    return isinstance(exc, HTTPException) and exc.status_code < 500
+
+
+async def _claim_next_job(worker_id: str) -> str | None:
+    async with AsyncSessionLocal() as session:
+        now = datetime.utcnow()
+        candidates = await session.execute(
+            select(IngestJob.id)
+            .where(IngestJob.status == JobStatus.pending, IngestJob.run_after <= now)
+            .order_by(IngestJob.run_after)
+            .limit(5)
+        )
+        for job_id in candidates.scalars().all():
+            # Conditional update acts as an optimistic lock on both SQLite and MySQL.
+            claimed = await session.execute(
+                update(IngestJob)
+                .where(IngestJob.id == job_id, IngestJob.status == JobStatus.pending)
+                .values(
+                    status=JobStatus.running,
+                    locked_by=worker_id,
+                    locked_at=now,
+                    attempts=IngestJob.attempts + 1,
+                    error=None,
+                )
+            )
+            await session.commit()
+            if claimed.rowcount == 1:
+                return job_id
+    return None
+
+
+async def _set_stage(job_id: str, stage: str) -> None:
+    async with AsyncSessionLocal() as session:
+        job = await session.get(IngestJob, job_id)
+        if not job:
+            return
+        progress = dict(job.progress or {})
+        if job.stage and job.stage != stage:
+            progress[job.stage] = "done"
+        progress[stage] = "running"
+        job.stage = stage
+        job.progress = progress
+        job.locked_at = datetime.utcnow()
+        await session.commit()
+
+
+async def run_job(job_id: str, worker_id: str) -> None:
+    """Run a job claimed by `worker_id`; the outcome is dropped if the claim was lost meanwhile."""
+    async with AsyncSessionLocal() as session:
+        job = await session.get(IngestJob, job_id)
+        if not job:
+            return
+        user = await session.get(User, job.owner_id)
+        handler = JOB_HANDLERS.get(job.kind)
+
+        async def on_stage(stage: str) -> None:
+            await _set_stage(job_id, stage)
+
+        try:
+            if not user:
+                raise HTTPException(status_code=404, detail="Job owner not found")
+            if handler is None:
+                raise HTTPException(status_code=400, detail=f"Unknown job kind: {job.kind}")
+            outcome = await handler(session, user, job, on_stage)
+        except Exception as exc:
+            await session.rollback()
+            await _record_failure(job_id, worker_id, exc)
+            return
+        await _record_success(job_id, worker_id, outcome or {})
+
+
+async def _finalize(session: AsyncSession, job_id: str, worker_id: str, **values) -> bool:
+    # Only the worker still holding the claim may finish the job: after a lease expired and the
+    # job was claimed again, the first worker's late outcome must not overwrite the second run.
+    result = await session.execute(
+        update(IngestJob)
+        .where(IngestJob.id == job_id, IngestJob.locked_by == worker_id, IngestJob.status == JobStatus.running)
+        .values(locked_by=None, **values)
+    )
+    await session.commit()
+    if result.rowcount != 1:
+        logger.warning("Job %s is no longer held by %s; dropping its outcome", job_id, worker_id)
+        return False
+    return True
+
+
+async def _record_success(job_id: str, worker_id: str, outcome: dict) -> None:
+    async with AsyncSessionLocal() as session:
+        job = await session.get(IngestJob, job_id)
+        if not job:
+            return
+        progress = dict(job.progress or {})
+        if job.stage:
+            progress[job.stage] = "done"
+        values = {"status": JobStatus.succeeded, "progress": progress, "finished_at": datetime.utcnow()}
+        if "item_id" in outcome:
+            values["item_id"] = outcome["item_id"]
+        if "result" in outcome:
+            values["result"] = outcome["result"]
+        await _finalize(session, job_id, worker_id, **values)
+
+
+async def _record_failure(job_id: str, worker_id: str, exc: Exception) -> None:
+    message = str(exc.detail) if isinstance(exc, HTTPException) else f"{type(exc).__name__}: {exc}"
+    async with AsyncSessionLocal() as session:
+        job = await session.get(IngestJob, job_id)
+        if not job:
+            return
+        if _is_permanent(exc) or job.attempts >= job.max_attempts:
+            if await _finalize(session, job_id, worker_id, status=JobStatus.failed, error=message, finished_at=datetime.utcnow()):
+                logger.warning("Job %s (%s) failed: %s", job.id, job.kind, message)
+        else:
+            run_after = datetime.utcnow() + _backoff(job.attempts)
+            if await _finalize(session, job_id, worker_id, status=JobStatus.pending, error=message, run_after=run_after):
+                logger.info("Job %s (%s) attempt %s failed, retrying: %s", job.id, job.kind, job.attempts, message)
+
+
+async def recover_stale_jobs() -> int:
+    """Requeue jobs whose worker died mid-run (lease expired), or fail them if out of attempts.
+
+    A job that keeps killing its worker (OOM, a crashing parser) would otherwise be retried forever.
+    """
+    now = datetime.utcnow()
+    cutoff = now - timedelta(seconds=settings.ingest_job_lease_seconds)
+    stale = (IngestJob.status == JobStatus.running, IngestJob.locked_at < cutoff)
+    async with AsyncSessionLocal() as session:
+        failed = await session.execute(
+            update(IngestJob)
+            .where(*stale, IngestJob.attempts >= IngestJob.max_attempts)
+            .values(status=JobStatus.failed, locked_by=None, finished_at=now, error="Worker stopped while running the job")
+        )
+        requeued = await session.execute(
+            update(IngestJob).where(*stale).values(status=JobStatus.pending, locked_by=None, run_after=now)
+        )
+        await session.commit()
+    if failed.rowcount:
+        logger.warning("Failed %s ingest jobs whose workers kept dying", failed.rowcount)
+    return (failed.rowcount or 0) + (requeued.rowcount or 0)
+
+
+async def renew_leases(worker_prefix: str) -> None:
+    """Keep the claims of a live pool's running jobs from expiring while they run."""
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            update(IngestJob)
+            .where(IngestJob.status == JobStatus.running, IngestJob.locked_by.startswith(f"{worker_prefix}/"))
+            .values(locked_at=datetime.utcnow())
+        )
+        await session.commit()
+
+
+class JobWorkerPool:
+    """A fixed number of asyncio workers pulling jobs from the `ingest_jobs` table."""
+
+    def __init__(self, concurrency: int | None = None, poll_interval: float | None = None) -> None:
+        self.concurrency = settings.ingest_workers if concurrency is None else concurrency
+        self.poll_interval = poll_interval or settings.ingest_poll_interval_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        # Heartbeat and stale-lease sweep period: well inside one lease.
+        self.maintenance_interval = settings.ingest_job_lease_seconds / 3
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def start(self) -> None:
+        if self.concurrency <= 0 or self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        await self._sweep()
+        self._tasks = [asyncio.create_task(self._work(n)) for n in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+        logger.info("Started %s ingest workers (%s)", self.concurrency, self.worker_id)
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _work(self, n: int) -> None:
+        worker_id = f"{self.worker_id}/{n}"
+        while True:
+            try:
+                job_id = await _claim_next_job(worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Failed to claim ingest job")
+                job_id = None
+            if job_id is None:
+                await self._idle()
+                continue
+            await run_job(job_id, worker_id)
+
+    async def _sweep(self) -> None:
+        recovered = await recover_stale_jobs()
+        if recovered:
+            logger.info("Recovered %s stale ingest jobs", recovered)
+            self.notify()
+
+    async def _maintain(self) -> None:
+        # The sweep has to repeat: a worker restarted right after a crash finds the dead
+        # worker's lease still valid, and nothing else would ever release that job.
+        while True:
+            await asyncio.sleep(self.maintenance_interval)
+            try:
+                await renew_leases(self.worker_id)
+                await self._sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Ingest job maintenance failed")
+
+    async def _idle(self) -> None:
+        assert self._wakeup is not None
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+
+async def start_worker_pool(concurrency: int | None = None) -> JobWorkerPool:
+    global _worker_pool
+    pool = JobWorkerPool(concurrency=concurrency)
+    await pool.start()
+    _worker_pool = pool
+    return pool
+
+
+async def stop_worker_pool() -> None:
+    global _worker_pool
+    if _worker_pool is not None:
+        await _worker_pool.stop()
+        _worker_pool = None
@@ -0,0 +1,97 @@
+import re
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.fulltext import FTS_TABLE, segment_cjk
+from app.db.models import KnowledgeItem
+
+_WORD_RE = re.compile(r"\w+")
+
+# bm25 column weights: item_id (unindexed), title, summary, content.
+_SQLITE_SEARCH = text(f"""
+    SELECT ki.id, ki.title, ki.summary, -bm25({FTS_TABLE}, 0.0, 10.0, 4.0, 1.0) AS score
+    FROM {FTS_TABLE} JOIN knowledge_items ki ON ki.id = {FTS_TABLE}.item_id
+    WHERE {FTS_TABLE} MATCH :match AND ki.is_deleted = 0
+    ORDER BY score DESC
+    LIMIT :limit OFFSET :offset
+""")
+
+_MYSQL_SEARCH = text("""
+    SELECT id, title, summary, MATCH (title, summary, content_text) AGAINST (:q IN NATURAL LANGUAGE MODE) AS score
+    FROM knowledge_items
+    WHERE is_deleted = 0 AND MATCH (title, summary, content_text) AGAINST (:q IN NATURAL LANGUAGE MODE)
+    ORDER BY score DESC
+    LIMIT :limit OFFSET :offset
+""")
+
+
+def query_terms(q: str) -> list[str]:
+    """Words of the query, with CJK runs split into the same bigrams the index holds."""
+    return _WORD_RE.findall(segment_cjk(q).lower())
+
+
+def build_fts5_query(q: str) -> str | None:
+    terms = query_terms(q)
+    if not terms:
+        return None
+    # Quote every term so FTS5 operators in user input are taken literally; a lone CJK
+    # character can only match as the start of an indexed bigram.
+    return " ".join(f'"{t}"*' if len(t) == 1 and not t.isascii() else f'"{t}"' for t in terms)
+
+
+def make_snippet(content: str | None, q: str, width: int | None = None) -> str:
+    """A window of `content` around the first occurrence of the query (or its longest term)."""
+    if not content:
+        return ""
+    width = width or settings.search_snippet_chars
+    lowered = content.lower()
+    candidates = sorted({q.strip().lower(), *q.lower().split(), *query_terms(q)}, key=len, reverse=True)
+    pos = next((p for p in (lowered.find(c) for c in candidates if c) if p >= 0), 0)
+    start = max(0, pos - width // 3)
+    end = min(len(content), start + width)
+    snippet = " ".join(content[start:end].split())
+    return ("…" if start > 0 else "") + snippet + ("…" if end < len(content) else "")
+
+
+async def _ilike_search(db: AsyncSession, q: str, limit: int, offset: int) -> list[dict]:
+    # Dialects without a full-text index keep the old substring scan, now paginated.
+    pattern = f"%{q}%"
+    stmt = (
+        select(KnowledgeItem.id, KnowledgeItem.title, KnowledgeItem.summary)
+        .where(
+            KnowledgeItem.is_deleted == False,
+            KnowledgeItem.title.ilike(pattern) | KnowledgeItem.summary.ilike(pattern) | KnowledgeItem.content_text.ilike(pattern),
+        )
+        .order_by(KnowledgeItem.created_at.desc(), KnowledgeItem.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return [{**row, "score": None} for row in (await db.execute(stmt)).mappings().all()]
+
+
+async def search_fulltext(db: AsyncSession, q: str, limit: int, offset: int = 0) -> tuple[list[dict], int | None]:
+    """Ranked matches for `q` with snippets; returns the page and the next offset (None at the end)."""
+    dialect = db.bind.dialect.name
+    if dialect == "sqlite":
+        match = build_fts5_query(q)
+        if not match:
+            return [], None
+        result = await db.execute(_SQLITE_SEARCH, {"match": match, "limit": limit + 1, "offset": offset})
+        rows = [dict(row) for row in result.mappings().all()]
+    elif dialect == "mysql":
+        result = await db.execute(_MYSQL_SEARCH, {"q": q, "limit": limit + 1, "offset": offset})
+        rows = [dict(row) for row in result.mappings().all()]
+    else:
+        rows = await _ilike_search(db, q, limit + 1, offset)
+    next_offset = offset + limit if len(rows) > limit else None
+    rows = rows[:limit]
+    if rows:
+        # Content is only read for the rows on this page, to cut the snippets.
+        contents = dict((await db.execute(
+            select(KnowledgeItem.id, KnowledgeItem.content_text).where(KnowledgeItem.id.in_([r["id"] for r in rows]))
+        )).all())
+        for row in rows:
+            row["snippet"] = make_snippet(contents.get(row["id"]) or row["summary"], q)
+    return rows, next_offset
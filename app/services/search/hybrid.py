@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Awaitable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.session import get_session
+from app.services.items.listing import hydrate_items
+from app.services.indexing.store import get_store
+from app.services.search.fulltext import search_fulltext
+
+logger = logging.getLogger(__name__)
+
+
+async def _lexical_leg(q: str, limit: int) -> list[dict]:
+    # Own session: the legs run concurrently and an AsyncSession is not shareable.
+    async with get_session() as db:
+        rows, _ = await search_fulltext(db, q, limit)
+    return [{"id": r["id"], "score": r["score"], "snippet": r["snippet"]} for r in rows]
+
+
+async def _semantic_leg(q: str, limit: int) -> list[dict]:
+    hits = await get_store().search(q, top_k=limit)
+    return [
+        {"id": h["id"], "score": h["score"], "snippet": h["passages"][0]["text"] if h["passages"] else None}
+        for h in hits
+    ]
+
+
+async def _with_budget(name: str, leg: Awaitable[list[dict]], timeout_ms: float, degraded: list[str]) -> list[dict]:
+    try:
+        return await asyncio.wait_for(leg, timeout=timeout_ms / 1000)
+    except asyncio.TimeoutError:
+        logger.warning("Hybrid search %s leg exceeded %.0f ms, serving without it", name, timeout_ms)
+    except Exception:
+        logger.warning("Hybrid search %s leg failed, serving without it", name, exc_info=True)
+    degraded.append(name)
+    return []
+
+
+def fuse(legs: dict[str, list[dict]], mode: str | None = None, rrf_k: int | None = None, weights: dict[str, float] | None = None) -> list[dict]:
+    """Merge ranked legs into one list; each entry keeps its per-leg score and rank.
+
+    `rrf` sums weight / (k + rank) over the legs; `weighted` min-max normalizes each
+    leg's scores to [0, 1] and sums them by weight.
+    """
+    mode = mode or settings.hybrid_fusion
+    rrf_k = rrf_k or settings.hybrid_rrf_k
+    weights = weights or {"lexical": 1 - settings.hybrid_semantic_weight, "semantic": settings.hybrid_semantic_weight}
+    fused: dict[str, dict] = {}
+    for name, hits in legs.items():
+        weight = weights.get(name, 1.0)
+        scores = [h["score"] or 0.0 for h in hits]
+        low, high = (min(scores), max(scores)) if scores else (0.0, 0.0)
+        for rank, hit in enumerate(hits, start=1):
+            entry = fused.setdefault(hit["id"], {"id": hit["id"], "score": 0.0, "sources": {}, "snippet": None})
+            entry["sources"][name] = {"score": hit["score"], "rank": rank}
+            entry["snippet"] = entry["snippet"] or hit.get("snippet")
+            if mode == "weighted":
+                norm = ((hit["score"] or 0.0) - low) / (high - low) if high > low else 1.0
+                entry["score"] += weight * norm
+            else:
+                entry["score"] += weight / (rrf_k + rank)
+    return sorted(fused.values(), key=lambda e: e["score"], reverse=True)
+
+
+async def hybrid_search(db: AsyncSession, q: str, top_k: int = 10, mode: str | None = None) -> dict:
+    candidates = top_k * max(settings.hybrid_candidate_factor, 1)
+    degraded: list[str] = []
+    lexical, semantic = await asyncio.gather(
+        _with_budget("lexical", _lexical_leg(q, candidates), settings.hybrid_lexical_timeout_ms, degraded),
+        _with_budget("semantic", _semantic_leg(q, candidates), settings.hybrid_semantic_timeout_ms, degraded),
+    )
+    fused = fuse({"lexical": lexical, "semantic": semantic}, mode)
+
+    # Hydrate in one query; ids that are gone or soft-deleted drop out here.
+    rows = await hydrate_items(db, [entry["id"] for entry in fused])
+    items = []
+    for entry in fused:
+        row = rows.get(entry["id"])
+        if row is None:
+            continue
+        items.append({**row, **entry})
+        if len(items) == top_k:
+            break
+    return {"items": items, "fusion": mode or settings.hybrid_fusion, "degraded": degraded}
@@ -0,0 +1,18 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.indexing.qdrant_store import build_search_filter
+from app.services.indexing.store import get_store
+from app.services.items.listing import hydrate_items
+
+
+async def semantic_search(
+    db: AsyncSession, q: str, top_k: int = 10, hnsw_ef: int | None = None, exact: bool | None = None, **filters
+) -> list[dict]:
+    """Vector search with `build_search_filter` conditions applied inside Qdrant, hydrated from the DB."""
+    hits = await get_store().search(q, top_k=top_k, query_filter=build_search_filter(**filters), hnsw_ef=hnsw_ef, exact=exact)
+    rows = await hydrate_items(db, [hit["id"] for hit in hits])
+    return [
+        {**rows[hit["id"]], "score": hit["score"], "passages": hit["passages"]}
+        for hit in hits
+        if hit["id"] in rows
+    ]
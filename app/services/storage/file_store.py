@@ -1,6 +1,11 @@
+import asyncio
+import mimetypes
+import os
+import tempfile
 from pathlib import Path
-from typing import Dict
-from fastapi import UploadFile
+from typing import BinaryIO, Dict
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
 import hashlib
 
 from app.core.config import settings
@@ -9,11 +14,133 @@ from app.core.config import settings
 Path(settings.upload_dir).mkdir(parents=True, exist_ok=True)
 
 
-def save_upload(file: UploadFile) -> Dict[str, str]:
-    target = Path(settings.upload_dir) / file.filename
-    with open(target, 'wb') as f:
-        f.write(file.file.read())
-    return {"path": str(target), "filename": file.filename, "mime": file.content_type or "application/octet-stream"}
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Room for the multipart boundaries, part headers and the other form fields of an upload.
+FORM_OVERHEAD_BYTES = 1024 * 1024
+
+
+class UploadLimitMiddleware:
+    """Reject request bodies larger than `MAX_UPLOAD_BYTES` before they are parsed.
+
+    Starlette spools a multipart upload to a temporary file while parsing the form, before the
+    route runs, so the check in `save_upload` alone would not bound memory or disk. Bodies with a
+    larger Content-Length are refused up front; chunked bodies are counted as they arrive.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        limit = settings.max_upload_bytes + FORM_OVERHEAD_BYTES
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            await JSONResponse(status_code=413, content={"detail": "File too large"})(scope, receive, send)
+            return
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Surfaces through the form parser as the route's response.
+                    raise HTTPException(status_code=413, detail="File too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def content_path(digest: str, suffix: str = "") -> Path:
+    """Sharded content-addressed location: <upload_dir>/ab/cd/<sha256><suffix>."""
+    return Path(settings.upload_dir) / digest[:2] / digest[2:4] / f"{digest}{suffix}"
+
+
+def _open_temp(suffix: str) -> tuple[int, str]:
+    tmp_dir = Path(settings.upload_dir) / "tmp"
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    return tempfile.mkstemp(dir=tmp_dir, suffix=suffix)
+
+
+def _commit_temp(tmp_name: str, sha256: str, suffix: str) -> Path:
+    target = content_path(sha256, suffix)
+    if target.exists():
+        os.unlink(tmp_name)
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_name, target)
+    return target
+
+
+def _discard_temp(tmp_name: str) -> None:
+    if os.path.exists(tmp_name):
+        os.unlink(tmp_name)
+
+
+async def save_upload(file: UploadFile) -> Dict[str, str]:
+    """Stream an upload to disk in chunks, hashing as it goes; identical files are stored once.
+
+    Raises 413 if the file is larger than `MAX_UPLOAD_BYTES`. By the time a route runs, Starlette
+    has already spooled the upload, so this only guards what is stored; `UploadLimitMiddleware`
+    bounds the request body itself.
+    """
+    filename = file.filename or "upload"
+    # Extractors dispatch on the extension, so it is kept on the stored file.
+    suffix = Path(filename).suffix.lower()
+    fd, tmp_name = _open_temp(suffix)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.max_upload_bytes:
+                    raise HTTPException(status_code=413, detail="File too large")
+                digest.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+        sha256 = digest.hexdigest()
+        target = _commit_temp(tmp_name, sha256, suffix)
+    except BaseException:
+        _discard_temp(tmp_name)
+        raise
+    return {
+        "path": str(target),
+        "filename": filename,
+        "mime": file.content_type or "application/octet-stream",
+        "sha256": sha256,
+        "size": size,
+    }
+
+
+def save_file(src: BinaryIO, filename: str, mime: str | None = None) -> Dict[str, str]:
+    """Blocking counterpart of `save_upload` for local files and archive members."""
+    suffix = Path(filename).suffix.lower()
+    fd, tmp_name = _open_temp(suffix)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := src.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.max_upload_bytes:
+                    raise HTTPException(status_code=413, detail="File too large")
+                digest.update(chunk)
+                out.write(chunk)
+        sha256 = digest.hexdigest()
+        target = _commit_temp(tmp_name, sha256, suffix)
+    except BaseException:
+        _discard_temp(tmp_name)
+        raise
+    return {
+        "path": str(target),
+        "filename": filename,
+        "mime": mime or mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        "sha256": sha256,
+        "size": size,
+    }
 
 
 def save_html(content: str) -> Dict[str, str]:
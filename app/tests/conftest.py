@@ -0,0 +1,21 @@
+import asyncio
+import os
+import tempfile
+
+# Point the app at throwaway storage before any app module reads settings.
+_tmp = tempfile.mkdtemp(prefix="kb-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_tmp}/test.db")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_tmp, "uploads"))
+os.environ.setdefault("QDRANT_URL", ":memory:")
+
+from app.db.models import Base  # noqa: E402
+from app.db.session import engine  # noqa: E402
+
+
+async def _create_schema() -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+
+asyncio.run(_create_schema())
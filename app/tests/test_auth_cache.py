@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+from sqlalchemy import event
+
+from app.core import auth_cache, security
+from app.core.security import aget_password_hash, averify_password, create_access_token
+from app.db.models import User
+from app.db.session import engine, get_session
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_runs_off_the_event_loop(monkeypatch):
+    threads = []
+    verify = security.verify_password
+
+    def recording_verify(plain, hashed):
+        threads.append(threading.current_thread().name)
+        return verify(plain, hashed)
+
+    monkeypatch.setattr(security, "verify_password", recording_verify)
+    hashed = await aget_password_hash("s3cret")
+    assert await averify_password("s3cret", hashed)
+    assert not await averify_password("wrong", hashed)
+    assert threads and all(name.startswith("password-hash") for name in threads)
+
+
+@pytest.mark.asyncio
+async def test_principal_cache_skips_the_query_and_is_invalidated_on_password_change():
+    auth_cache.clear()
+    async with get_session() as db:
+        user = User(username="cached", password_hash="old")
+        db.add(user)
+        await db.commit()
+    token = create_access_token({"sub": str(user.id)})
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        async with get_session() as db:
+            assert auth_cache.decode_token(token)["sub"] == str(user.id)
+            assert (await auth_cache.load_user(db, user.id)).username == "cached"
+        queries = len(statements)
+        async with get_session() as db:
+            cached = await auth_cache.load_user(db, user.id)
+            assert cached.username == "cached" and cached in db
+        assert len(statements) == queries
+
+        async with get_session() as db:
+            cached = await auth_cache.load_user(db, user.id)
+            cached.password_hash = "new"
+            await db.commit()
+        assert auth_cache._principals.get(user.id) is None
+        assert auth_cache._tokens.get(token) is None
+        async with get_session() as db:
+            assert (await auth_cache.load_user(db, user.id)).password_hash == "new"
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
@@ -20,9 +20,14 @@ async def test_ingest_text():
         await client.post("/api/v1/auth/register", params={"username": "u2", "password": "p2"})
         token_resp = await client.post("/api/v1/auth/login", data={"username": "u2", "password": "p2"})
         token = token_resp.json()["data"]["access_token"]
-        resp = await client.post("/api/v1/items/text", data={"title": "hello", "content_text": "world"}, headers={"Authorization": f"Bearer {token}"})
-        assert resp.status_code == 200
+        headers = {"Authorization": f"Bearer {token}"}
+        resp = await client.post("/api/v1/items/text", data={"title": "hello", "content_text": "world"}, headers=headers)
+        assert resp.status_code == 202
         assert resp.json()["success"]
+        job_id = resp.json()["data"]["job_id"]
+        resp = await client.get(f"/api/v1/jobs/{job_id}", headers=headers)
+        assert resp.status_code == 200
+        assert resp.json()["data"]["kind"] == "text"
 
 
 @pytest.mark.asyncio
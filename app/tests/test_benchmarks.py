@@ -0,0 +1,26 @@
+import re
+
+from benchmarks.compare import compare
+from benchmarks.corpus import Corpus
+
+
+def test_corpus_is_deterministic_and_mixes_scripts():
+    docs = list(Corpus(50, seed=3).documents())
+    assert docs == list(Corpus(50, seed=3).documents())
+    assert len({doc["content_text"] for doc in docs}) == 50
+    text = "".join(doc["content_text"] for doc in docs)
+    assert re.search(r"[一-鿿]{4}", text) and re.search(r"[A-Za-z]{4}", text)
+    assert len(Corpus(50, seed=3).queries(20)) == 20
+
+
+def test_compare_flags_regressions_by_metric_direction():
+    baseline = {"results": {"search_text": {"p95_ms": 10.0, "throughput_rps": 100.0, "errors": 0}, "peak_rss_mb": 200.0, "ingest": {"failed": 10, "requests": 50}}}
+    current = {"results": {"search_text": {"p95_ms": 13.0, "throughput_rps": 150.0, "errors": 5}, "peak_rss_mb": 210.0, "ingest": {"failed": 11, "requests": 80}}}
+    rows = {row["metric"]: row["regression"] for row in compare(baseline, current, tolerance=0.2)}
+    # Errors and failures have no tolerance: 0 -> 5 and even 10 -> 11 are regressions.
+    assert rows == {
+        "search_text.p95_ms": True, "search_text.throughput_rps": False, "search_text.errors": True,
+        "peak_rss_mb": False, "ingest.failed": True,
+    }
+    unchanged = {row["metric"]: row["regression"] for row in compare(baseline, baseline)}
+    assert not any(unchanged.values())
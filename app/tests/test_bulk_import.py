@@ -0,0 +1,67 @@
+import asyncio
+import json
+import zipfile
+
+import pytest
+from sqlalchemy import select
+
+from app.db.models import KnowledgeItem, User
+from app.db.session import get_session
+from app.services.ingest import bulk
+from app.services.ingest.bulk import iter_records, run_bulk_import
+
+
+@pytest.mark.asyncio
+async def test_bulk_import_reports_per_item_errors_and_continues(tmp_path, monkeypatch):
+    # Small batches and queues so several batches flow through every stage.
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "bulk_batch_size", 3)
+    monkeypatch.setattr(settings, "bulk_queue_size", 2)
+
+    lines = [json.dumps({"title": f"批量 {i}", "content_text": f"批量导入的第 {i} 条内容。", "tags": "bulk"}) for i in range(7)]
+    lines.insert(3, "{not json")
+    lines.append(json.dumps({"title": "重复", "content_text": "批量导入的第 0 条内容。"}))
+    lines.append(json.dumps({"title": "空"}))
+    archive = tmp_path / "import.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("docs/records.ndjson", "\n".join(lines))
+        zf.writestr("docs/notes.txt", "压缩包里的纯文本文件。")
+        zf.writestr("docs/ignored.bin", b"\x00\x01")
+
+    async with get_session() as db:
+        user = User(username="bulk", password_hash="x")
+        db.add(user)
+        await db.commit()
+
+    extract = bulk._extract
+
+    async def slow_first_copy(record):
+        # Let the repeated record finish extracting before the original.
+        if record.ref == "docs/records.ndjson:1":
+            await asyncio.sleep(0.2)
+        return await extract(record)
+
+    monkeypatch.setattr(bulk, "_extract", slow_first_copy)
+    snapshots = []
+
+    async def on_progress(progress):
+        snapshots.append(progress)
+
+    summary = await run_bulk_import(user, iter_records(str(archive)), ["import"], on_progress=on_progress)
+    assert summary["read"] == 11
+    assert summary["succeeded"] == 8
+    assert summary["failed"] == 3 and summary["pending"] == 0
+    errors = {e["ref"]: e["error"] for e in summary["errors"]}
+    assert errors["docs/records.ndjson:4"].startswith("ValueError: Invalid JSON")
+    # The first copy in input order wins even though it was extracted last.
+    assert "docs/records.ndjson:1" not in errors
+    assert errors["docs/records.ndjson:9"] == "Duplicate content"
+    assert "content_text or url" in errors["docs/records.ndjson:10"]
+    assert len(snapshots) > 2
+
+    async with get_session() as db:
+        items = (await db.execute(select(KnowledgeItem).where(KnowledgeItem.owner_id == user.id))).scalars().all()
+    assert len(items) == 8
+    note = next(item for item in items if item.title == "notes.txt")
+    assert note.source_type.value == "file" and note.file_hash
+    assert all({"import"} <= set(item.tags) for item in items)
@@ -0,0 +1,13 @@
+from app.services.ingest.chunking import chunk_text, count_tokens
+
+
+def test_chunks_follow_cjk_sentences_with_overlap():
+    text = "第一句话。第二句话！第三句话？第四句话。"
+    chunks = chunk_text(text, size=10, overlap=5, mode="char")
+    assert [c.text for c in chunks] == ["第一句话。第二句话！", "第二句话！第三句话？", "第三句话？第四句话。"]
+
+
+def test_token_mode_hard_splits_long_runs():
+    chunks = chunk_text("word " * 50, size=20, overlap=0, mode="token")
+    assert [count_tokens(c.text) for c in chunks] == [20, 20, 10]
+    assert chunk_text("3.14 is pi", size=50)[0].text == "3.14 is pi"
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+from app.llm.coalescer import EmbeddingCoalescer
+from app.llm.providers.mock import MockProvider
+
+
+class CountingProvider(MockProvider):
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def embed_batch(self, texts):
+        self.batches.append(list(texts))
+        return super().embed_batch(texts)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_embeds_share_one_batch():
+    provider = CountingProvider()
+    coalescer = EmbeddingCoalescer(provider, max_batch_size=32, max_wait_ms=20)
+    texts = [f"doc {i}" for i in range(10)] + ["doc 0"]
+    vectors = await asyncio.gather(*(coalescer.embed(t) for t in texts))
+    assert vectors[0] == vectors[-1] == provider.embed("doc 0")
+    assert provider.batches == [[f"doc {i}" for i in range(10)]]
+
+
+@pytest.mark.asyncio
+async def test_batches_respect_max_size():
+    provider = CountingProvider()
+    coalescer = EmbeddingCoalescer(provider, max_batch_size=4, max_wait_ms=20)
+    await coalescer.embed_many([f"doc {i}" for i in range(10)])
+    assert [len(b) for b in provider.batches] == [4, 4, 2]
@@ -0,0 +1,165 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+
+from app.db.models import KnowledgeItem, User
+from app.db.session import get_session
+from app.services.extractors.fetcher import UrlFetcher
+from app.services.ingest import crawler
+from app.services.ingest.crawler import SiteCrawler, normalize_url
+
+
+def _page(title: str, body: str, links: list[str] = ()) -> bytes:
+    anchors = "".join(f'<a href="{href}">{href}</a> ' for href in links)
+    paragraphs = "".join(f"<p>{body} 第 {i} 段说明文字，用于站点抓取测试。</p>" for i in range(4))
+    return f"<html><head><title>{title}</title></head><body><article><h1>{title}</h1>{paragraphs}</article><nav>{anchors}</nav></body></html>".encode("utf-8")
+
+
+SITE = {
+    "/robots.txt": b"User-agent: *\nDisallow: /private/\n",
+    "/": _page("首页", "文档站点首页", ["/guide?utm_source=nav", "/faq#top", "/private/secret", "https://example.invalid/x"]),
+    "/guide": _page("指南", "安装与配置指南", ["/guide/advanced", "/"]),
+    "/faq": _page("指南", "安装与配置指南", ["/"]),  # same text as /guide
+    "/guide/advanced": _page("进阶", "进阶用法", []),
+    "/private/secret": _page("私密", "不应被抓取", []),
+    "/sitemap.xml": (
+        b'<?xml version="1.0" encoding="UTF-8"?>'
+        b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+        b"<url><loc>{base}/guide/advanced</loc></url><url><loc>{base}/faq</loc></url></urlset>"
+    ),
+}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits: list[str] = []
+    times: list[float] = []
+    robots_status = 200
+
+    def do_GET(self):
+        _Handler.hits.append(self.path)
+        _Handler.times.append(time.monotonic())
+        body = SITE.get(self.path.split("?")[0])
+        if self.path == "/robots.txt" and _Handler.robots_status != 200:
+            self.send_response(_Handler.robots_status)
+            self.end_headers()
+            return
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.end_headers()
+        self.wfile.write(body.replace(b"{base}", f"http://{self.headers['Host']}".encode()))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest_asyncio.fixture()
+async def site(tmp_path, monkeypatch):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    _Handler.hits = []
+    _Handler.times = []
+    monkeypatch.setattr(_Handler, "robots_status", 200)
+    fetcher = UrlFetcher(cache_dir=str(tmp_path))
+    monkeypatch.setattr(crawler, "get_fetcher", lambda: fetcher)
+    monkeypatch.setattr(crawler.settings, "crawl_per_host_rps", 0)
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    await fetcher.close()
+    httpd.shutdown()
+
+
+async def _user(name: str) -> User:
+    async with get_session() as db:
+        user = User(username=name, password_hash="x")
+        db.add(user)
+        await db.commit()
+    return user
+
+
+def test_normalize_url():
+    assert normalize_url("HTTP://Example.com:80/a?b=2&a=1&utm_source=x#frag") == "http://example.com/a?a=1&b=2"
+    assert normalize_url("https://example.com") == "https://example.com/"
+
+
+@pytest.mark.asyncio
+async def test_seed_crawl_respects_depth_robots_and_dedupes(site):
+    user = await _user("crawler")
+    summary = await SiteCrawler(user, seed_url=f"{site}/", max_depth=1, tags=["docs"]).run()
+
+    assert summary["ingested"] == 2  # /faq has the same text as /guide, only one of them is kept
+    assert summary["fetched"] == 3 and summary["skipped"] == 2 and summary["failed"] == 0
+    assert "/private/secret" not in _Handler.hits
+    assert "/guide/advanced" not in _Handler.hits  # beyond max_depth
+    async with get_session() as db:
+        items = (await db.execute(select(KnowledgeItem).where(KnowledgeItem.owner_id == user.id))).scalars().all()
+    urls = {item.source_url for item in items}
+    assert f"{site}/" in urls and len(urls & {f"{site}/guide", f"{site}/faq"}) == 1
+    assert all("docs" in item.tags and item.file_path for item in items)
+
+
+@pytest.mark.asyncio
+async def test_sitemap_crawl_with_exclude_pattern(site):
+    user = await _user("sitemap")
+    summary = await SiteCrawler(user, sitemap_url=f"{site}/sitemap.xml", exclude=[r"/faq$"]).run()
+
+    assert summary["discovered"] == 1 and summary["ingested"] == 1
+    assert "/faq" not in _Handler.hits
+
+
+def _gaps(times: list[float]) -> list[float]:
+    return [later - earlier for earlier, later in zip(times, times[1:])]
+
+
+@pytest.mark.asyncio
+async def test_requests_to_one_host_are_spaced_by_the_rate_limit(site, monkeypatch):
+    monkeypatch.setattr(crawler.settings, "crawl_per_host_rps", 5)
+    monkeypatch.setattr(crawler.settings, "crawl_concurrency", 4)
+    user = await _user("polite")
+    summary = await SiteCrawler(user, sitemap_url=f"{site}/sitemap.xml").run()
+
+    assert summary["fetched"] == 2
+    assert _Handler.hits.count("/robots.txt") == 1  # fetched once even with several workers
+    assert len(_Handler.times) == 4  # sitemap, robots.txt and both pages
+    assert min(_gaps(_Handler.times)) >= 0.15
+
+
+@pytest.mark.asyncio
+async def test_crawl_delay_from_robots_is_honoured(site, monkeypatch):
+    monkeypatch.setitem(SITE, "/robots.txt", b"User-agent: *\nCrawl-delay: 1\n")
+    monkeypatch.setattr(crawler.settings, "crawl_concurrency", 4)
+    user = await _user("delayed")
+    summary = await SiteCrawler(user, sitemap_url=f"{site}/sitemap.xml").run()
+
+    assert summary["fetched"] == 2
+    pages = [t for path, t in zip(_Handler.hits, _Handler.times) if path in ("/faq", "/guide/advanced")]
+    assert _gaps(pages)[0] >= 0.9
+
+
+@pytest.mark.asyncio
+async def test_unreachable_robots_skips_the_host(site, monkeypatch):
+    monkeypatch.setattr(_Handler, "robots_status", 503)
+    monkeypatch.setattr(crawler.settings, "crawl_concurrency", 4)
+    user = await _user("unreachable")
+    summary = await SiteCrawler(user, sitemap_url=f"{site}/sitemap.xml").run()
+
+    assert summary["fetched"] == 0 and summary["skipped"] == 2 and summary["failed"] == 1
+    assert summary["errors"][0]["ref"] == f"{site}/robots.txt"
+    assert _Handler.hits == ["/sitemap.xml", "/robots.txt"]
+
+
+@pytest.mark.asyncio
+async def test_missing_robots_places_no_restrictions(site, monkeypatch):
+    monkeypatch.setattr(_Handler, "robots_status", 404)
+    user = await _user("unrestricted")
+    summary = await SiteCrawler(user, seed_url=f"{site}/", max_depth=1).run()
+
+    assert summary["failed"] == 0
+    assert "/private/secret" in _Handler.hits
@@ -0,0 +1,28 @@
+import pytest
+
+from app.llm.embedding_cache import QueryEmbeddingCache, cache_key
+
+
+def test_key_normalizes_query_text():
+    assert cache_key("mock", "m", "  Hello   World ") == cache_key("mock", "m", "hello world")
+    assert cache_key("mock", "m", "hello") != cache_key("openai", "m", "hello")
+
+
+def test_lru_evicts_oldest_entry():
+    cache = QueryEmbeddingCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.get("a")
+    cache.put("c", [3.0])
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+
+
+@pytest.mark.asyncio
+async def test_disk_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "q.sqlite")
+    first = QueryEmbeddingCache(max_entries=8, ttl_seconds=60, disk_path=path)
+    vector = await first.get_or_embed("k", "hello")
+    second = QueryEmbeddingCache(max_entries=8, ttl_seconds=60, disk_path=path)
+    assert await second.get_or_embed("k", "hello") == pytest.approx(vector, rel=1e-6)
+    assert second.stats()["disk_hits"] == 1 and second.stats()["misses"] == 0
@@ -0,0 +1,119 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.models import EnrichmentCache, SourceType, User
+from app.db.session import get_session
+from app.llm.providers.base import get_provider
+from app.main import app
+from app.services.ingest.enrichment_cache import cached_embeddings, chunking_signature, pack_embeddings
+from app.services.ingest.pipeline import compute_hash, enrich_and_save
+
+
+async def _user(username: str) -> User:
+    async with get_session() as db:
+        user = User(username=username, password_hash="x")
+        db.add(user)
+        await db.commit()
+    return user
+
+
+@pytest.fixture()
+def llm_calls(monkeypatch):
+    provider = get_provider()
+    calls = {"enrich": 0, "embed": 0}
+    aenrich, aembed_batch = provider.aenrich, provider.aembed_batch
+
+    async def counting_enrich(text):
+        calls["enrich"] += 1
+        return await aenrich(text)
+
+    async def counting_embed(texts):
+        calls["embed"] += 1
+        return await aembed_batch(texts)
+
+    monkeypatch.setattr(provider, "aenrich", counting_enrich)
+    monkeypatch.setattr(provider, "aembed_batch", counting_embed)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_repeated_content_reuses_enrichment_and_embeddings(llm_calls):
+    content = "缓存命中时不会再调用模型。The enrichment cache is keyed by content hash."
+    first, second = await _user("cache-a"), await _user("cache-b")
+    async with get_session() as db:
+        original = await enrich_and_save(db, first, "a", content, SourceType.text)
+    assert llm_calls == {"enrich": 1, "embed": 1}
+
+    async with get_session() as db:
+        copy = await enrich_and_save(db, second, "b", content, SourceType.text)
+    assert llm_calls == {"enrich": 1, "embed": 1}
+    assert (copy.summary, copy.keywords, copy.tags) == (original.summary, original.keywords, original.tags)
+
+
+@pytest.mark.asyncio
+async def test_embedding_signature_mismatch_re_embeds(llm_calls, monkeypatch):
+    content = "换了向量模型之后，摘要仍可复用，但向量需要重新计算。"
+    first, second = await _user("cache-c"), await _user("cache-d")
+    async with get_session() as db:
+        await enrich_and_save(db, first, "c", content, SourceType.text)
+    monkeypatch.setattr(get_provider(), "embedding_model", "another-embedding-model")
+    async with get_session() as db:
+        await enrich_and_save(db, second, "d", content, SourceType.text)
+    # The summary came from the cache; the vectors did not.
+    assert llm_calls == {"enrich": 1, "embed": 2}
+    async with get_session() as db:
+        entry = (await db.execute(select(EnrichmentCache).where(EnrichmentCache.content_hash == compute_hash(content)))).scalars().one()
+    assert entry.embedding_model == "another-embedding-model"
+
+
+def test_cached_embeddings_check_the_whole_signature(monkeypatch):
+    provider = get_provider()
+    vectors = [[0.5] * settings.embedding_dim, [0.25] * settings.embedding_dim]
+    entry = EnrichmentCache(
+        embedding_model=provider.embedding_model, embedding_dim=settings.embedding_dim,
+        chunking=chunking_signature(), embeddings=pack_embeddings(vectors),
+    )
+    assert cached_embeddings(entry, provider, 2) == vectors
+    assert cached_embeddings(entry, provider, 3) is None
+    monkeypatch.setattr(settings, "chunk_size", settings.chunk_size + 1)
+    assert cached_embeddings(entry, provider, 2) is None
+    monkeypatch.undo()
+    monkeypatch.setattr(settings, "embedding_dim", settings.embedding_dim * 2)
+    assert cached_embeddings(entry, provider, 2) is None
+
+
+@pytest.mark.asyncio
+async def test_admin_invalidation_filters_by_provider_and_model(monkeypatch):
+    monkeypatch.setattr(settings, "admin_username", "cache-admin")
+    admin, user = await _user("cache-admin"), await _user("cache-user")
+    async with get_session() as db:
+        for provider, model in (("p1", "m1"), ("p1", "m2"), ("p2", "m1")):
+            db.add(EnrichmentCache(content_hash=f"h-{provider}-{model}", provider=provider, model=model))
+        await db.commit()
+
+    async def remaining() -> set[tuple[str, str]]:
+        async with get_session() as db:
+            rows = await db.execute(select(EnrichmentCache.provider, EnrichmentCache.model).where(EnrichmentCache.provider.in_(["p1", "p2"])))
+            return set(rows.all())
+
+    def auth(who: User) -> dict:
+        return {"Authorization": f"Bearer {create_access_token({'sub': str(who.id)})}"}
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.delete("/api/v1/admin/enrichment-cache", params={"provider": "p1"}, headers=auth(user))).status_code == 403
+        assert len(await remaining()) == 3
+
+        response = await client.delete("/api/v1/admin/enrichment-cache", params={"provider": "p1", "model": "m2"}, headers=auth(admin))
+        assert response.json()["data"] == {"removed": 1}
+        assert await remaining() == {("p1", "m1"), ("p2", "m1")}
+
+        response = await client.delete("/api/v1/admin/enrichment-cache", params={"model": "m1"}, headers=auth(admin))
+        assert response.json()["data"]["removed"] >= 2
+        assert await remaining() == set()
+
+        await client.delete("/api/v1/admin/enrichment-cache", headers=auth(admin))
+    async with get_session() as db:
+        assert await db.scalar(select(func.count()).select_from(EnrichmentCache)) == 0
@@ -0,0 +1,110 @@
+import asyncio
+import multiprocessing
+import os
+import signal
+import time
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.extractors import engine, file_extractor
+from app.services.extractors.engine import extract_file, page_ranges, shutdown_extraction_pool
+
+
+def test_page_ranges_cover_every_page_once():
+    assert page_ranges(0, 16) == []
+    assert page_ranges(40, 16) == [(0, 16), (16, 32), (32, 40)]
+
+
+@pytest.mark.asyncio
+async def test_extracted_text_is_cached_by_file_hash(tmp_path):
+    source = tmp_path / "notes.txt"
+    source.write_text("进程池抽取", encoding="utf-8")
+    try:
+        assert await extract_file(str(source), "text/plain", "ab" * 32) == "进程池抽取"
+        source.unlink()
+        # Served from the cache without touching the (now missing) file.
+        assert await extract_file(str(source), "text/plain", "ab" * 32) == "进程池抽取"
+    finally:
+        shutdown_extraction_pool()
+
+
+@pytest.mark.asyncio
+async def test_timeout_stops_only_the_slow_document(monkeypatch, tmp_path):
+    # Opening a FIFO without a writer blocks forever: a stand-in for a parser that hangs.
+    stuck = tmp_path / "stuck.txt"
+    os.mkfifo(stuck)
+    fine = tmp_path / "fine.txt"
+    fine.write_text("正常文档", encoding="utf-8")
+    monkeypatch.setattr(settings, "extract_timeout_seconds", 3.0)
+    monkeypatch.setattr(settings, "extract_workers", 2)
+    shutdown_extraction_pool()
+    pool = engine.get_extraction_pool()
+    try:
+        slow = asyncio.ensure_future(extract_file(str(stuck)))
+        # Runs beside the stuck document instead of being killed with it.
+        assert await extract_file(str(fine)) == "正常文档"
+        with pytest.raises(HTTPException) as exc:
+            await slow
+        assert exc.value.status_code == 422
+        # The worker stopped its own task, so the pool keeps serving.
+        assert engine.get_extraction_pool() is pool
+        assert await extract_file(str(fine)) == "正常文档"
+    finally:
+        shutdown_extraction_pool()
+
+
+def _wait_until_exited(pid: int) -> bool:
+    for _ in range(100):
+        # active_children() also reaps workers that have exited.
+        if pid not in {child.pid for child in multiprocessing.active_children()}:
+            return True
+        time.sleep(0.1)
+    return False
+
+
+@pytest.mark.asyncio
+async def test_worker_stuck_in_native_code_is_killed(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "extract_timeout_seconds", 1.0)
+    monkeypatch.setattr(settings, "extract_workers", 1)
+    monkeypatch.setattr(engine, "_DEADLINE_GRACE_SECONDS", 0.5)
+    shutdown_extraction_pool()
+    pool = engine.get_extraction_pool()
+    stuck_pid = pool.submit(os.getpid).result(timeout=30)
+
+    async def hang_in_c(executor, path, deadline):
+        # sigwait blocks inside libc and is not interrupted by the SIGALRM deadline.
+        return await asyncio.get_running_loop().run_in_executor(executor, engine._run_until, deadline, signal.sigwait, {signal.SIGUSR1})
+
+    monkeypatch.setattr(engine, "_extract", hang_in_c)
+    try:
+        with pytest.raises(HTTPException) as exc:
+            await extract_file(str(tmp_path / "pathological.pdf"))
+        assert exc.value.status_code == 422
+        assert _wait_until_exited(stuck_pid)
+        assert not engine._retired
+        monkeypatch.undo()
+        # New work goes to a fresh pool.
+        fine = tmp_path / "fine.txt"
+        fine.write_text("正常文档", encoding="utf-8")
+        assert engine.get_extraction_pool() is not pool
+        assert await extract_file(str(fine)) == "正常文档"
+    finally:
+        shutdown_extraction_pool()
+
+
+def test_shutdown_kills_running_extractions(monkeypatch):
+    monkeypatch.setattr(settings, "extract_workers", 1)
+    pool = engine.get_extraction_pool()
+    pid = pool.submit(os.getpid).result(timeout=30)
+    future = pool.submit(engine._run_until, time.time() + 60, signal.sigwait, {signal.SIGUSR1})
+    while not future.running():
+        time.sleep(0.05)
+    started = time.perf_counter()
+    shutdown_extraction_pool()
+    assert time.perf_counter() - started < 1.0 and engine._pool is None
+    with pytest.raises(BrokenProcessPool):
+        future.result(timeout=30)
+    assert _wait_until_exited(pid)
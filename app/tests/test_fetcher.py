@@ -0,0 +1,95 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.services.extractors.fetcher import UrlFetcher
+
+PAGE = "<html><body><article><p>条件请求缓存测试页面。</p></article></body></html>".encode("utf-8")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    hits: list[str] = []
+
+    def do_GET(self):
+        _Handler.hits.append(self.path)
+        if self.path == "/page":
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("ETag", '"v1"')
+            self.end_headers()
+            self.wfile.write(PAGE)
+        elif self.path == "/big":
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b"x" * 4096)
+        elif self.path in ("/missing", "/busy"):
+            self.send_response(404 if self.path == "/missing" else 503)
+            self.end_headers()
+        elif self.path.startswith("/loop"):
+            self.send_response(302)
+            self.send_header("Location", f"/loop{len(self.path)}")
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    _Handler.hits = []
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_unchanged_page_is_served_from_cache_after_304(server, tmp_path):
+    fetcher = UrlFetcher(cache_dir=str(tmp_path))
+    try:
+        first = await fetcher.fetch(f"{server}/page")
+        second = await fetcher.fetch(f"{server}/page")
+    finally:
+        await fetcher.close()
+    assert not first.from_cache and second.from_cache
+    assert first.html == second.html == PAGE.decode("utf-8")
+    assert _Handler.hits == ["/page", "/page"]
+
+
+@pytest.mark.asyncio
+async def test_size_and_redirect_caps(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "fetch_max_bytes", 1024)
+    monkeypatch.setattr(settings, "fetch_max_redirects", 3)
+    fetcher = UrlFetcher(cache_dir=str(tmp_path))
+    try:
+        with pytest.raises(HTTPException, match="size limit") as exc:
+            await fetcher.fetch(f"{server}/big")
+        assert exc.value.status_code == 422
+        with pytest.raises(HTTPException, match="redirects"):
+            await fetcher.fetch(f"{server}/loop")
+    finally:
+        await fetcher.close()
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_permanent_and_host_limits_are_released(server, tmp_path):
+    fetcher = UrlFetcher(cache_dir=str(tmp_path))
+    try:
+        with pytest.raises(HTTPException) as exc:
+            await fetcher.fetch(f"{server}/missing")
+        assert exc.value.status_code == 400
+        # Server errors are not HTTPExceptions, so the job queue retries them.
+        with pytest.raises(ValueError, match="503"):
+            await fetcher.fetch(f"{server}/busy")
+        await fetcher.fetch(f"{server}/page")
+        assert fetcher._host_limits == {} and not fetcher._host_users
+    finally:
+        await fetcher.close()
@@ -0,0 +1,58 @@
+import hashlib
+import io
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from httpx import ASGITransport, AsyncClient
+
+from app.core.config import settings
+from app.main import app
+from app.services.storage.file_store import content_path, save_upload
+
+
+def _upload(data: bytes, name: str = "report.pdf") -> UploadFile:
+    return UploadFile(io.BytesIO(data), filename=name)
+
+
+@pytest.mark.asyncio
+async def test_identical_uploads_share_one_content_addressed_file():
+    data = b"%PDF-1.4 " + b"x" * 3_000_000
+    first = await save_upload(_upload(data, "a.pdf"))
+    second = await save_upload(_upload(data, "b.PDF"))
+    digest = hashlib.sha256(data).hexdigest()
+    assert first["sha256"] == second["sha256"] == digest
+    assert first["path"] == second["path"] == str(content_path(digest, ".pdf"))
+    assert Path(first["path"]).relative_to(settings.upload_dir).parts[:2] == (digest[:2], digest[2:4])
+    assert first["size"] == len(data) and first["filename"] == "a.pdf"
+    assert not any((Path(settings.upload_dir) / "tmp").iterdir())
+
+
+@pytest.mark.asyncio
+async def test_upload_over_limit_is_rejected_mid_stream(monkeypatch):
+    monkeypatch.setattr(settings, "max_upload_bytes", 1024)
+    with pytest.raises(HTTPException) as exc:
+        await save_upload(_upload(b"y" * 4096))
+    assert exc.value.status_code == 413
+    assert not any((Path(settings.upload_dir) / "tmp").iterdir())
+
+
+@pytest.mark.asyncio
+async def test_oversized_request_bodies_are_refused_before_parsing(monkeypatch):
+    monkeypatch.setattr(settings, "max_upload_bytes", 1024)
+    monkeypatch.setattr("app.services.storage.file_store.FORM_OVERHEAD_BYTES", 512)
+    body = (b'--x\r\nContent-Disposition: form-data; name="file"; filename="big.txt"\r\n\r\n'
+            + b"z" * 8192 + b"\r\n--x--\r\n")
+
+    async def chunked():
+        for start in range(0, len(body), 1024):
+            yield body[start:start + 1024]
+
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        # Rejected on Content-Length, before authentication or form parsing.
+        response = await client.post("/api/v1/items/file", content=body, headers={"Content-Type": "multipart/form-data; boundary=x"})
+        assert response.status_code == 413
+        # No Content-Length: counted as it arrives.
+        response = await client.post("/api/v1/items/file", content=chunked(), headers={"Content-Type": "multipart/form-data; boundary=x"})
+        assert response.status_code == 413
+        assert (await client.get("/health")).status_code == 200
@@ -0,0 +1,51 @@
+import pytest
+from httpx import AsyncClient
+
+from app.db.fulltext import segment_cjk
+from app.db.models import KnowledgeItem, SourceType, User
+from app.db.session import get_session
+from app.main import app
+from app.services.search.fulltext import build_fts5_query, make_snippet
+
+
+def test_cjk_bigram_segmentation_and_query():
+    assert segment_cjk("向量检索 vector").split() == ["向量", "量检", "检索", "vector"]
+    assert build_fts5_query('检索 "x') == '"检索" "x"'
+    assert build_fts5_query("库") == '"库"*'
+
+
+def test_snippet_centers_on_match():
+    content = "开头" * 200 + "全文检索引擎" + "结尾" * 200
+    snippet = make_snippet(content, "检索", width=40)
+    assert "检索" in snippet and snippet.startswith("…") and snippet.endswith("…")
+
+
+@pytest.mark.asyncio
+async def test_text_search_ranks_and_tracks_updates():
+    async with get_session() as db:
+        user = User(username="fts", password_hash="x")
+        db.add(user)
+        await db.flush()
+        title_hit = KnowledgeItem(owner_id=user.id, title="倒排索引原理", source_type=SourceType.text,
+                                  content_text="介绍倒排索引的数据结构。", content_hash="fts-1")
+        body_hit = KnowledgeItem(owner_id=user.id, title="杂记", source_type=SourceType.text,
+                                 content_text="今天顺便看了倒排索引。", content_hash="fts-2")
+        db.add_all([title_hit, body_hit])
+        await db.commit()
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            resp = await client.get("/api/v1/search/text", params={"q": "倒排索引"})
+            data = resp.json()["data"]
+            assert [row["id"] for row in data[:2]] == [title_hit.id, body_hit.id]
+            assert data[0]["score"] > data[1]["score"] > 0
+            assert "倒排索引" in data[1]["snippet"]
+
+            resp = await client.get("/api/v1/search/text", params={"q": "倒排索引", "limit": 1})
+            assert resp.json()["next_offset"] == 1
+
+            body_hit.content_text = "内容已改写。"
+            await db.commit()
+            await db.delete(title_hit)
+            await db.commit()
+            resp = await client.get("/api/v1/search/text", params={"q": "倒排索引"})
+            assert {title_hit.id, body_hit.id}.isdisjoint(row["id"] for row in resp.json()["data"])
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.db.models import KnowledgeItem, SourceType, User
+from app.db.session import get_session
+from app.services.search import hybrid
+from app.services.search.hybrid import fuse, hybrid_search
+
+
+def test_rrf_rewards_agreement_between_legs():
+    legs = {
+        "lexical": [{"id": "a", "score": 9.0}, {"id": "b", "score": 5.0}],
+        "semantic": [{"id": "b", "score": 0.9}, {"id": "c", "score": 0.8}],
+    }
+    fused = fuse(legs, mode="rrf", rrf_k=60, weights={"lexical": 1.0, "semantic": 1.0})
+    assert [e["id"] for e in fused] == ["b", "a", "c"]
+    assert fused[0]["sources"] == {"lexical": {"score": 5.0, "rank": 2}, "semantic": {"score": 0.9, "rank": 1}}
+
+
+def test_weighted_fusion_normalizes_each_leg():
+    legs = {
+        "lexical": [{"id": "a", "score": 30.0}, {"id": "b", "score": 10.0}],
+        "semantic": [{"id": "b", "score": 0.9}, {"id": "a", "score": 0.1}],
+    }
+    fused = fuse(legs, mode="weighted", weights={"lexical": 0.25, "semantic": 0.75})
+    assert [e["id"] for e in fused] == ["b", "a"]
+    assert fused[0]["score"] == pytest.approx(0.75)
+
+
+@pytest.mark.asyncio
+async def test_slow_semantic_leg_degrades_to_lexical(monkeypatch):
+    async def slow_semantic(q, limit):
+        await asyncio.sleep(5)
+        return []
+
+    monkeypatch.setattr(hybrid, "_semantic_leg", slow_semantic)
+    monkeypatch.setattr(settings, "hybrid_semantic_timeout_ms", 50.0)
+    async with get_session() as db:
+        user = User(username="hybrid", password_hash="x")
+        db.add(user)
+        await db.flush()
+        item = KnowledgeItem(owner_id=user.id, title="融合排序", source_type=SourceType.text,
+                             content_text="倒数排名融合 reciprocal rank fusion", content_hash="hybrid-1")
+        db.add(item)
+        await db.commit()
+
+        result = await hybrid_search(db, "reciprocal", top_k=5)
+    assert result["degraded"] == ["semantic"]
+    assert result["items"][0]["id"] == item.id
+    assert set(result["items"][0]["sources"]) == {"lexical"}
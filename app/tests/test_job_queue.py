@@ -0,0 +1,210 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+import pytest_asyncio
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select
+
+from app.core.config import settings
+from app.db.models import IngestJob, JobStatus, User
+from app.db.session import get_session
+from app.services.jobs import queue
+from app.services.jobs.handlers import JOB_HANDLERS
+
+
+async def _flaky(db, user, job, on_stage):
+    await on_stage("work")
+    behaviour = job.payload.get("behaviour")
+    if behaviour == "crash":
+        raise RuntimeError("worker blew up")
+    if behaviour == "reject":
+        raise HTTPException(status_code=400, detail="Unsupported input")
+    return {"item_id": "item-1"}
+
+
+@pytest_asyncio.fixture()
+async def owner(monkeypatch):
+    monkeypatch.setitem(JOB_HANDLERS, "test", _flaky)
+    monkeypatch.setattr(settings, "ingest_retry_backoff_seconds", 10.0)
+    async with get_session() as db:
+        # Jobs left pending by other tests would otherwise be claimed here.
+        await db.execute(delete(IngestJob))
+        user = User(username=f"queue-{datetime.utcnow().timestamp()}", password_hash="x")
+        db.add(user)
+        await db.commit()
+    return user
+
+
+async def _job(job_id: str) -> IngestJob:
+    async with get_session() as db:
+        return await db.get(IngestJob, job_id)
+
+
+async def _enqueue(user: User, behaviour: str = "ok", max_attempts: int | None = None) -> str:
+    async with get_session() as db:
+        job = await queue.enqueue_job(db, user, "test", {"behaviour": behaviour})
+        if max_attempts is not None:
+            job.max_attempts = max_attempts
+            await db.commit()
+        return job.id
+
+
+@pytest.mark.asyncio
+async def test_concurrent_claims_take_each_job_once(owner):
+    job_ids = {await _enqueue(owner) for _ in range(8)}
+    claimed: list[str] = []
+    while len(claimed) < len(job_ids):
+        results = await asyncio.gather(*(queue._claim_next_job(f"w{n}") for n in range(6)))
+        claimed += [job_id for job_id in results if job_id]
+    assert sorted(claimed) == sorted(job_ids)
+    for job_id in job_ids:
+        job = await _job(job_id)
+        assert job.status == JobStatus.running and job.attempts == 1 and job.locked_by
+
+
+@pytest.mark.asyncio
+async def test_transient_failures_back_off_until_attempts_run_out(owner):
+    job_id = await _enqueue(owner, "crash", max_attempts=2)
+
+    assert await queue._claim_next_job("w") == job_id
+    started = datetime.utcnow()
+    await queue.run_job(job_id, "w")
+    job = await _job(job_id)
+    assert job.status == JobStatus.pending and job.attempts == 1
+    assert job.error == "RuntimeError: worker blew up" and job.locked_by is None
+    assert started + timedelta(seconds=9) < job.run_after < started + timedelta(seconds=11)
+    # Not due yet.
+    assert await queue._claim_next_job("w") is None
+
+    async with get_session() as db:
+        (await db.get(IngestJob, job_id)).run_after = datetime.utcnow()
+        await db.commit()
+    assert await queue._claim_next_job("w") == job_id
+    await queue.run_job(job_id, "w")
+    job = await _job(job_id)
+    assert job.status == JobStatus.failed and job.attempts == 2 and job.finished_at
+    assert job.progress == {"work": "running"}
+
+
+@pytest.mark.asyncio
+async def test_client_errors_fail_without_retry(owner):
+    job_id = await _enqueue(owner, "reject")
+    assert await queue._claim_next_job("w") == job_id
+    await queue.run_job(job_id, "w")
+    job = await _job(job_id)
+    assert job.status == JobStatus.failed and job.attempts == 1
+    assert job.error == "Unsupported input"
+    assert queue._is_permanent(HTTPException(status_code=404))
+    assert not queue._is_permanent(HTTPException(status_code=503))
+    assert not queue._is_permanent(RuntimeError())
+
+
+@pytest.mark.asyncio
+async def test_expired_leases_are_requeued(owner):
+    stale, live = await _enqueue(owner), await _enqueue(owner)
+    assert {await queue._claim_next_job("dead"), await queue._claim_next_job("alive")} == {stale, live}
+    async with get_session() as db:
+        (await db.get(IngestJob, stale)).locked_at = datetime.utcnow() - timedelta(seconds=settings.ingest_job_lease_seconds + 1)
+        await db.commit()
+
+    assert await queue.recover_stale_jobs() == 1
+    job = await _job(stale)
+    assert job.status == JobStatus.pending and job.locked_by is None
+    assert (await _job(live)).status == JobStatus.running
+    # The next claim counts as another attempt.
+    assert await queue._claim_next_job("w") == stale
+    assert (await _job(stale)).attempts == 2
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_runs_queued_jobs(owner):
+    pool = queue.JobWorkerPool(concurrency=2, poll_interval=0.05)
+    await pool.start()
+    try:
+        job_ids = [await _enqueue(owner) for _ in range(3)] + [await _enqueue(owner, "reject")]
+        for _ in range(100):
+            jobs = [await _job(job_id) for job_id in job_ids]
+            if all(job.status in (JobStatus.succeeded, JobStatus.failed) for job in jobs):
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        await pool.stop()
+    assert [job.status for job in jobs] == [JobStatus.succeeded] * 3 + [JobStatus.failed]
+    assert all(job.item_id == "item-1" and job.progress == {"work": "done"} for job in jobs[:3])
+
+
+@pytest.mark.asyncio
+async def test_exclusive_jobs_never_run_twice(owner):
+    async def enqueue():
+        async with get_session() as db:
+            return await queue.enqueue_exclusive_job(db, owner, "test", {})
+
+    created = [job for job in await asyncio.gather(*(enqueue() for _ in range(4))) if job]
+    assert len(created) <= 1
+    if not created:
+        created = [await enqueue()]
+    assert await enqueue() is None
+    # The winner is claimable right away; the losers left nothing behind.
+    assert await queue._claim_next_job("w") == created[0].id
+    assert await enqueue() is None
+    async with get_session() as db:
+        assert (await db.execute(select(func.count()).select_from(IngestJob))).scalar() == 1
+
+
+@pytest.mark.asyncio
+async def test_jobs_of_a_crashed_worker_recover_after_a_quick_restart(owner, monkeypatch):
+    monkeypatch.setattr(settings, "ingest_job_lease_seconds", 0.6)
+    orphan, doomed = await _enqueue(owner), await _enqueue(owner, max_attempts=1)
+    # The previous worker claimed both jobs and died a moment ago: their leases are still valid.
+    assert {await queue._claim_next_job("host:1:dead/0"), await queue._claim_next_job("host:1:dead/1")} == {orphan, doomed}
+
+    pool = queue.JobWorkerPool(concurrency=1, poll_interval=0.05)
+    await pool.start()
+    try:
+        assert (await _job(orphan)).status == JobStatus.running
+        for _ in range(60):
+            if (await _job(orphan)).status == JobStatus.succeeded:
+                break
+            await asyncio.sleep(0.1)
+    finally:
+        await pool.stop()
+    job = await _job(orphan)
+    assert job.status == JobStatus.succeeded and job.attempts == 2
+    # A job that already used its attempts is failed rather than handed to another worker.
+    job = await _job(doomed)
+    assert job.status == JobStatus.failed and job.attempts == 1 and job.error == "Worker stopped while running the job"
+
+
+@pytest.mark.asyncio
+async def test_live_pools_renew_their_leases(owner, monkeypatch):
+    monkeypatch.setattr(settings, "ingest_job_lease_seconds", 0.6)
+    pool = queue.JobWorkerPool(concurrency=1, poll_interval=0.05)
+    job_id = await _enqueue(owner)
+    assert await queue._claim_next_job(f"{pool.worker_id}/0") == job_id
+    await asyncio.sleep(0.4)
+    await queue.renew_leases(pool.worker_id)
+    await asyncio.sleep(0.4)
+    assert await queue.recover_stale_jobs() == 0
+    assert (await _job(job_id)).status == JobStatus.running
+
+
+@pytest.mark.asyncio
+async def test_only_the_current_claim_finalizes_a_job(owner):
+    job_id = await _enqueue(owner)
+    assert await queue._claim_next_job("first") == job_id
+    async with get_session() as db:
+        (await db.get(IngestJob, job_id)).locked_at = datetime.utcnow() - timedelta(seconds=settings.ingest_job_lease_seconds + 1)
+        await db.commit()
+    assert await queue.recover_stale_jobs() == 1
+    assert await queue._claim_next_job("second") == job_id
+
+    # The first worker was only slow, not dead; its late outcomes are dropped.
+    await queue._record_failure(job_id, "first", RuntimeError("late"))
+    await queue._record_success(job_id, "first", {"item_id": "stale"})
+    job = await _job(job_id)
+    assert job.status == JobStatus.running and job.locked_by == "second" and job.item_id is None
+
+    await queue._record_success(job_id, "second", {"item_id": "item-2"})
+    job = await _job(job_id)
+    assert job.status == JobStatus.succeeded and job.item_id == "item-2" and job.locked_by is None
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import pytest
+
+from app.db.models import KnowledgeItem, SourceType, User
+from app.db.session import get_session
+from app.services.items.listing import decode_cursor, encode_cursor, list_items_page
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(created_at, "abc")) == (created_at, "abc")
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_ties_without_duplicates():
+    # Several items share a timestamp, so the id tie-breaker decides the page boundaries.
+    stamp = datetime(2099, 1, 1)
+    async with get_session() as db:
+        user = User(username="pager", password_hash="x")
+        db.add(user)
+        await db.flush()
+        ids = []
+        for i in range(5):
+            item = KnowledgeItem(
+                owner_id=user.id, title=f"t{i}", source_type=SourceType.text,
+                content_text="body", content_hash=f"pager-{i}", created_at=stamp,
+            )
+            db.add(item)
+            ids.append(item)
+        await db.commit()
+        expected = sorted((item.id for item in ids), reverse=True)
+
+        seen, cursor = [], None
+        while True:
+            rows, cursor = await list_items_page(db, 2, cursor)
+            assert "content_text" not in rows[0]
+            seen.extend(row["id"] for row in rows)
+            if cursor is None:
+                break
+    assert seen[:5] == expected
+    assert len(seen) == len(set(seen))
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.db.models import SourceType, User
+from app.db.session import get_session
+from app.llm.providers.base import get_provider
+from app.llm.providers.mock import MockProvider
+from app.services.ingest.pipeline import enrich_and_save
+
+
+class SlowProvider(MockProvider):
+    """Blocking calls that take `delay` seconds and record how many ran at once."""
+
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+        self.finished = 0
+        self._lock = threading.Lock()
+
+    def summarize(self, text: str) -> str:
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.delay)
+        with self._lock:
+            self.running -= 1
+            self.finished += 1
+        return text
+
+
+@pytest.mark.asyncio
+async def test_thread_calls_respect_the_concurrency_limit(monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_concurrency", 2)
+    provider = SlowProvider(0.05)
+    results = await asyncio.gather(*(provider.asummarize(f"t{i}") for i in range(6)))
+    assert results == [f"t{i}" for i in range(6)]
+    assert provider.peak == 2
+
+
+@pytest.mark.asyncio
+async def test_timed_out_thread_call_keeps_its_slot_until_it_returns(monkeypatch):
+    monkeypatch.setattr(settings, "llm_max_concurrency", 1)
+    monkeypatch.setattr(settings, "llm_timeout_seconds", 0.05)
+    provider = SlowProvider(0.3)
+    with pytest.raises(asyncio.TimeoutError):
+        await provider.asummarize("slow")
+    assert provider.running == 1
+
+    # The next call waits for the abandoned one instead of running beside it.
+    monkeypatch.setattr(settings, "llm_timeout_seconds", 5.0)
+    provider.delay = 0.01
+    assert await provider.asummarize("next") == "next"
+    assert provider.peak == 1 and provider.finished == 2
+
+
+@pytest.mark.asyncio
+async def test_enrichment_and_embedding_run_concurrently(monkeypatch):
+    provider = get_provider()
+    started = {"enrich": asyncio.Event(), "embed": asyncio.Event()}
+    aenrich, aembed_batch = provider.aenrich, provider.aembed_batch
+
+    async def enrich(text):
+        started["enrich"].set()
+        # Only completes if embedding started while enrichment was still outstanding.
+        await asyncio.wait_for(started["embed"].wait(), timeout=2)
+        return await aenrich(text)
+
+    async def embed(texts):
+        started["embed"].set()
+        await asyncio.wait_for(started["enrich"].wait(), timeout=2)
+        return await aembed_batch(texts)
+
+    monkeypatch.setattr(provider, "aenrich", enrich)
+    monkeypatch.setattr(provider, "aembed_batch", embed)
+    stages = []
+
+    async def on_stage(stage):
+        stages.append(stage)
+
+    async with get_session() as db:
+        user = User(username="llm-gather", password_hash="x")
+        db.add(user)
+        await db.commit()
+        item = await enrich_and_save(db, user, "并发", "摘要与向量同时计算。Enrichment and embedding overlap.", SourceType.text, on_stage=on_stage)
+    assert item.summary and stages == ["enrich", "embed", "index"]
@@ -0,0 +1,124 @@
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client import AsyncQdrantClient
+
+from app.core.config import settings
+from app.db.models import SourceType
+from app.services.indexing.local_store import LocalVectorStore
+from app.services.indexing.qdrant_store import QdrantStore, build_search_filter, item_payload
+from app.services.indexing import store as store_module
+from app.services.indexing.store import FallbackStore
+from app.services.ingest.chunking import Chunk
+
+
+def _item(item_id, owner_id, tags, created_at):
+    return SimpleNamespace(id=item_id, title=item_id, tags=tags, keywords=[], owner_id=owner_id,
+                           source_type=SourceType.text, created_at=created_at)
+
+
+def _vector(axis):
+    vector = [0.0] * settings.embedding_dim
+    vector[axis] = 1.0
+    return vector
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+async def test_local_store_filters_persists_and_drops_stale_chunks(tmp_path, monkeypatch, dtype):
+    monkeypatch.setattr(settings, "local_vector_dtype", dtype)
+    store = LocalVectorStore(tmp_path, collection="local_test")
+    a = _item("a", 1, ["python"], datetime(2024, 1, 1))
+    b = _item("b", 2, ["rust"], datetime(2024, 6, 1))
+    await store.upsert_chunks("a", [Chunk(0, "a0", 0, 2), Chunk(1, "a1", 2, 4), Chunk(2, "a2", 4, 6)], [_vector(0)] * 3, item_payload(a))
+    await store.upsert_many([("b", [Chunk(0, "b0", 0, 2)], [_vector(1)], item_payload(b))])
+
+    async def ids(**filters):
+        return sorted(hit["id"] for hit in await store.search("anything", top_k=10, query_filter=build_search_filter(**filters)))
+
+    assert await ids() == ["a", "b"]
+    assert await ids(owner_id=2) == ["b"]
+    assert await ids(tags=["python", "go"]) == ["a"]
+    assert await ids(created_from=datetime(2024, 3, 1)) == ["b"]
+
+    # Re-indexing with fewer chunks removes the leftovers.
+    await store.upsert_chunks("a", [Chunk(0, "a0", 0, 2)], [_vector(0)], item_payload(a))
+    assert len(await store.item_points("a")) == 1
+    await store.delete_item("b")
+    await store.close()
+
+    reopened = LocalVectorStore(tmp_path, collection="local_test")
+    hits = await reopened.search("anything", top_k=10)
+    assert [hit["id"] for hit in hits] == ["a"] and [p["text"] for p in hits[0]["passages"]] == ["a0"]
+    assert await reopened.resolve_collection() == "local_test_v1"
+    await reopened.close()
+
+
+class _FlakyQdrant(QdrantStore):
+    def __init__(self):
+        super().__init__(AsyncQdrantClient(location=":memory:"), collection="fallback_test")
+        self.down = False
+
+    async def ensure_collection(self):
+        if self.down:
+            raise ConnectionError("qdrant is down")
+        await super().ensure_collection()
+
+
+@pytest.mark.asyncio
+async def test_fallback_serves_reads_locally_and_replays_missed_writes(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "vector_fallback_retry_seconds", 60)
+    primary = _FlakyQdrant()
+    store = FallbackStore(primary, LocalVectorStore(tmp_path, collection="fallback_test"))
+    item = _item("a", 1, [], datetime(2024, 1, 1))
+    await store.upsert_chunks("a", [Chunk(0, "a0", 0, 2)], [_vector(0)], item_payload(item))
+
+    primary.down = True
+    with pytest.raises(ConnectionError):
+        await primary.search("anything")
+    assert [hit["id"] for hit in await store.search("anything")] == ["a"]
+    assert not store.primary_available
+
+    # Written while Qdrant is down: kept locally and remembered.
+    await store.upsert_chunks("b", [Chunk(0, "b0", 0, 2)], [_vector(1)], item_payload(_item("b", 1, [], datetime(2024, 1, 1))))
+    await store.delete_item("a")
+    assert sorted(hit["id"] for hit in await store.search("anything")) == ["b"]
+    assert store._pending_items() == {"a", "b"}
+
+    primary.down = False
+    monkeypatch.setattr(store, "_down_until", 0.0)
+    await store.upsert_chunks("c", [Chunk(0, "c0", 0, 2)], [_vector(2)], item_payload(_item("c", 1, [], datetime(2024, 1, 1))))
+    assert not store._pending_items()
+    assert sorted(hit["id"] for hit in await primary.search("anything")) == ["b", "c"]
+    await store.close()
+
+
+@pytest.mark.asyncio
+async def test_embedding_failures_do_not_mark_qdrant_down(tmp_path, monkeypatch):
+    store = FallbackStore(_FlakyQdrant(), LocalVectorStore(tmp_path, collection="fallback_embed"))
+
+    async def broken_embed(text):
+        raise RuntimeError("embedding API unavailable")
+
+    monkeypatch.setattr(store_module, "embed_query", broken_embed)
+    with pytest.raises(RuntimeError, match="embedding"):
+        await store.search("anything")
+    assert store.primary_available
+    await store.close()
+
+
+def test_second_process_cannot_write_the_local_index(tmp_path):
+    LocalVectorStore(tmp_path, collection="locked")
+    # Same process: the lock is shared.
+    LocalVectorStore(tmp_path, collection="other")
+    probe = (
+        "import sys; from pathlib import Path\n"
+        "from app.services.indexing.local_store import LocalIndexLocked, acquire_writer_lock\n"
+        "try:\n    acquire_writer_lock(Path(sys.argv[1]))\nexcept LocalIndexLocked:\n    sys.exit(3)\n"
+    )
+    result = subprocess.run([sys.executable, "-c", probe, str(tmp_path)], cwd=Path(__file__).parents[2])
+    assert result.returncode == 3
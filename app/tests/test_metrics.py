@@ -0,0 +1,38 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+
+from app.core import metrics
+from app.core.config import settings
+from app.db.session import engine
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_metrics_record_routes_sql_and_render_prometheus_text(monkeypatch):
+    monkeypatch.setattr(settings, "metrics_enabled", True)
+    metrics.instrument_engine(engine)
+    try:
+        async with AsyncClient(transport=ASGITransport(app=metrics.MetricsMiddleware(app)), base_url="http://test") as client:
+            before = metrics.HTTP_DB_QUERIES.count(route="/api/v1/search/text")
+            assert (await client.get("/api/v1/search/text", params={"q": "指标"})).status_code == 200
+            assert (await client.get("/api/v1/items/does-not-exist")).status_code == 404
+            response = await client.get("/metrics")
+    finally:
+        for name, fn in (("before_cursor_execute", metrics._before_cursor_execute), ("after_cursor_execute", metrics._after_cursor_execute), ("handle_error", metrics._handle_error)):
+            event.remove(engine.sync_engine, name, fn)
+
+    assert metrics.HTTP_REQUESTS.value(method="GET", route="/api/v1/items/{item_id}", status="404") >= 1
+    assert metrics.HTTP_DB_QUERIES.count(route="/api/v1/search/text") == before + 1
+    state = metrics.HTTP_DB_QUERIES._values[("/api/v1/search/text",)]
+    assert state[0] < sum(state[:-1])  # at least one request ran SQL
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert "# TYPE kb_http_request_duration_seconds histogram" in text
+    assert 'kb_http_requests_total{method="GET",route="/api/v1/items/{item_id}",status="404"}' in text
+    assert 'kb_db_query_duration_seconds_bucket{statement="SELECT",le="+Inf"}' in text
+
+
+def test_disabled_metrics_are_no_ops():
+    assert not settings.metrics_enabled
+    assert metrics.timer(metrics.INGEST_STAGE_SECONDS, stage="embed") is metrics._NULL
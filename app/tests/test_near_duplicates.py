@@ -0,0 +1,125 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.db.models import KnowledgeItem, SourceType, User
+from app.db.session import get_session
+from app.services.ingest import near_duplicates, pipeline
+from app.services.ingest.near_duplicates import NearDuplicateIndex, compute_signature
+
+ARTICLE = "".join(
+    f"第{i}段：向量数据库把文本映射到高维空间，通过近似最近邻检索找到语义相近的内容，适合构建个人知识库。"
+    for i in range(30)
+)
+
+
+def _similarity(a: str, b: str) -> float:
+    return float((compute_signature(a) == compute_signature(b)).mean())
+
+
+def test_signature_tolerates_boilerplate_changes():
+    assert _similarity(ARTICLE + "版权所有 © 某某网站", ARTICLE + "广告：点击这里订阅我们的新闻") > 0.85
+    assert _similarity(ARTICLE, "Completely unrelated English text about cooking pasta at home." * 20) < 0.2
+
+
+def test_index_finds_near_duplicates_among_many():
+    rng = np.random.default_rng(1)
+    index = NearDuplicateIndex(num_perm=64, bands=16)
+    index.extend([(f"item-{i}", i % 3, rng.integers(0, 2**32, 64, dtype=np.uint32)) for i in range(5000)])
+    index.rebuild()
+    target = compute_signature(ARTICLE)
+    index.add("original", 7, target)
+    near = target.copy()
+    near[:5] += 1  # ~92% of slots still agree
+
+    assert index.query(near, 0.85) == [("original", pytest.approx(59 / 64))]
+    assert index.query(near, 0.85, owner_id=1) == []
+    index.remove("original")
+    assert index.query(near, 0.85) == []
+
+
+@pytest.mark.asyncio
+async def test_background_rebuild_keeps_writes_made_while_sorting(monkeypatch):
+    rng = np.random.default_rng(2)
+    index = NearDuplicateIndex(num_perm=64, bands=16)
+    for i in range(50):
+        index.add(f"item-{i}", 1, rng.integers(0, 2**32, 64, dtype=np.uint32))
+    late = compute_signature(ARTICLE)
+    sort_bands = near_duplicates._sort_bands
+    written = threading.Event()
+
+    def sort_while_writing(signatures, bands):
+        # Runs in a worker thread; the loop keeps serving writes meanwhile.
+        written.wait(timeout=5)
+        return sort_bands(signatures, bands)
+
+    monkeypatch.setattr(near_duplicates, "_sort_bands", sort_while_writing)
+    rebuild = asyncio.ensure_future(index.rebuild_async())
+    await asyncio.sleep(0)
+    index.add("late", 2, late)
+    index.remove("item-0")
+    written.set()
+    await rebuild
+    assert index.query(late, 0.85) == [("late", 1.0)]
+    assert "item-0" not in index._positions and len(index) == 50
+    assert index._recent_count == 1  # only the replayed addition is still pending a rebuild
+
+
+@pytest.mark.asyncio
+async def test_ingest_url_rejects_or_links_near_duplicates(monkeypatch):
+    pages = {
+        "https://a.example/post": ARTICLE + "本文首发于 A 站。",
+        "https://b.example/post": ARTICLE + "转载自 B 站，侵删。",
+        "https://c.example/post": ARTICLE + "来源：C 站。",
+    }
+
+    async def fake_extract(url):
+        return pages[url], f"<html><body>{pages[url]}</body></html>"
+
+    monkeypatch.setattr(pipeline, "extract_from_url", fake_extract)
+    monkeypatch.setattr(settings, "near_dup_refresh_seconds", 0)
+    monkeypatch.setattr(settings, "near_dup_mode", "reject")
+    async with get_session() as db:
+        user = User(username="neardup", password_hash="x")
+        db.add(user)
+        await db.commit()
+
+        original = await pipeline.ingest_url(db, user, "https://a.example/post", None)
+        with pytest.raises(HTTPException) as exc:
+            await pipeline.ingest_url(db, user, "https://b.example/post", None)
+        assert exc.value.status_code == 400 and original.id in exc.value.detail
+
+        monkeypatch.setattr(settings, "near_dup_mode", "link")
+        linked = await pipeline.ingest_url(db, user, "https://c.example/post", None, tags=["转载"])
+        assert linked.duplicate_of == original.id
+        assert linked.summary == original.summary and "转载" in linked.tags
+
+    matches = await near_duplicates.find_near_duplicates(compute_signature(pages["https://a.example/post"]), exclude_id=original.id)
+    assert [item_id for item_id, _ in matches] == [linked.id]
+
+
+@pytest.mark.asyncio
+async def test_edited_text_is_signed_by_the_refresh_not_the_flush(monkeypatch):
+    monkeypatch.setattr(settings, "near_dup_refresh_seconds", 0)
+    await near_duplicates.ensure_index()
+    async with get_session() as db:
+        user = User(username="neardup-edit", password_hash="x")
+        db.add(user)
+        await db.commit()
+        item = KnowledgeItem(owner_id=user.id, title="t", source_type=SourceType.text, content_text="旧内容", content_hash="neardup-edit",
+                             minhash=near_duplicates.signature_to_bytes(compute_signature("旧内容")))
+        db.add(item)
+        await db.commit()
+        monkeypatch.setattr(near_duplicates, "compute_signature", lambda *args: pytest.fail("hashed inside a flush"))
+        item.content_text = ARTICLE
+        await db.commit()
+        assert item.minhash is None
+        monkeypatch.undo()
+        monkeypatch.setattr(settings, "near_dup_refresh_seconds", 0)
+
+    matches = await near_duplicates.find_near_duplicates(compute_signature(ARTICLE), owner_id=user.id)
+    assert [item_id for item_id, _ in matches] == [item.id]
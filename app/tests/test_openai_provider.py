@@ -0,0 +1,66 @@
+import json
+
+import openai
+import pytest
+
+from app.core.config import settings
+from app.llm.providers.base import MAX_KEYWORDS, MAX_TAGS, EnrichmentResult
+from app.llm.providers.openai_provider import OpenAIProvider
+
+
+@pytest.fixture()
+def provider(monkeypatch):
+    monkeypatch.setattr(settings, "openai_api_key", "sk-test")
+    monkeypatch.setattr(openai, "api_key", openai.api_key)
+    monkeypatch.setattr(openai, "base_url", openai.base_url)
+    return OpenAIProvider()
+
+
+def _fake_chat(structured_reply: str, calls: list):
+    async def achat(**kwargs) -> str:
+        calls.append("json" if "response_format" in kwargs else kwargs["messages"][0]["content"].split(":")[0])
+        if "response_format" in kwargs:
+            return structured_reply
+        prompt = kwargs["messages"][0]["content"]
+        if prompt.startswith("Summarize"):
+            return "fallback summary"
+        if prompt.startswith("Keywords"):
+            return "alpha, beta"
+        return "gamma"
+    return achat
+
+
+@pytest.mark.asyncio
+async def test_structured_enrichment_is_one_call(provider, monkeypatch):
+    calls = []
+    reply = json.dumps({"summary": "总结", "keywords": ["向量", "检索"], "tags": "数据库, 笔记"})
+    monkeypatch.setattr(provider, "_achat", _fake_chat(reply, calls))
+    result = await provider.aenrich("文档内容")
+    assert result == EnrichmentResult(summary="总结", keywords=["向量", "检索"], tags=["数据库", "笔记"])
+    assert calls == ["json"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("reply", [
+    '{"summary": "cut off", "keywords": ["a", "b"',  # truncated
+    '{"keywords": ["a"], "tags": ["b"]}',  # no summary
+    '["not", "an", "object"]',
+    "",
+])
+async def test_malformed_structured_reply_falls_back_to_three_calls(provider, monkeypatch, reply):
+    calls = []
+    monkeypatch.setattr(provider, "_achat", _fake_chat(reply, calls))
+    result = await provider.aenrich("text")
+    assert result == EnrichmentResult(summary="fallback summary", keywords=["alpha", "beta"], tags=["gamma"])
+    assert calls[0] == "json" and sorted(calls[1:]) == ["Keywords list", "Summarize", "Tags"]
+
+
+def test_terms_are_split_deduplicated_and_clamped():
+    result = EnrichmentResult.model_validate_json(json.dumps({
+        "summary": "s",
+        "keywords": [f"k{i}" for i in range(20)],
+        "tags": " a, b ,a,, c, d, e, f, g",
+    }))
+    assert result.keywords == [f"k{i}" for i in range(MAX_KEYWORDS)]
+    assert result.tags == ["a", "b", "c", "d", "e"][:MAX_TAGS]
+    assert EnrichmentResult(summary="s", keywords=None).keywords == []
@@ -0,0 +1,56 @@
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+
+from app.core import metrics, profiling
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db.models import User
+from app.db.session import engine, get_session
+from app.main import app
+
+
+async def _token(username: str) -> str:
+    async with get_session() as db:
+        user = User(username=username, password_hash="x")
+        db.add(user)
+        await db.commit()
+    return create_access_token({"sub": str(user.id)})
+
+
+@pytest.mark.asyncio
+async def test_admin_requested_profiles_are_kept_in_a_bounded_ring(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "admin_username", "profiler-admin")
+    monkeypatch.setattr(settings, "profiling_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profiling_max_profiles", 2)
+    admin = {"Authorization": f"Bearer {await _token('profiler-admin')}"}
+    user = {"Authorization": f"Bearer {await _token('profiler-user')}"}
+    metrics.instrument_engine(engine)
+    try:
+        await _exercise(tmp_path, admin, user)
+    finally:
+        for name, fn in (("before_cursor_execute", metrics._before_cursor_execute), ("after_cursor_execute", metrics._after_cursor_execute), ("handle_error", metrics._handle_error)):
+            event.remove(engine.sync_engine, name, fn)
+
+
+async def _exercise(tmp_path, admin: dict, user: dict) -> None:
+    async with AsyncClient(transport=ASGITransport(app=profiling.ProfilingMiddleware(app)), base_url="http://test") as client:
+        assert (await client.get("/api/v1/search/text", params={"q": "剖析"}, headers={**user, "X-Profile": "1"})).status_code == 200
+        assert list(tmp_path.iterdir()) == []
+
+        for _ in range(3):
+            assert (await client.get("/api/v1/search/text", params={"q": "剖析"}, headers={**admin, "X-Profile": "1"})).status_code == 200
+        assert (await client.get("/api/v1/items", params={"profile": "1"}, headers=admin)).status_code == 200
+        assert len(list(tmp_path.glob("*.prof"))) == len(list(tmp_path.glob("*.json"))) == 2
+
+        listed = (await client.get("/api/v1/admin/profiles", headers=admin)).json()["data"]
+        assert [p["path"] for p in listed] == ["/api/v1/items", "/api/v1/search/text"]
+        assert listed[0]["trigger"] == "request" and listed[0]["status"] == 200
+        assert any(name.startswith("db_query:SELECT") for name in listed[1]["awaits"])
+
+        report = await client.get(f"/api/v1/admin/profiles/{listed[1]['id']}", params={"sort": "tottime", "limit": 10}, headers=admin)
+        assert report.status_code == 200 and "function calls" in report.text
+        raw = await client.get(f"/api/v1/admin/profiles/{listed[1]['id']}", params={"format": "prof"}, headers=admin)
+        assert raw.status_code == 200 and raw.content == (tmp_path / f"{listed[1]['id']}.prof").read_bytes()
+        assert (await client.get("/api/v1/admin/profiles/..%2Fsecrets", headers=admin)).status_code == 404
+        assert (await client.get("/api/v1/admin/profiles", headers=user)).status_code == 403
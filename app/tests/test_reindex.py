@@ -0,0 +1,88 @@
+import pytest
+from qdrant_client import AsyncQdrantClient
+from sqlalchemy import func, select
+
+from app.core.config import settings
+from app.db.models import KnowledgeItem, SourceType, User
+from app.db.session import get_session
+from app.services.indexing import reindex
+from app.services.indexing.qdrant_store import QdrantStore
+
+
+class _Crash(Exception):
+    pass
+
+
+async def _indexed_item_ids(store: QdrantStore, collection: str) -> set[str]:
+    points, _ = await store.client.scroll(collection, limit=10_000)
+    return {point.payload["item_id"] for point in points}
+
+
+@pytest.mark.asyncio
+async def test_reindex_resumes_from_checkpoint_and_swaps_alias(monkeypatch):
+    monkeypatch.setattr(settings, "reindex_batch_size", 2)
+    store = QdrantStore(AsyncQdrantClient(location=":memory:"), collection="reindex_test")
+    monkeypatch.setattr(reindex, "get_store", lambda: store)
+    await store.ensure_collection()
+    assert await store.resolve_collection() == "reindex_test_v1"
+
+    async with get_session() as db:
+        user = User(username="reindexer", password_hash="x")
+        db.add(user)
+        await db.commit()
+        for i in range(5):
+            db.add(KnowledgeItem(owner_id=user.id, title=f"重建 {i}", source_type=SourceType.text, content_text=f"重建索引测试内容 {i}", content_hash=f"reindex-{i}"))
+        await db.commit()
+        live_count = (await db.execute(
+            select(func.count()).select_from(KnowledgeItem).where(KnowledgeItem.is_deleted == False, KnowledgeItem.duplicate_of.is_(None))  # noqa: E712
+        )).scalar()
+
+    checkpoints = []
+
+    async def crash_after_first_batch(state):
+        checkpoints.append(state)
+        if state.get("indexed"):
+            raise _Crash()
+
+    with pytest.raises(_Crash):
+        await reindex.run_reindex(on_progress=crash_after_first_batch)
+    checkpoint = checkpoints[-1]
+    assert checkpoint["collection"] == "reindex_test_v2" and checkpoint["indexed"] == 2
+    # Queries are still served by the old version.
+    assert await store.resolve_collection() == "reindex_test_v1"
+
+    async with get_session() as db:
+        late = KnowledgeItem(owner_id=user.id, title="迟到", source_type=SourceType.text, content_text="重建期间新增的内容", content_hash="reindex-late")
+        db.add(late)
+        await db.commit()
+
+    summary = await reindex.run_reindex(checkpoint, on_progress=None)
+    assert summary["phase"] == "done" and summary["indexed"] >= live_count
+    assert await store.resolve_collection() == "reindex_test_v2"
+    collections, _ = await store.list_collections()
+    assert "reindex_test_v1" not in collections
+    indexed = await _indexed_item_ids(store, "reindex_test_v2")
+    assert late.id in indexed and len(indexed) == live_count + 1
+
+
+@pytest.mark.asyncio
+async def test_crash_between_swap_and_checkpoint_still_drops_the_source(monkeypatch):
+    store = QdrantStore(AsyncQdrantClient(location=":memory:"), collection="reindex_crash")
+    monkeypatch.setattr(reindex, "get_store", lambda: store)
+    await store.ensure_collection()
+    checkpoints = []
+
+    async def crash_on_swapped(state):
+        if state["phase"] == "swapped":
+            raise _Crash()
+        checkpoints.append(state)
+
+    with pytest.raises(_Crash):
+        await reindex.run_reindex(on_progress=crash_on_swapped)
+    assert checkpoints[-1]["phase"] == "catch_up"
+    assert await store.resolve_collection() == "reindex_crash_v2"
+
+    summary = await reindex.run_reindex(checkpoints[-1])
+    assert summary["phase"] == "done"
+    collections, _ = await store.list_collections()
+    assert "reindex_crash_v1" not in collections and "reindex_crash_v2" in collections
@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from qdrant_client import AsyncQdrantClient
+
+from app.core.config import settings
+from app.db.models import SourceType
+from app.services.indexing.local_store import LocalVectorStore
+from app.services.indexing.qdrant_store import QdrantStore, build_search_filter, item_payload, quantization_config, search_params
+from app.services.ingest.chunking import Chunk
+
+
+def _item(item_id, owner_id, tags, source_type, created_at):
+    return SimpleNamespace(id=item_id, title=item_id, tags=tags, keywords=[], owner_id=owner_id,
+                           source_type=source_type, created_at=created_at)
+
+
+@pytest.mark.asyncio
+async def test_filters_are_applied_inside_qdrant():
+    store = QdrantStore(AsyncQdrantClient(location=":memory:"), collection="filter_test")
+    items = [
+        _item("a", 1, ["python"], SourceType.text, datetime(2024, 1, 1)),
+        _item("b", 1, ["rust"], SourceType.url, datetime(2024, 6, 1)),
+        _item("c", 2, ["python"], SourceType.file, datetime(2024, 9, 1)),
+    ]
+    vector = [1.0] + [0.0] * (settings.embedding_dim - 1)
+    for item in items:
+        await store.upsert_chunks(item.id, [Chunk(0, "text", 0, 4)], [vector], item_payload(item))
+
+    async def ids(**filters):
+        hits = await store.search("anything", top_k=10, query_filter=build_search_filter(**filters))
+        return sorted(hit["id"] for hit in hits)
+
+    assert await ids() == ["a", "b", "c"]
+    assert await ids(owner_id=1) == ["a", "b"]
+    assert await ids(tags=["python"]) == ["a", "c"]
+    assert await ids(owner_id=1, source_type="url") == ["b"]
+    assert await ids(created_from=datetime(2024, 5, 1), created_to=datetime(2024, 12, 31)) == ["b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_collection_storage_settings_and_search_params(monkeypatch):
+    monkeypatch.setattr(settings, "qdrant_quantization", "scalar")
+    monkeypatch.setattr(settings, "qdrant_hnsw_m", 32)
+    monkeypatch.setattr(settings, "qdrant_on_disk_vectors", True)
+    client = AsyncQdrantClient(location=":memory:")
+    created = {}
+    create = client.create_collection
+
+    async def recording_create(**kwargs):
+        created.update(kwargs)
+        return await create(**kwargs)
+
+    monkeypatch.setattr(client, "create_collection", recording_create)
+    store = QdrantStore(client, collection="storage_test")
+    await store.ensure_collection()
+    assert created["quantization_config"].scalar.quantile == settings.qdrant_scalar_quantile
+    assert created["hnsw_config"].m == 32 and created["vectors_config"].on_disk
+
+    vector = [1.0] + [0.0] * (settings.embedding_dim - 1)
+    item = _item("q", 1, [], SourceType.text, datetime(2024, 1, 1))
+    await store.upsert_chunks(item.id, [Chunk(0, "text", 0, 4)], [vector], item_payload(item))
+    assert [hit["id"] for hit in await store.search("anything", hnsw_ef=128)] == ["q"]
+    assert [hit["id"] for hit in await store.search("anything", exact=True)] == ["q"]
+    data = await store.apply_collection_config()
+    assert data["quantization"] == "scalar" and data["hnsw"]["m"] == 32
+
+    params = search_params(hnsw_ef=256)
+    assert params.hnsw_ef == 256 and not params.exact
+    assert params.quantization.rescore and params.quantization.oversampling == settings.search_quantization_oversampling
+    assert search_params(exact=True).exact
+
+    monkeypatch.setattr(settings, "qdrant_quantization", "none")
+    assert quantization_config() is None and search_params().quantization is None
+    monkeypatch.setattr(settings, "qdrant_quantization", "binary")
+    with pytest.raises(ValueError):
+        quantization_config()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_bootstrap_creates_the_collection_once(monkeypatch):
+    client = AsyncQdrantClient(location=":memory:")
+    store = QdrantStore(client, collection="bootstrap_test")
+    creates = []
+    create = store.create_collection
+
+    async def slow_create(name):
+        creates.append(name)
+        await asyncio.sleep(0.01)
+        await create(name)
+
+    monkeypatch.setattr(store, "create_collection", slow_create)
+    await asyncio.gather(*(store.ensure_collection() for _ in range(5)))
+    assert creates == ["bootstrap_test_v1"]
+
+    # Another process listed the collections just before this one created them.
+    other = QdrantStore(client, collection="bootstrap_test")
+    listing = other.list_collections
+    stale = (set(), {})
+    calls = []
+
+    async def list_collections():
+        calls.append(1)
+        return stale if len(calls) == 1 else await listing()
+
+    monkeypatch.setattr(other, "list_collections", list_collections)
+    await other.ensure_collection()
+    assert (await other.list_collections())[1] == {"bootstrap_test": "bootstrap_test_v1"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["qdrant", "local"])
+async def test_payload_backfill_makes_old_points_filterable(backend, tmp_path):
+    if backend == "qdrant":
+        store = QdrantStore(AsyncQdrantClient(location=":memory:"), collection="backfill_test")
+    else:
+        store = LocalVectorStore(tmp_path, collection="backfill_test")
+    item = _item("old", 7, ["python"], SourceType.text, datetime(2024, 1, 1))
+    vector = [1.0] + [0.0] * (settings.embedding_dim - 1)
+    # Points written before the filter fields were stored only carried the title.
+    await store.upsert_chunks(item.id, [Chunk(0, "a", 0, 1), Chunk(1, "b", 1, 2)], [vector, vector], {"title": item.title})
+    owner_filter = build_search_filter(owner_id=7, tags=["python"])
+    assert await store.search("anything", top_k=10, query_filter=owner_filter) == []
+
+    await store.set_payloads([(item.id, item_payload(item))])
+    hits = await store.search("anything", top_k=10, query_filter=owner_filter)
+    assert [hit["id"] for hit in hits] == ["old"]
+    # Chunk fields are kept; the new fields are merged in.
+    assert sorted(passage["text"] for passage in hits[0]["passages"]) == ["a", "b"]
@@ -25,6 +25,7 @@ TRANSLATIONS = {
         "summary_missing": "暂无摘要，打开条目可补充。",
         "tag_untagged": "未标记",
         "action_open": "打开",
+        "action_load_more": "加载更多",
         "action_edit": "编辑",
         "detail_summary_label": "摘要",
         "detail_no_summary": "暂无摘要。",
@@ -79,6 +80,7 @@ TRANSLATIONS = {
         "action_back_to_library": "返回知识库",
         "error_duplicate": "内容重复",
         "error_file_type": "仅支持 PDF 或 DOCX 文件",
+        "error_file_too_large": "文件超过大小上限",
     },
     "en": {
         "brand_name": "Knowledge Base",
@@ -102,6 +104,7 @@ TRANSLATIONS = {
         "summary_missing": "No summary yet. Open the item to add one.",
         "tag_untagged": "untagged",
         "action_open": "Open",
+        "action_load_more": "Load more",
         "action_edit": "Edit",
         "detail_summary_label": "Summary",
         "detail_no_summary": "No summary yet.",
@@ -156,6 +159,7 @@ TRANSLATIONS = {
         "action_back_to_library": "Back to library",
         "error_duplicate": "Duplicate content",
         "error_file_type": "Only PDF or DOCX files are supported",
+        "error_file_too_large": "The file exceeds the upload size limit",
     },
 }
 
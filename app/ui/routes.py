@@ -8,11 +8,13 @@ import hashlib
 from itsdangerous import URLSafeSerializer, BadSignature
 from urllib.parse import urlparse, urlencode
 
+from app.core.auth_cache import decode_token, load_user
 from app.core.dependencies import get_db
-from app.core.security import create_access_token, verify_password, decode_access_token
+from app.core.security import averify_password, create_access_token
 from app.core.config import settings
 from app.db.models import KnowledgeItem, User
-from app.services.ingest.pipeline import ingest_text, ingest_url, ingest_file
+from app.services.ingest.pipeline import deindex_item, ingest_text, ingest_url, ingest_file
+from app.services.items.listing import list_items_page
 from app.ui.i18n import LANG_COOKIE, SUPPORTED_LANGS, normalize_lang, get_translator
 
 ui_router = APIRouter()
@@ -81,22 +83,20 @@ async def _get_ui_user(request: Request, db: AsyncSession) -> User | None:
             data = _ui_serializer.loads(session_token)
             user_id = data.get("user_id")
             if user_id is not None:
-                result = await db.execute(select(User).where(User.id == int(user_id)))
-                return result.scalars().first()
+                return await load_user(db, int(user_id))
         except (BadSignature, ValueError, TypeError):
             pass
     token = request.cookies.get("access_token")
     if not token:
         return None
-    payload = decode_access_token(token.strip())
+    payload = decode_token(token.strip())
     if not payload or "sub" not in payload:
         return None
     try:
         user_id = int(payload["sub"])
     except (ValueError, TypeError):
         return None
-    result = await db.execute(select(User).where(User.id == user_id))
-    return result.scalars().first()
+    return await load_user(db, user_id)
 
 
 def _safe_next(path: str | None) -> str:
@@ -119,6 +119,7 @@ def _translate_error(detail: str, lang: str) -> str:
     mapping = {
         "Duplicate content": "error_duplicate",
         "Only PDF or DOCX files are supported": "error_file_type",
+        "File too large": "error_file_too_large",
     }
     key = mapping.get(detail)
     if not key:
@@ -176,7 +177,7 @@ async def login_action(request: Request, db: AsyncSession = Depends(get_db)):
         return response
     result = await db.execute(select(User).where(User.username == username))
     user = result.scalars().first()
-    if not user or not verify_password(password, user.password_hash):
+    if not user or not await averify_password(password, user.password_hash):
         response = _template_response(
             request,
             "login.html",
@@ -189,7 +190,7 @@ async def login_action(request: Request, db: AsyncSession = Depends(get_db)):
         )
         _set_lang_cookie(response, lang)
         return response
-    token = create_access_token({"sub": user.id})
+    token = create_access_token({"sub": str(user.id)})
     response = RedirectResponse(url=next_path or "/ui/items", status_code=302)
     response.set_cookie("access_token", token, httponly=True, samesite="lax", path="/")
     _set_session_cookie(response, user.id)
@@ -198,10 +199,25 @@ async def login_action(request: Request, db: AsyncSession = Depends(get_db)):
 
 
 @ui_router.get('/items')
-async def items_page(request: Request, db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(KnowledgeItem).where(KnowledgeItem.is_deleted == False).order_by(KnowledgeItem.created_at.desc()))
-    items = result.scalars().all()
-    return _template_response(request, "items.html", {"items": items})
+async def items_page(request: Request, cursor: str | None = None, db: AsyncSession = Depends(get_db)):
+    try:
+        items, next_cursor = await list_items_page(db, settings.items_page_size, cursor)
+    except ValueError:
+        return RedirectResponse(url="/ui/items", status_code=302)
+    return _template_response(request, "items.html", {"items": items, "next_cursor": next_cursor})
+
+
+@ui_router.get('/items/more')
+async def items_more(request: Request, cursor: str, db: AsyncSession = Depends(get_db)):
+    """Next page of cards as an HTML fragment for the "load more" button."""
+    try:
+        items, next_cursor = await list_items_page(db, settings.items_page_size, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    response = _template_response(request, "_item_cards.html", {"items": items})
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
 
 
 @ui_router.get('/lang')
@@ -330,4 +346,5 @@ async def item_delete(item_id: str, db: AsyncSession = Depends(get_db)):
     if item:
         await db.delete(item)
         await db.commit()
+        await deindex_item(item_id)
     return RedirectResponse(url="/ui/items", status_code=302)
@@ -0,0 +1,47 @@
+"""Standalone ingest worker: `python -m app.worker [--concurrency N]`.
+
+Runs the same job pool as the API process, so ingest can be scaled separately
+(set INGEST_WORKERS=0 on the API containers to stop them processing jobs).
+"""
+import argparse
+import asyncio
+import logging
+import signal
+
+from app.core.config import settings
+from app.core.logging import setup_logging
+from app.services.extractors.engine import shutdown_extraction_pool
+from app.services.extractors.fetcher import close_fetcher
+from app.services.indexing.store import close_store, init_store
+from app.services.ingest import near_duplicates
+from app.services.jobs.queue import start_worker_pool, stop_worker_pool
+
+logger = logging.getLogger(__name__)
+
+
+async def main(concurrency: int) -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    await init_store()
+    index_task = asyncio.create_task(near_duplicates.build_index())
+    await start_worker_pool(concurrency)
+    await stop.wait()
+    logger.info("Shutting down ingest worker")
+    await stop_worker_pool()
+    index_task.cancel()
+    await close_store()
+    await close_fetcher()
+    shutdown_extraction_pool()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the knowledge base ingest worker")
+    parser.add_argument("--concurrency", type=int, default=max(settings.ingest_workers, 1))
+    args = parser.parse_args()
+    if settings.vector_backend == "local" or settings.vector_local_fallback:
+        # The local index has a single writer, the API process; jobs run here would bypass it.
+        parser.error("the local vector index (VECTOR_BACKEND=local or VECTOR_LOCAL_FALLBACK) requires ingest to run in the API process")
+    setup_logging()
+    asyncio.run(main(args.concurrency))
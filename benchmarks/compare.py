@@ -0,0 +1,86 @@
+"""Compare two benchmark result files: `python -m benchmarks.compare BASELINE CURRENT [--tolerance 0.2]`.
+
+Exits with status 1 when any metric is worse than the baseline by more than the tolerance,
+or when a run reports more errors or failed operations than the baseline.
+"""
+import argparse
+import json
+import sys
+
+# Metric name suffix -> whether larger values are better.
+_DIRECTIONS = {
+    "_per_second": True,
+    "_rps": True,
+    "_ms": False,
+    "_mb": False,
+}
+# Counts that must not grow at all: any increase is a regression, whatever the tolerance.
+_ZERO_TOLERANCE = ("errors", "failed")
+
+
+def _direction(name: str) -> bool | None:
+    if name.rsplit(".", 1)[-1] in _ZERO_TOLERANCE:
+        return False
+    for suffix, higher_is_better in _DIRECTIONS.items():
+        if name.endswith(suffix):
+            return higher_is_better
+    return None
+
+
+def flatten(results: dict, prefix: str = "") -> dict[str, float]:
+    """`{"search_text": {"p95_ms": 3.1}}` -> `{"search_text.p95_ms": 3.1}`, numeric leaves only."""
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = float(value)
+    return flat
+
+
+def compare(baseline: dict, current: dict, tolerance: float = 0.2) -> list[dict]:
+    """One row per metric present in both runs; `regression` marks those beyond `tolerance`."""
+    before, after = flatten(baseline["results"]), flatten(current["results"])
+    rows = []
+    for name in sorted(before.keys() & after.keys()):
+        higher_is_better = _direction(name)
+        if higher_is_better is None:
+            continue
+        old, new = before[name], after[name]
+        if old:
+            change = (new - old) / old
+        else:
+            change = float("inf") if new > old else 0.0
+        worse = -change if higher_is_better else change
+        allowed = 0.0 if name.rsplit(".", 1)[-1] in _ZERO_TOLERANCE else tolerance
+        rows.append({"metric": name, "baseline": old, "current": new, "change": change, "regression": worse > allowed})
+    return rows
+
+
+def format_rows(rows: list[dict]) -> str:
+    width = max((len(row["metric"]) for row in rows), default=10)
+    lines = [f"{'metric':<{width}}  {'baseline':>12}  {'current':>12}  {'change':>8}"]
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        lines.append(f"{row['metric']:<{width}}  {row['baseline']:>12.2f}  {row['current']:>12.2f}  {row['change']:>+8.1%}{flag}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare", description=__doc__.splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    with open(args.baseline, encoding="utf-8") as fh:
+        baseline = json.load(fh)
+    with open(args.current, encoding="utf-8") as fh:
+        current = json.load(fh)
+    rows = compare(baseline, current, args.tolerance)
+    print(format_rows(rows))
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+"""Deterministic synthetic corpora of mixed Chinese / English documents.
+
+Words are drawn from a Zipf-like distribution over a generated vocabulary, so a few terms
+match most documents and most terms match few, as in real text; document lengths vary
+enough that some span several chunks.
+"""
+import json
+import random
+from pathlib import Path
+from typing import Iterator
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000}
+
+# Common characters; two-character words built from them read like (nonsense) Chinese.
+_HANZI = (
+    "的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工也能下过子说产种面而方后多定行学法所"
+    "民得经十三之进着等部度家电力里如水化高自二理起小物现实加量都两体制机当使点从业本去把性好应开它合还因由其些然前外天政四日"
+    "那社义事平形相全表间样与关各重新线内数正心反你明看原又么利比或但质气第向道命此变条只没结解问意建月公无系军很情者最立代想"
+    "已通并提直题党程展五果料象员革位入常文总次品式活设及管特件长求老头基资边流路级少图山统接知较将组见计别她手角期根论运农指"
+)
+_ENGLISH_ONSETS = ["b", "c", "d", "f", "g", "h", "k", "l", "m", "n", "p", "qu", "r", "s", "st", "t", "tr", "v", "w", "z"]
+_ENGLISH_NUCLEI = ["a", "e", "i", "o", "u", "ai", "ea", "io", "ou"]
+_ENGLISH_CODAS = ["", "n", "r", "s", "t", "x", "ng", "ck", "ll"]
+TAGS = ["python", "rust", "数据库", "机器学习", "运维", "前端", "笔记", "论文", "产品", "阅读"]
+
+
+def _vocabulary(rng: random.Random, size: int) -> tuple[list[str], list[str]]:
+    chinese = list(dict.fromkeys(rng.choice(_HANZI) + rng.choice(_HANZI) for _ in range(size * 2)))[:size]
+    english: list[str] = []
+    seen: set[str] = set()
+    while len(english) < size:
+        word = "".join(
+            rng.choice(_ENGLISH_ONSETS) + rng.choice(_ENGLISH_NUCLEI) + rng.choice(_ENGLISH_CODAS)
+            for _ in range(rng.randint(1, 3))
+        )
+        if word not in seen:
+            seen.add(word)
+            english.append(word)
+    return chinese, english
+
+
+def _zipf_weights(size: int) -> list[float]:
+    return [1.0 / (rank + 1) for rank in range(size)]
+
+
+class Corpus:
+    """`Corpus(size, seed).documents()` yields the same documents for the same arguments."""
+
+    def __init__(self, size: int, seed: int = 0, vocabulary_size: int = 5000) -> None:
+        self.size = size
+        self.seed = seed
+        rng = random.Random(seed)
+        self.chinese, self.english = _vocabulary(rng, vocabulary_size)
+        self._weights = _zipf_weights(vocabulary_size)
+
+    def _words(self, rng: random.Random, words: list[str], count: int) -> list[str]:
+        return rng.choices(words, weights=self._weights[:len(words)], k=count)
+
+    def _sentence(self, rng: random.Random) -> str:
+        if rng.random() < 0.6:
+            return "".join(self._words(rng, self.chinese, rng.randint(6, 20))) + "。"
+        words = self._words(rng, self.english, rng.randint(5, 16))
+        return " ".join(words).capitalize() + ". "
+
+    def document(self, index: int) -> dict:
+        rng = random.Random(f"{self.seed}:{index}")
+        # Mostly short notes, with a long tail of multi-chunk articles.
+        sentences = min(int(rng.paretovariate(1.5) * 4), 300)
+        paragraphs = []
+        while sentences > 0:
+            take = min(sentences, rng.randint(3, 8))
+            paragraphs.append("".join(self._sentence(rng) for _ in range(take)).strip())
+            sentences -= take
+        title_words = self._words(rng, self.chinese if rng.random() < 0.6 else self.english, rng.randint(2, 5))
+        return {
+            "title": f"{' '.join(title_words)} #{index}",
+            # The index keeps every document distinct for the exact and near-duplicate checks.
+            "content_text": f"文档编号 {index}\n\n" + "\n\n".join(paragraphs),
+            "tags": rng.sample(TAGS, rng.randint(0, 3)),
+        }
+
+    def documents(self) -> Iterator[dict]:
+        for index in range(self.size):
+            yield self.document(index)
+
+    def queries(self, count: int, seed: int = 1) -> list[str]:
+        """One- and two-word queries in both scripts, skewed towards frequent words."""
+        rng = random.Random(f"{self.seed}:queries:{seed}")
+        queries = []
+        for _ in range(count):
+            words = self.chinese if rng.random() < 0.6 else self.english
+            picked = self._words(rng, words[:500], rng.randint(1, 2))
+            queries.append(("" if words is self.chinese else " ").join(picked))
+        return queries
+
+    def write_ndjson(self, path: Path) -> Path:
+        with open(path, "w", encoding="utf-8") as fh:
+            for doc in self.documents():
+                fh.write(json.dumps(doc, ensure_ascii=False) + "\n")
+        return path
+
+
+def corpus_size(value: str) -> int:
+    return SIZES.get(value.lower()) or int(value)
@@ -0,0 +1,268 @@
+"""End-to-end benchmarks: `python -m benchmarks.run [--size 1k|10k|100k] [--baseline FILE]`.
+
+Runs fully offline in a throwaway directory: SQLite, the mock LLM provider and Qdrant's
+in-process mode (or `--vector-backend local`). It measures:
+
+- bulk ingest throughput (the NDJSON import pipeline) over a synthetic corpus;
+- single-item ingest, `/search/text`, `/search/semantic` and the first items page as
+  latency percentiles under `--concurrency` concurrent requests;
+- sequential deep paging through `/items`;
+- peak RSS after each phase.
+
+Results are written as JSON (`--output`, default `benchmarks/results/`). With `--baseline`
+the run is compared metric by metric and the exit status is 1 on a regression.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.compare import compare, format_rows
+from benchmarks.corpus import Corpus, corpus_size
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def _configure(workdir: Path, args: argparse.Namespace) -> None:
+    """Point the app at throwaway storage; must run before any app module reads settings."""
+    os.environ.update({
+        "DATABASE_URL": f"sqlite+aiosqlite:///{workdir}/bench.db",
+        "UPLOAD_DIR": str(workdir / "uploads"),
+        "QDRANT_URL": ":memory:",
+        "VECTOR_BACKEND": args.vector_backend,
+        "EMBEDDING_DIM": str(args.dim),
+        "OPENAI_API_KEY": "",
+        # Requests run the whole pipeline instead of queueing a job, so ingest latency is real.
+        "INGEST_ASYNC": "false",
+        "INGEST_WORKERS": "0",
+    })
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def latency_summary(latencies: list[float], errors: int, elapsed: float, concurrency: int) -> dict:
+    ordered = sorted(latencies)
+
+    def percentile(p: float) -> float:
+        if not ordered:
+            return 0.0
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000, 2)
+
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "concurrency": concurrency,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0,
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p95_ms": percentile(95),
+        "p99_ms": percentile(99),
+        "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+    }
+
+
+async def measure(client, requests: list[dict], concurrency: int) -> dict:
+    """Issue `requests` (httpx.request kwargs) with at most `concurrency` in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+    errors = 0
+
+    async def one(request: dict) -> None:
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.request(**request)
+            if response.status_code >= 400:
+                errors += 1
+                if errors == 1:
+                    print(f"  {request['method']} {request['url']} -> {response.status_code}: {response.text[:200]}", file=sys.stderr)
+            else:
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(request) for request in requests))
+    summary = latency_summary(latencies, errors, time.perf_counter() - started, concurrency)
+    summary["peak_rss_mb"] = peak_rss_mb()
+    return summary
+
+
+async def bench_bulk_ingest(user, corpus: Corpus, workdir: Path) -> dict:
+    from app.services.ingest.bulk import iter_records, run_bulk_import
+
+    path = corpus.write_ndjson(workdir / "corpus.ndjson")
+    started = time.perf_counter()
+    summary = await run_bulk_import(user, iter_records(str(path)))
+    elapsed = time.perf_counter() - started
+    return {
+        "items": corpus.size,
+        "succeeded": summary["succeeded"],
+        "failed": summary["failed"],
+        "seconds": round(elapsed, 2),
+        "items_per_second": round(summary["succeeded"] / elapsed, 1),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+async def bench_deep_paging(client, pages: int) -> dict:
+    latencies, cursor = [], None
+    started = time.perf_counter()
+    for _ in range(pages):
+        params = {"limit": 20, **({"cursor": cursor} if cursor else {})}
+        request_started = time.perf_counter()
+        response = await client.get("/api/v1/items", params=params)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - request_started)
+        cursor = response.json()["next_cursor"]
+        if not cursor:
+            break
+    summary = latency_summary(latencies, 0, time.perf_counter() - started, 1)
+    summary["peak_rss_mb"] = peak_rss_mb()
+    return summary
+
+
+async def run(args: argparse.Namespace, workdir: Path) -> dict:
+    import httpx
+    from sqlalchemy import select
+
+    from app.core.security import create_access_token
+    from app.db.models import User
+    from app.db.session import get_session
+    from app.main import app
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+    corpus = Corpus(corpus_size(args.size), seed=args.seed)
+    queries = corpus.queries(args.requests)
+    results: dict = {}
+
+    def phase(name: str) -> None:
+        print(f"[{time.strftime('%H:%M:%S')}] {name}", file=sys.stderr)
+
+    await app.router.startup()
+    try:
+        async with get_session() as db:
+            db.add(User(username="bench", password_hash="x"))
+            await db.commit()
+            user = (await db.execute(select(User).where(User.username == "bench"))).scalars().one()
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user.id)})}"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers, timeout=None) as client:
+            phase(f"bulk ingest of {corpus.size} items")
+            results["ingest_bulk"] = await bench_bulk_ingest(user, corpus, workdir)
+
+            phase("single-item ingest")
+            extra = [corpus.document(corpus.size + i) for i in range(args.ingest_requests)]
+            results["ingest_api"] = await measure(client, [
+                {"method": "POST", "url": "/api/v1/items/text",
+                 "data": {"title": doc["title"], "content_text": doc["content_text"], "tags": ",".join(doc["tags"])}}
+                for doc in extra
+            ], args.concurrency)
+
+            phase("text search")
+            results["search_text"] = await measure(client, [
+                {"method": "GET", "url": "/api/v1/search/text", "params": {"q": q, "limit": 20}} for q in queries
+            ], args.concurrency)
+
+            phase("semantic search")
+            results["search_semantic"] = await measure(client, [
+                {"method": "GET", "url": "/api/v1/search/semantic", "params": {"q": q, "top_k": 10}} for q in queries
+            ], args.concurrency)
+
+            phase("list pages")
+            results["list_first_page"] = await measure(client, [
+                {"method": "GET", "url": "/api/v1/items", "params": {"limit": 20}} for _ in range(args.requests)
+            ], args.concurrency)
+            results["list_deep_pages"] = await bench_deep_paging(client, args.list_pages)
+    finally:
+        await app.router.shutdown()
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=Path(__file__).resolve().parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Offline end-to-end benchmarks")
+    parser.add_argument("--size", default="1k", help="Corpus size: 1k, 10k, 100k or a number (default 1k)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=500, help="Requests per search / list benchmark")
+    parser.add_argument("--ingest-requests", type=int, default=100, help="Single-item ingest requests")
+    parser.add_argument("--list-pages", type=int, default=50, help="Pages walked by the deep paging benchmark")
+    parser.add_argument("--dim", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--vector-backend", choices=["qdrant", "local"], default="qdrant")
+    parser.add_argument("--output", help="Result file (default benchmarks/results/<size>-<timestamp>.json)")
+    parser.add_argument("--baseline", help="Compare against this result file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (default 0.2)")
+    parser.add_argument("--keep", action="store_true", help="Keep the working directory")
+    parser.add_argument("--verbose", action="store_true", help="Keep the app's INFO logging")
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    workdir = Path(tempfile.mkdtemp(prefix="kb-bench-"))
+    _configure(workdir, args)
+    started_at = datetime.now(timezone.utc)
+    try:
+        results = asyncio.run(run(args, workdir))
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    report = {
+        "meta": {
+            "started_at": started_at.isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "size": corpus_size(args.size),
+            "seed": args.seed,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "embedding_dim": args.dim,
+            "vector_backend": args.vector_backend,
+        },
+        "results": results,
+    }
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{args.size}-{started_at:%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    print(json.dumps(results, indent=2))
+    print(f"Results written to {output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+        if baseline["meta"].get("size") != report["meta"]["size"]:
+            print(f"Warning: baseline corpus size {baseline['meta'].get('size')} differs from {report['meta']['size']}", file=sys.stderr)
+        rows = compare(baseline, report, args.tolerance)
+        print(format_rows(rows))
+        return 1 if any(row["regression"] for row in rows) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())